@@ -0,0 +1,334 @@
+"""Clay 服务器压测工具：模拟大量被控客户端与Web观看者，测量连接速率、转发延迟与服务器资源占用
+
+模拟客户端与 ClayClient 使用相同的协议：携带 Client-Type 请求头连接、register、heartbeat、
+terminal_output 输出突发与 screen_frame 合成帧；模拟观看者订阅部分客户端的终端与媒体帧，
+按消息中的发送时间戳计算转发延迟（发送方与接收方在同一进程内，时钟一致）。
+
+用法（先启动服务器）：
+    python bench/loadgen.py --url http://127.0.0.1:5000 --agents 1000 --viewers 10 --duration 30 --output results.json
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from typing import Any, Dict, List, Optional
+
+import psutil
+import socketio
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "server"))
+
+from profiler import percentile  # noqa: E402  与/debug/profile使用相同的分位数算法
+
+AGENT_HOSTNAME_PREFIX = "loadgen-agent-"
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """延迟样本汇总（毫秒）"""
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+# ------------------------------
+# 服务器资源采样
+# ------------------------------
+def find_server_pid(port: int) -> Optional[int]:
+    """按监听端口查找服务器进程"""
+    try:
+        for conn in psutil.net_connections(kind="tcp"):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port and conn.pid:
+                return conn.pid
+    except (psutil.AccessDenied, PermissionError):
+        pass
+    return None
+
+
+class ServerSampler:
+    """定期采样服务器进程的RSS与CPU占用"""
+    def __init__(self, pid: Optional[int], interval: float = 1.0):
+        self.process = psutil.Process(pid) if pid else None
+        self.interval = interval
+        self.rss: List[int] = []
+        self.cpu: List[float] = []
+        self._running = False
+
+    def start(self) -> None:
+        if not self.process:
+            return
+        self.process.cpu_percent(None)  # 初始化CPU计数基准
+        self._running = True
+        eventlet.spawn(self._run)
+
+    def stop(self) -> None:
+        self._running = False
+
+    def _run(self) -> None:
+        while self._running:
+            eventlet.sleep(self.interval)
+            try:
+                self.rss.append(self.process.memory_info().rss)
+                self.cpu.append(self.process.cpu_percent(None))
+            except psutil.Error:
+                break
+
+    def result(self) -> Dict[str, Any]:
+        if not self.process:
+            return {"pid": None}
+        return {
+            "pid": self.process.pid,
+            "rss_mb_last": round(self.rss[-1] / 1048576, 2) if self.rss else None,
+            "rss_mb_peak": round(max(self.rss) / 1048576, 2) if self.rss else None,
+            "cpu_percent_avg": round(sum(self.cpu) / len(self.cpu), 2) if self.cpu else None,
+            "cpu_percent_peak": round(max(self.cpu), 2) if self.cpu else None,
+        }
+
+
+# ------------------------------
+# 模拟客户端
+# ------------------------------
+class SimulatedAgent:
+    """模拟被控客户端"""
+    def __init__(self, index: int, args: argparse.Namespace):
+        self.index = index
+        self.args = args
+        self.hostname = f"{AGENT_HOSTNAME_PREFIX}{index}"
+        self.sio = socketio.Client(reconnection=False)
+        self.seq = 0
+        self.frame = os.urandom(args.frame_size)  # 合成帧内容（每个客户端固定一份）
+
+    def connect(self) -> float:
+        """连接并注册，返回连接耗时（秒）"""
+        started = time.perf_counter()
+        self.sio.connect(self.args.url, headers={"Client-Type": "clay-client"}, transports=["websocket"])
+        elapsed = time.perf_counter() - started
+        self.sio.emit("register", {"hostname": self.hostname, "os": "LoadGen"})
+        return elapsed
+
+    def run(self, stop_at: float) -> None:
+        """按配置的间隔发送心跳、终端输出与屏幕帧，直到stop_at"""
+        args = self.args
+        now = time.time()
+        # 随机错开起始时间，避免所有客户端同时发送
+        next_heartbeat = now + random.uniform(0, args.heartbeat_interval) if args.heartbeat_interval else None
+        next_output = now + random.uniform(0, args.output_interval) if args.output_interval else None
+        next_frame = now + random.uniform(0, args.frame_interval) if args.frame_interval else None
+        while self.sio.connected:
+            now = time.time()
+            if now >= stop_at:
+                break
+            if next_heartbeat and now >= next_heartbeat:
+                self.sio.emit("heartbeat", {"timestamp": now})
+                next_heartbeat += args.heartbeat_interval
+            if next_output and now >= next_output:
+                for _ in range(args.output_burst):
+                    self.seq += 1
+                    self.sio.emit("terminal_output", {
+                        "command_id": None, "seq": self.seq, "stream": "stdout",
+                        "timestamp": time.time(), "output": f"line {self.seq} from {self.hostname}\n"
+                    })
+                next_output += args.output_interval
+            if next_frame and now >= next_frame:
+                self.sio.emit("screen_frame", {
+                    "image_data": self.frame, "timestamp": time.time(), "width": 1920, "height": 1080
+                })
+                next_frame += args.frame_interval
+            pending = [t for t in (next_heartbeat, next_output, next_frame) if t]
+            eventlet.sleep(max(min(pending) - time.time(), 0.001) if pending else stop_at - now)
+
+    def disconnect(self) -> None:
+        if self.sio.connected:
+            self.sio.disconnect()
+
+
+class SimulatedViewer:
+    """模拟Web观看者：订阅分配到的客户端，记录终端输出与媒体帧的转发延迟"""
+    def __init__(self, index: int, args: argparse.Namespace, latencies: Dict[str, List[float]]):
+        self.index = index
+        self.args = args
+        self.latencies = latencies
+        self.agents: Dict[str, str] = {}  # client_id -> hostname
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on("update_client_list", self._on_snapshot)
+        self.sio.on("client_list_delta", self._on_delta)
+        self.sio.on("terminal_output", self._on_terminal_output)
+        self.sio.on("screen_frame", self._on_screen_frame)
+
+    def _on_snapshot(self, data: Dict[str, Any]) -> None:
+        self.agents = {client["id"]: client["hostname"] for client in data.get("clients", [])}
+
+    def _on_delta(self, data: Dict[str, Any]) -> None:
+        for change in data.get("changes", []):
+            if change["op"] == "remove":
+                self.agents.pop(change["id"], None)
+            elif change.get("client"):
+                self.agents[change["id"]] = change["client"]["hostname"]
+
+    def _on_terminal_output(self, batch: Any) -> None:
+        now = time.time()
+        for item in batch if isinstance(batch, list) else [batch]:
+            if item.get("timestamp"):
+                self.latencies["terminal_output"].append(now - item["timestamp"])
+
+    def _on_screen_frame(self, data: Dict[str, Any]) -> bool:
+        if data.get("timestamp"):
+            self.latencies["screen_frame"].append(time.time() - data["timestamp"])
+        return True  # 确认收到，服务器据此发送下一帧
+
+    def connect(self) -> None:
+        self.sio.connect(self.args.url, transports=["websocket"])
+
+    def subscribe(self, client_ids: List[str]) -> None:
+        for client_id in client_ids:
+            self.sio.emit("subscribe_terminal", {"client_id": client_id})
+            self.sio.emit("subscribe_media", {"client_id": client_id})
+
+    def disconnect(self) -> None:
+        if self.sio.connected:
+            self.sio.disconnect()
+
+
+# ------------------------------
+# 压测流程
+# ------------------------------
+def connect_agents(agents: List[SimulatedAgent], rate: float) -> Dict[str, Any]:
+    """按指定速率并发连接所有模拟客户端"""
+    pool = eventlet.GreenPool(size=max(len(agents), 1))
+    durations: List[float] = []
+    failures: List[str] = []
+
+    def connect_one(agent: SimulatedAgent) -> None:
+        try:
+            durations.append(agent.connect())
+        except Exception as e:
+            failures.append(str(e))
+
+    started = time.perf_counter()
+    for i, agent in enumerate(agents):
+        if rate > 0:
+            # 按速率排队发起连接
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                eventlet.sleep(delay)
+        pool.spawn_n(connect_one, agent)
+    pool.waitall()
+    elapsed = time.perf_counter() - started
+    result = summarize(durations)
+    result.update({
+        "attempted": len(agents),
+        "succeeded": len(durations),
+        "failed": len(failures),
+        "elapsed_s": round(elapsed, 3),
+        "rate_per_s": round(len(durations) / elapsed, 2) if elapsed > 0 else None,
+        "errors": sorted(set(failures))[:5],
+    })
+    return result
+
+
+def wait_for_agents(viewer: SimulatedViewer, expected: int, timeout: float) -> int:
+    """等待观看者的客户端列表中出现全部模拟客户端"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        count = sum(1 for hostname in viewer.agents.values() if hostname.startswith(AGENT_HOSTNAME_PREFIX))
+        if count >= expected:
+            return count
+        eventlet.sleep(0.1)
+    return sum(1 for hostname in viewer.agents.values() if hostname.startswith(AGENT_HOSTNAME_PREFIX))
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    port = int(args.url.rsplit(":", 1)[-1].split("/")[0]) if args.url.count(":") >= 2 else 80
+    sampler = ServerSampler(args.server_pid or find_server_pid(port))
+    sampler.start()
+
+    latencies: Dict[str, List[float]] = {"terminal_output": [], "screen_frame": []}
+    agents = [SimulatedAgent(i, args) for i in range(args.agents)]
+    viewers = [SimulatedViewer(i, args, latencies) for i in range(args.viewers)]
+
+    print(f"连接 {len(agents)} 个模拟客户端...", flush=True)
+    connect_result = connect_agents(agents, args.connect_rate)
+    print(f"连接完成: {connect_result['succeeded']}/{connect_result['attempted']}, "
+          f"{connect_result['rate_per_s']} 个/秒", flush=True)
+
+    print(f"连接 {len(viewers)} 个模拟观看者...", flush=True)
+    for viewer in viewers:
+        viewer.connect()
+    visible = wait_for_agents(viewers[0], connect_result["succeeded"], timeout=30) if viewers else 0
+
+    # 按轮询方式为每个观看者分配要订阅的客户端
+    if viewers:
+        agent_ids = sorted(client_id for client_id, hostname in viewers[0].agents.items()
+                           if hostname.startswith(AGENT_HOSTNAME_PREFIX))
+        cursor = 0
+        for viewer in viewers:
+            assigned = []
+            for _ in range(min(args.subscriptions_per_viewer, len(agent_ids))):
+                assigned.append(agent_ids[cursor % len(agent_ids)])
+                cursor += 1
+            viewer.subscribe(assigned)
+
+    print(f"施加负载 {args.duration} 秒...", flush=True)
+    stop_at = time.time() + args.duration
+    threads = [eventlet.spawn(agent.run, stop_at) for agent in agents if agent.sio.connected]
+    for thread in threads:
+        thread.wait()
+    eventlet.sleep(1)  # 等待在途消息到达
+
+    for viewer in viewers:
+        viewer.disconnect()
+    pool = eventlet.GreenPool(size=max(len(agents), 1))
+    for agent in agents:
+        pool.spawn_n(agent.disconnect)
+    pool.waitall()
+    sampler.stop()
+
+    return {
+        "timestamp": time.time(),
+        "host": {"platform": platform.platform(), "python": sys.version.split()[0], "cpu_count": os.cpu_count()},
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "connect": connect_result,
+        "viewers": {"connected": len(viewers), "agents_visible": visible},
+        "relay_latency": {event: summarize(samples) for event, samples in latencies.items()},
+        "server": sampler.result(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Clay 服务器压测工具")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="服务器地址")
+    parser.add_argument("--agents", type=int, default=100, help="模拟客户端数")
+    parser.add_argument("--viewers", type=int, default=5, help="模拟观看者数")
+    parser.add_argument("--subscriptions-per-viewer", type=int, default=1, help="每个观看者订阅的客户端数")
+    parser.add_argument("--connect-rate", type=float, default=200, help="每秒发起的连接数（0为不限速）")
+    parser.add_argument("--duration", type=float, default=20, help="施加负载的时长（秒）")
+    parser.add_argument("--heartbeat-interval", type=float, default=0, help="心跳间隔（秒，0为不发送）")
+    parser.add_argument("--output-interval", type=float, default=1.0, help="终端输出突发间隔（秒，0为不发送）")
+    parser.add_argument("--output-burst", type=int, default=20, help="每次突发的输出条数")
+    parser.add_argument("--frame-interval", type=float, default=2.0, help="屏幕帧间隔（秒，0为不发送）")
+    parser.add_argument("--frame-size", type=int, default=50 * 1024, help="合成帧大小（字节）")
+    parser.add_argument("--server-pid", type=int, default=None, help="服务器进程ID（默认按端口查找）")
+    parser.add_argument("--output", default="loadgen-results.json", help="结果JSON文件路径")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(json.dumps({key: results[key] for key in ("connect", "relay_latency", "server")},
+                     ensure_ascii=False, indent=2))
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
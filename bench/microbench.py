@@ -0,0 +1,267 @@
+"""Clay 服务器热路径微基准：ClientManager 数据结构操作与客户端列表广播的序列化
+
+对 10 ~ 100k 个客户端分别测量每次操作的耗时（计时方式参考 pytest-benchmark：
+每个用例多轮计时，取中位数/最小值/标准差）。变更数据结构前后各跑一次并与基线比较，
+耗时超过容差即视为回归（退出码为1）。
+
+用法：
+    python bench/microbench.py                                   # 运行并与 bench/baseline.json 比较
+    python bench/microbench.py --sizes 10,1000 --filter serialize  # 只跑部分规模/用例
+    python bench/microbench.py --save bench/baseline.json         # 更新基线
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(os.path.dirname(BENCH_DIR), "server")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = "10,100,1000,10000,100000"
+
+# 导入服务器模块会创建日志文件（相对路径），在临时目录中导入避免污染仓库
+sys.path.insert(0, SERVER_DIR)
+_cwd = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix="clay-microbench-"))
+import app as server  # noqa: E402
+os.chdir(_cwd)
+
+# 与服务器发送Socket.IO消息时使用的JSON实现一致
+packet_json = server.socketio.server.packet_class.json
+
+
+# ------------------------------
+# 计时
+# ------------------------------
+class Case:
+    """单个基准用例
+
+    setup(n) 返回本轮的状态（不计时），run(state) 执行 ops 次操作（计时）。
+    会修改状态的用例每轮重新setup，只读用例复用同一份状态。
+    """
+    def __init__(self, name: str, setup: Callable[[int], Any], run: Callable[[Any], None],
+                 ops: Callable[[int], int], fresh_state: bool = False):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.ops = ops
+        self.fresh_state = fresh_state
+
+
+def measure(case: Case, n: int, min_rounds: int, max_rounds: int, min_time: float) -> Dict[str, Any]:
+    """多轮计时，返回每次操作的耗时统计（纳秒）"""
+    ops = case.ops(n)
+    state = case.setup(n)
+    case.run(state)  # 预热
+    timings: List[float] = []
+    total = 0.0
+    while len(timings) < max_rounds and (len(timings) < min_rounds or total < min_time):
+        if case.fresh_state:
+            state = case.setup(n)
+        start = time.perf_counter()
+        case.run(state)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed / ops * 1e9)
+        total += elapsed
+    return {
+        "ops_per_round": ops,
+        "rounds": len(timings),
+        "min_ns": round(min(timings), 1),
+        "median_ns": round(statistics.median(timings), 1),
+        "mean_ns": round(statistics.mean(timings), 1),
+        "stddev_ns": round(statistics.stdev(timings), 1) if len(timings) > 1 else 0.0,
+    }
+
+
+# ------------------------------
+# 用例
+# ------------------------------
+def client_ids(n: int) -> List[str]:
+    return [f"bench-{index:06d}" for index in range(n)]
+
+
+def new_manager() -> server.ClientManager:
+    """与服务器相同参数的空管理器（不挂超时唤醒与存活检查回调）"""
+    return server.ClientManager(server.CLIENT_TIMEOUT_SECONDS, server.CLIENT_MEDIA_TIMEOUT_MULTIPLIER)
+
+
+def populated_manager(n: int) -> Tuple[server.ClientManager, List[str]]:
+    """已注册n个客户端的管理器"""
+    manager = new_manager()
+    ids = client_ids(n)
+    for index, client_id in enumerate(ids):
+        manager.add_client(client_id, f"10.0.{index // 256 % 256}.{index % 256}")
+        manager.update_client_info(client_id, f"host-{index}", "Linux 6.1")
+    return manager, ids
+
+
+def cyclic_ids(n: int, count: int) -> List[str]:
+    """按顺序循环取count个客户端ID"""
+    ids = client_ids(n)
+    return [ids[index % n] for index in range(count)]
+
+
+def run_add(state: Tuple[server.ClientManager, List[str]]) -> None:
+    manager, ids = state
+    for client_id in ids:
+        manager.add_client(client_id, "10.0.0.1")
+
+
+def run_remove(state: Tuple[server.ClientManager, List[str]]) -> None:
+    manager, ids = state
+    for client_id in ids:
+        manager.remove_client(client_id)
+
+
+def run_update_last_seen(state: Tuple[server.ClientManager, List[str]]) -> None:
+    manager, ids = state
+    for client_id in ids:
+        manager.update_last_seen(client_id)
+
+
+def run_get_all_cached(state: Tuple[server.ClientManager, int]) -> None:
+    manager, calls = state
+    for _ in range(calls):
+        manager.get_all_clients()
+
+
+def run_get_all_rebuild(manager: server.ClientManager) -> None:
+    manager._bump_revision()  # 模拟一次列表变更使缓存失效
+    manager.get_all_clients()
+
+
+def run_timeout_sweep_idle(state: Tuple[server.ClientManager, int]) -> None:
+    manager, calls = state
+    now = time.time()
+    for _ in range(calls):
+        manager.pop_timeout_clients(now)
+
+
+def run_timeout_sweep_all(manager: server.ClientManager) -> None:
+    manager.pop_timeout_clients(time.time() + manager.timeout_seconds * manager.media_multiplier + 1)
+
+
+def run_serialize_snapshot(manager: server.ClientManager) -> None:
+    packet_json.dumps(manager.get_snapshot(), separators=(",", ":"))
+
+
+def run_serialize_delta(state: Tuple[server.ClientManager, List[str]]) -> None:
+    manager, ids = state
+    builder = server.ClientListDeltaBuilder()
+    for client_id in ids:
+        delta = builder(server.ROOM_WEB_CLIENTS, [manager.build_change(server.DELTA_OP_UPDATE, client_id)])
+        packet_json.dumps(delta, separators=(",", ":"))
+
+
+REPEATED_OPS = 1000  # 单次操作很快的用例每轮重复的次数
+
+CASES: List[Case] = [
+    Case("add_client", lambda n: (new_manager(), client_ids(n)), run_add, lambda n: n, fresh_state=True),
+    Case("remove_client", populated_manager, run_remove, lambda n: n, fresh_state=True),
+    Case("update_last_seen",
+         lambda n: (populated_manager(n)[0], cyclic_ids(n, max(n, REPEATED_OPS))),
+         run_update_last_seen, lambda n: max(n, REPEATED_OPS)),
+    Case("get_all_clients[cached]", lambda n: (populated_manager(n)[0], REPEATED_OPS),
+         run_get_all_cached, lambda n: REPEATED_OPS),
+    Case("get_all_clients[rebuild]", lambda n: populated_manager(n)[0], run_get_all_rebuild, lambda n: 1),
+    Case("pop_timeout_clients[idle]", lambda n: (populated_manager(n)[0], REPEATED_OPS),
+         run_timeout_sweep_idle, lambda n: REPEATED_OPS),
+    Case("pop_timeout_clients[all_expired]", lambda n: populated_manager(n)[0], run_timeout_sweep_all,
+         lambda n: n, fresh_state=True),
+    Case("serialize[snapshot]", lambda n: populated_manager(n)[0], run_serialize_snapshot, lambda n: 1),
+    Case("serialize[delta]",
+         lambda n: (populated_manager(n)[0], cyclic_ids(n, REPEATED_OPS)),
+         run_serialize_delta, lambda n: REPEATED_OPS),
+]
+
+
+# ------------------------------
+# 基线比较
+# ------------------------------
+def result_key(name: str, n: int) -> str:
+    return f"{name}@{n}"
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    """按中位数与基线比较，返回超出容差的用例"""
+    regressions: List[str] = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or not previous["median_ns"]:
+            continue
+        ratio = current["median_ns"] / previous["median_ns"]
+        current["baseline_median_ns"] = previous["median_ns"]
+        current["ratio"] = round(ratio, 3)
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def format_ns(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} ms"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} µs"
+    return f"{value:.0f} ns"
+
+
+def print_row(key: str, result: Dict[str, Any]) -> None:
+    line = (f"{key:<44} {format_ns(result['median_ns']):>11} {format_ns(result['min_ns']):>11} "
+            f"±{format_ns(result['stddev_ns']):>10} {result['rounds']:>5}")
+    if "ratio" in result:
+        line += f"   x{result['ratio']:.2f}"
+    print(line, flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Clay 服务器热路径微基准")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="客户端数量，逗号分隔")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--min-rounds", type=int, default=5, help="每个用例最少计时轮数")
+    parser.add_argument("--max-rounds", type=int, default=200, help="每个用例最多计时轮数")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个用例最少累计计时（秒）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="比较用的基线文件")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="中位数允许的相对回归幅度")
+    parser.add_argument("--save", default=None, help="将结果保存为基线文件")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    print(f"{'用例@客户端数':<40} {'中位数/次':>11} {'最小/次':>11} {'标准差':>11} {'轮数':>5}")
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in CASES:
+        if args.filter and args.filter not in case.name:
+            continue
+        for n in sizes:
+            key = result_key(case.name, n)
+            results[key] = measure(case, n, args.min_rounds, args.max_rounds, args.min_time)
+            compare({key: results[key]}, baseline, args.tolerance)
+            print_row(key, results[key])
+
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "host": {"platform": platform.platform(), "python": sys.version.split()[0],
+                         "cpu_count": os.cpu_count()},
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"基线已写入: {args.save}")
+    if regressions:
+        print(f"\n超出容差（+{args.tolerance:.0%}）的用例: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
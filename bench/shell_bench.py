@@ -0,0 +1,74 @@
+"""客户端短命令执行耗时对比：每条命令启动独立shell进程 vs 持久shell会话（仅Linux/macOS）
+
+分别用两种方式重复执行同一条短命令，报告每条命令从提交到读完输出的耗时
+（中位数/P95）。独立进程方式与 CommandExecutor._execute_regular_command 相同（shell=True、
+新进程组、管道读取），会话方式直接使用客户端的 ShellSession。
+
+用法：
+    python bench/shell_bench.py
+    python bench/shell_bench.py --command "echo hello" --count 500
+"""
+import os
+import sys
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "client"))
+
+from client import PROCESS_GROUP_OPTIONS, ShellSession  # noqa: E402
+
+
+def run_process(command: str) -> None:
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               **PROCESS_GROUP_OPTIONS)
+    process.communicate()
+
+
+def measure(run: Callable[[], None], count: int) -> Dict[str, float]:
+    """执行count次，返回每次耗时统计（毫秒）"""
+    run()  # 预热
+    timings: List[float] = []
+    for _ in range(count):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "total_s": sum(timings) / 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="短命令执行耗时对比")
+    parser.add_argument("--command", default="true", help="重复执行的命令")
+    parser.add_argument("--count", type=int, default=200, help="执行次数")
+    parser.add_argument("--shell", default="/bin/bash", help="持久会话使用的shell")
+    args = parser.parse_args()
+
+    if platform.system() == "Windows":
+        sys.exit("持久shell会话仅支持Linux/macOS")
+
+    session = ShellSession(args.shell, os.getcwd())
+    try:
+        results = {
+            "独立进程": measure(lambda: run_process(args.command), args.count),
+            "持久会话": measure(lambda: session.run(args.command, lambda text: None, 30), args.count),
+        }
+    finally:
+        session.close()
+
+    print(f"命令: {args.command}  次数: {args.count}")
+    print(f"{'方式':<10}{'中位数ms':>12}{'P95 ms':>12}{'总耗时s':>12}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['median_ms']:>12.2f}{result['p95_ms']:>12.2f}{result['total_s']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
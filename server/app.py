@@ -1,11 +1,23 @@
+import math
 import time
+import uuid
+import heapq
 import platform
+import atexit
 import logging
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
-from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO, emit, join_room, leave_room, Namespace
+import logging.handlers
+import argparse
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+from flask import Flask, Response, render_template, request, jsonify, session
+from flask_socketio import SocketIO, emit, join_room, leave_room, close_room, rooms, Namespace
 from config import *
+from cluster import create_cluster_manager
+from client_index import MEDIA_FIELDS, PREFIX_FIELDS, SORT_FIELDS, ClientIndex
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from profiler import HandlerProfiler
+from telemetry import TelemetryStore
+from transport import install_websocket_compression, serializer_options
 
 
 # ------------------------------
@@ -13,37 +25,143 @@ from config import *
 # ------------------------------
 CLIENT_TYPE_CLIENT = "clay-client"  # 客户端标识
 ROOM_WEB_CLIENTS = "web_clients"    # Web管理端房间名
+ROOM_TERMINAL_PREFIX = "terminal:"  # 单个客户端终端输出房间名前缀（打开该客户端终端的Web端加入）
 # 事件名称常量
 EVENT_SERVER_TIME = "server_time"
-EVENT_UPDATE_CLIENT_LIST = "update_client_list"
+EVENT_UPDATE_CLIENT_LIST = "update_client_list"  # 全量快照
+EVENT_CLIENT_LIST_DELTA = "client_list_delta"    # 增量变更
 EVENT_REGISTRATION_SUCCESS = "registration_success"
 EVENT_REGISTRATION_FAILED = "registration_failed"
+EVENT_TERMINAL_OUTPUT = "terminal_output"
+EVENT_SCREEN_FRAME = "screen_frame"
+EVENT_WEBCAM_FRAME = "webcam_frame"
+EVENT_TELEMETRY = "telemetry"
+# 客户端列表增量操作类型
+DELTA_OP_ADD = "add"
+DELTA_OP_UPDATE = "update"
+DELTA_OP_REMOVE = "remove"
+# 集群消息类型
+CLUSTER_KIND_HELLO = "hello"                  # 新进程加入，请求其他进程立即同步
+CLUSTER_KIND_SYNC = "sync"                    # 某进程本地客户端的全量列表
+CLUSTER_KIND_CLIENT_CHANGE = "client_change"  # 某进程本地客户端的单条变更
+CLUSTER_KIND_MEDIA = "media"                  # 媒体订阅变更
+CLUSTER_KIND_TERMINAL_REPLAY = "terminal_replay"  # 请求客户端所在进程向观看者回放终端输出
+CLUSTER_KIND_TELEMETRY = "telemetry"          # 某进程本地客户端的遥测样本
+
+
+def terminal_room(client_id: str) -> str:
+    """返回某客户端的终端输出房间名"""
+    return f"{ROOM_TERMINAL_PREFIX}{client_id}"
 
 
 # ------------------------------
-# 数据模型（使用dataclass提升类型安全和可读性）
+# 数据模型（__slots__记录，缓存序列化视图）
 # ------------------------------
-@dataclass
 class Client:
-    """客户端信息数据模型"""
-    id: str                  # 客户端唯一标识（SocketIO的sid）
-    address: str             # 客户端IP地址
-    hostname: str = "未知"    # 主机名
-    os: str = "未知"          # 操作系统信息
-    last_seen: float = 0.0   # 最后活动时间戳
-    connected_at: float = 0.0 # 连接时间戳
-    screen_active: bool = False  # 屏幕传输状态
-    webcam_active: bool = False  # 摄像头传输状态
-    last_screen: float = 0.0     # 最后一次屏幕传输时间戳
+    """客户端信息数据模型
+
+    使用__slots__减少每个客户端的内存占用；发送给Web端的视图按需构造并缓存，
+    只包含列表展示所需的字段，心跳更新last_seen不会使缓存失效。
+    主机名、操作系统和媒体状态须通过set_info/set_media修改，以便清除缓存。
+    """
+    __slots__ = ("id", "address", "hostname", "os", "last_seen", "connected_at",
+                 "screen_active", "webcam_active", "last_screen", "next_ack_at", "_view")
+    VIEW_FIELDS = ("id", "address", "hostname", "os", "connected_at", "screen_active", "webcam_active")
+
+    def __init__(self, id: str, address: str, hostname: str = "未知", os: str = "未知",
+                 last_seen: float = 0.0, connected_at: float = 0.0, screen_active: bool = False,
+                 webcam_active: bool = False, last_screen: float = 0.0):
+        self.id = id                        # 客户端唯一标识（SocketIO的sid）
+        self.address = address              # 客户端IP地址
+        self.hostname = hostname            # 主机名
+        self.os = os                        # 操作系统信息
+        self.last_seen = last_seen          # 最后活动时间戳
+        self.connected_at = connected_at    # 连接时间戳
+        self.screen_active = screen_active  # 屏幕传输状态
+        self.webcam_active = webcam_active  # 摄像头传输状态
+        self.last_screen = last_screen      # 最后一次屏幕传输时间戳
+        self.next_ack_at = 0.0              # 下一次回应心跳的时间
+        self._view: Optional[Dict[str, Any]] = None  # 缓存的序列化视图
+
+    def set_info(self, hostname: str, os_info: str) -> None:
+        """更新主机名与操作系统"""
+        self.hostname = hostname
+        self.os = os_info
+        self._view = None
+
+    def set_media(self, media_type: str, status: bool) -> bool:
+        """更新媒体传输状态，返回状态是否发生变化"""
+        if media_type == "screen":
+            changed = self.screen_active != status
+            self.screen_active = status
+        elif media_type == "webcam":
+            changed = self.webcam_active != status
+            self.webcam_active = status
+        else:
+            return False
+        if changed:
+            self._view = None
+        return changed
+
+    def view(self) -> Dict[str, Any]:
+        """获取发送给Web端的视图（缓存，调用方不得修改）"""
+        if self._view is None:
+            self._view = {field: getattr(self, field) for field in self.VIEW_FIELDS}
+        return self._view
 
 
 # ------------------------------
 # 全局状态管理（封装客户端数据操作）
 # ------------------------------
 class ClientManager:
-    """客户端连接管理类，封装客户端数据的增删改查"""
-    def __init__(self):
+    """客户端连接管理类，封装客户端数据的增删改查
+
+    超时检测使用按截止时间排序的最小堆：每个客户端在堆中只有一个有效条目，
+    心跳只推迟截止时间而不入堆，条目到期时再按实际截止时间惰性重新入堆；
+    截止时间提前（如媒体传输结束）时立即重新入堆，旧条目在出堆时丢弃。
+    """
+    def __init__(self, timeout_seconds: float, media_multiplier: float):
         self.clients: Dict[str, Client] = {}  # client_id -> Client
+        self.remote_owners: Dict[str, str] = {}  # 其他进程拥有的客户端副本 client_id -> host_id
+        self._snapshot_cache: Optional[Tuple[int, List[Dict[str, Any]]]] = None  # (版本号, 视图列表)
+        self.revision: int = 0  # 列表版本号，每次可见变更单调递增
+        self.instance_id = uuid.uuid4().hex[:12]  # 版本号所属的实例标识（进程重启后版本号从0开始）
+        self.index = ClientIndex()  # 查询索引（主机名/操作系统/连接时间/媒体状态）
+        self.timeout_seconds = timeout_seconds
+        self.media_multiplier = media_multiplier
+        self._deadlines: List[Tuple[float, str]] = []  # 最小堆 (截止时间, client_id)
+        self._armed: Dict[str, float] = {}  # client_id -> 堆中有效条目的截止时间
+        # 最近截止时间提前时的回调（用于唤醒超时检查任务）
+        self.on_earlier_deadline: Optional[Callable[[], None]] = None
+        # 传输层存活检查（截止时间到达时调用，返回True则视为仍然存活）
+        self.liveness_probe: Optional[Callable[[str], bool]] = None
+
+    def _bump_revision(self) -> int:
+        """递增列表版本号"""
+        self.revision += 1
+        return self.revision
+
+    def _deadline_of(self, client: Client) -> float:
+        """计算客户端的超时截止时间（媒体传输中延长超时）"""
+        if client.screen_active or client.webcam_active:
+            return client.last_seen + self.timeout_seconds * self.media_multiplier
+        return client.last_seen + self.timeout_seconds
+
+    def _arm_deadline(self, client_id: str, deadline: float, notify: bool = True) -> None:
+        """为客户端登记新的截止时间（旧条目自动失效）"""
+        self._armed[client_id] = deadline
+        heapq.heappush(self._deadlines, (deadline, client_id))
+        # 清理已失效的条目，避免堆无限增长
+        if len(self._deadlines) > 2 * len(self._armed) + 64:
+            self._deadlines = [(d, cid) for cid, d in self._armed.items()]
+            heapq.heapify(self._deadlines)
+        if notify and self.on_earlier_deadline and self._deadlines[0] == (deadline, client_id):
+            self.on_earlier_deadline()
+
+    def _discard_stale_heads(self) -> None:
+        """丢弃堆顶已失效的条目"""
+        while self._deadlines and self._armed.get(self._deadlines[0][1]) != self._deadlines[0][0]:
+            heapq.heappop(self._deadlines)
 
     def add_client(self, client_id: str, address: str) -> None:
         """添加新客户端"""
@@ -54,66 +172,429 @@ class ClientManager:
             last_seen=timestamp,
             connected_at=timestamp
         )
-        logger.debug(f"客户端已添加: {client_id}")
+        self._arm_deadline(client_id, timestamp + self.timeout_seconds)
+        self.index.add(self.clients[client_id])
+        self._bump_revision()
+        logger.debug("客户端已添加: %s", client_id)
 
-    def remove_client(self, client_id: str) -> None:
+    def remove_client(self, client_id: str) -> bool:
         """移除客户端"""
         if client_id in self.clients:
             del self.clients[client_id]
-            logger.debug(f"客户端已移除: {client_id}")
+            self._armed.pop(client_id, None)  # 堆中条目出堆时丢弃
+            self.remote_owners.pop(client_id, None)
+            self.index.remove(client_id)
+            self._bump_revision()
+            logger.debug("客户端已移除: %s", client_id)
+            return True
+        return False
 
     def update_client_info(self, client_id: str, hostname: str, os_info: str) -> bool:
         """更新客户端基本信息（主机名、操作系统）"""
         client = self.get_client(client_id)
         if not client:
             return False
-        client.hostname = hostname
-        client.os = os_info
+        client.set_info(hostname, os_info)
         client.last_seen = time.time()
+        self.index.add(client)
+        self._bump_revision()
         return True
 
-    def update_last_seen(self, client_id: str) -> bool:
-        """更新客户端最后活动时间"""
-        client = self.get_client(client_id)
-        if not client:
-            return False
-        client.last_seen = time.time()
-        return True
+    def update_last_seen(self, client_id: str) -> Optional[Client]:
+        """更新客户端最后活动时间（截止时间只会推迟，到期时惰性重新入堆），返回该客户端"""
+        client = self.clients.get(client_id)
+        if client is not None:
+            client.last_seen = time.time()
+        return client
 
     def update_media_status(self, client_id: str, media_type: str, status: bool) -> bool:
-        """更新客户端媒体传输状态（屏幕/摄像头）"""
+        """更新客户端媒体传输状态（屏幕/摄像头），返回状态是否发生变化"""
         client = self.get_client(client_id)
         if not client:
             return False
-        if media_type == "screen":
-            client.screen_active = status
-            if status:
-                client.last_screen = time.time()
-        elif media_type == "webcam":
-            client.webcam_active = status
-        return True
+        changed = client.set_media(media_type, status)
+        if media_type == "screen" and status:
+            client.last_screen = time.time()
+        if changed:
+            self.index.add(client)
+            self._bump_revision()
+            # 媒体传输结束会提前截止时间，需要立即重新入堆
+            deadline = self._deadline_of(client)
+            if deadline < self._armed.get(client_id, float("inf")):
+                self._arm_deadline(client_id, deadline)
+        return changed
+
+    def upsert_remote_client(self, host_id: str, data: Dict[str, Any]) -> Optional[str]:
+        """写入其他进程拥有的客户端副本，返回变更类型（仅活动时间变化时返回None）
+
+        副本不登记超时截止时间，由拥有该客户端的进程负责超时检测。
+        """
+        client_id = data["id"]
+        client = self.clients.get(client_id)
+        if client and client_id not in self.remote_owners:
+            return None  # 本进程的客户端以本地状态为准
+        new_client = Client(**data)
+        self.clients[client_id] = new_client
+        self.remote_owners[client_id] = host_id
+        if client and client.view() == new_client.view():
+            return None  # 视图不含活动时间戳，仅时间戳变化不视为列表变更
+        self.index.add(new_client)
+        self._bump_revision()
+        return DELTA_OP_UPDATE if client else DELTA_OP_ADD
+
+    def remote_client_ids(self, host_id: str) -> List[str]:
+        """获取某进程拥有的客户端ID"""
+        return [client_id for client_id, owner in self.remote_owners.items() if owner == host_id]
+
+    def get_local_clients(self) -> List[Dict[str, Any]]:
+        """获取本进程拥有的客户端视图列表"""
+        return [client.view() for client_id, client in self.clients.items()
+                if client_id not in self.remote_owners]
 
     def get_client(self, client_id: str) -> Optional[Client]:
         """获取单个客户端信息"""
         return self.clients.get(client_id)
 
     def get_all_clients(self) -> List[Dict[str, Any]]:
-        """获取所有客户端列表（转换为字典用于JSON序列化）"""
-        return [client.__dict__ for client in self.clients.values()]
-
-    def get_timeout_clients(self, now: float, timeout_threshold: int, media_multiplier: int) -> List[str]:
-        """获取超时客户端ID列表"""
-        timeout_ids = []
-        for client_id, client in self.clients.items():
-            # 基础超时判断
-            if now - client.last_seen > timeout_threshold:
-                # 媒体传输中延长超时
-                if (client.screen_active or client.webcam_active):
-                    if now - client.last_seen > timeout_threshold * media_multiplier:
-                        timeout_ids.append(client_id)
-                else:
-                    timeout_ids.append(client_id)
-        return timeout_ids
+        """获取所有客户端视图列表（按版本号缓存，列表无变更时直接复用）"""
+        if self._snapshot_cache is None or self._snapshot_cache[0] != self.revision:
+            self._snapshot_cache = (self.revision, [client.view() for client in self.clients.values()])
+        return self._snapshot_cache[1]
+
+    def query_clients(self, **query: Any) -> Dict[str, Any]:
+        """按索引查询一页客户端视图（参数见ClientIndex.query，不合法时抛出ValueError）"""
+        client_ids, total, next_cursor = self.index.query(**query)
+        return {
+            "clients": [self.clients[client_id].view() for client_id in client_ids],
+            "total": total,
+            "next_cursor": next_cursor
+        }
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """获取带版本号的客户端列表全量快照"""
+        return {
+            "revision": self.revision,
+            "clients": self.get_all_clients()
+        }
+
+    def build_change(self, op: str, client_id: str) -> Dict[str, Any]:
+        """构造单条客户端列表变更（记录产生该变更时的版本号）"""
+        change: Dict[str, Any] = {"op": op, "id": client_id, "revision": self.revision}
+        if op != DELTA_OP_REMOVE:
+            client = self.get_client(client_id)
+            if client:
+                change["client"] = client.view()
+        return change
+
+    def next_deadline(self) -> Optional[float]:
+        """获取最近的超时截止时间"""
+        self._discard_stale_heads()
+        return self._deadlines[0][0] if self._deadlines else None
+
+    def pop_timeout_clients(self, now: float) -> List[Client]:
+        """移除并返回所有已超时的客户端，复杂度 O(超时数 · log N)"""
+        expired: List[Client] = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, client_id = heapq.heappop(self._deadlines)
+            if self._armed.get(client_id) != deadline:
+                continue  # 已失效的条目
+            client = self.clients.get(client_id)
+            if not client:
+                self._armed.pop(client_id, None)
+                continue
+            actual_deadline = self._deadline_of(client)
+            if actual_deadline <= now and self.liveness_probe and self.liveness_probe(client_id):
+                # 期间没有消息，但传输层ping/pong正常
+                client.last_seen = now
+                actual_deadline = self._deadline_of(client)
+            if actual_deadline > now:
+                # 期间有活动，按实际截止时间重新入堆
+                self._arm_deadline(client_id, actual_deadline, notify=False)
+                continue
+            self.remove_client(client_id)
+            expired.append(client)
+        return expired
+
+
+class ClientListDeltaBuilder:
+    """将一批客户端列表变更合并为一条增量消息（按房间记录已发送的版本号）
+
+    同一客户端的多次变更已在调度器中按键合并，只保留最新一条，被合并掉的中间版本不会出现在批次中，
+    因此base_revision取该房间上一条增量的revision（首条取本批最小版本号减一），
+    使相邻增量首尾相接，浏览器不会因版本号空缺而请求全量快照。
+    """
+    def __init__(self):
+        self.last_revision: Dict[str, int] = {}  # 房间 -> 已发送的最新版本号
+
+    def __call__(self, room: str, changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        changes = sorted(changes, key=lambda change: change["revision"])
+        base_revision = changes[0]["revision"] - 1
+        if room in self.last_revision:
+            base_revision = min(base_revision, self.last_revision[room])
+        self.last_revision[room] = changes[-1]["revision"]
+        return {
+            "base_revision": base_revision,
+            "revision": changes[-1]["revision"],
+            "changes": changes
+        }
+
+
+# ------------------------------
+# 广播调度（按房间合并事件，定时批量发送）
+# ------------------------------
+class BroadcastScheduler:
+    """广播调度器：缓存各房间待发送的事件，每个刷新周期合并为一次emit"""
+    def __init__(self, sio: SocketIO, flush_interval: float, max_batch_size: int):
+        self.socketio = sio
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        # (room, event) -> 有序的待发送条目（key -> item）
+        self._pending: Dict[Tuple[str, str], "OrderedDict[Any, Any]"] = {}
+        # event -> 批量负载构造函数 (room, 条目列表) -> 负载（默认直接发送条目列表）
+        self._builders: Dict[str, Callable[[str, List[Any]], Any]] = {}
+        self._local_events: Set[str] = set()  # 只发给本进程连接的事件（不经消息队列）
+        self._sequence = 0
+        self._started = False
+
+    def register(self, event: str, builder: Callable[[str, List[Any]], Any], local: bool = False) -> None:
+        """为事件注册批量负载构造函数；local为True时只发给本进程的连接"""
+        self._builders[event] = builder
+        if local:
+            self._local_events.add(event)
+
+    def schedule(self, room: str, event: str, item: Any, key: Any = None) -> None:
+        """加入待发送队列；指定key时同一周期内的旧条目会被新条目替换"""
+        if not self._started:
+            self.start()
+        queue = self._pending.get((room, event))
+        if queue is None:
+            queue = self._pending[(room, event)] = OrderedDict()
+        if key is None:
+            self._sequence += 1
+            key = ("_seq", self._sequence)
+        else:
+            queue.pop(key, None)  # 合并：保留最新条目并移到队尾
+        queue[key] = item
+
+    def flush(self) -> None:
+        """立即发送所有待发送条目"""
+        pending, self._pending = self._pending, {}
+        for (room, event), queue in pending.items():
+            items = list(queue.values())
+            builder = self._builders.get(event)
+            for start in range(0, len(items), self.max_batch_size):
+                batch = items[start:start + self.max_batch_size]
+                try:
+                    started = time.perf_counter()
+                    self.socketio.emit(event, builder(room, batch) if builder else batch, room=room,
+                                       ignore_queue=event in self._local_events)
+                    metric_emit_seconds.observe(time.perf_counter() - started, event)
+                except Exception as e:
+                    logger.error(f"批量广播错误: {event} -> {room}: {str(e)}", exc_info=True)
+
+    def start(self) -> None:
+        """启动后台刷新任务"""
+        if not self._started:
+            self._started = True
+            self.socketio.start_background_task(self._run)
+
+    def _run(self) -> None:
+        """后台刷新任务"""
+        logger.info(f"广播调度任务已启动，间隔: {self.flush_interval}秒，最大批量: {self.max_batch_size}")
+        while True:
+            if self._pending:
+                self.flush()
+            self.socketio.sleep(self.flush_interval)
+
+
+# ------------------------------
+# 媒体帧分发（按观看者订阅，最新帧优先）
+# ------------------------------
+class ViewerSlot:
+    """单个观看者的发送槽位：最多一帧在途、每路媒体最多一帧待发"""
+    def __init__(self):
+        self.in_flight = False
+        self.sent_at = 0.0
+        self.pending: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()  # (client_id, event) -> 帧
+        self.dropped = 0  # 被新帧覆盖而丢弃的帧数
+
+
+class FrameRelay:
+    """媒体帧分发器：只向订阅了该客户端的观看者发送帧
+
+    每次发送都附带确认回调，浏览器确认前（连接积压时）到达的新帧只覆盖待发槽位，
+    旧帧直接丢弃，因此每个观看者的内存占用有上界，慢观看者也不会拖慢其他观看者。
+    """
+    def __init__(self, sio: SocketIO, ack_timeout: float):
+        self.socketio = sio
+        self.ack_timeout = ack_timeout
+        self.viewers: Dict[str, Set[str]] = {}        # client_id -> 观看者sid集合
+        self.subscriptions: Dict[str, Set[str]] = {}  # 观看者sid -> client_id集合
+        self._slots: Dict[str, ViewerSlot] = {}        # 观看者sid -> 发送槽位
+
+    def subscribe(self, viewer_id: str, client_id: str) -> None:
+        """观看者订阅客户端的媒体帧"""
+        self.viewers.setdefault(client_id, set()).add(viewer_id)
+        self.subscriptions.setdefault(viewer_id, set()).add(client_id)
+        self._slots.setdefault(viewer_id, ViewerSlot())
+
+    def unsubscribe(self, viewer_id: str, client_id: str) -> None:
+        """观看者取消订阅客户端的媒体帧"""
+        viewers = self.viewers.get(client_id)
+        if viewers:
+            viewers.discard(viewer_id)
+            if not viewers:
+                del self.viewers[client_id]
+        client_ids = self.subscriptions.get(viewer_id)
+        if client_ids:
+            client_ids.discard(client_id)
+            if not client_ids:
+                self.remove_viewer(viewer_id)
+                return
+        slot = self._slots.get(viewer_id)
+        if slot:
+            for key in [key for key in slot.pending if key[0] == client_id]:
+                del slot.pending[key]
+
+    def remove_viewer(self, viewer_id: str) -> None:
+        """移除观看者（断开连接时）"""
+        for client_id in self.subscriptions.pop(viewer_id, set()):
+            viewers = self.viewers.get(client_id)
+            if viewers:
+                viewers.discard(viewer_id)
+                if not viewers:
+                    del self.viewers[client_id]
+        self._slots.pop(viewer_id, None)
+
+    def remove_client(self, client_id: str) -> None:
+        """被控客户端断开时清除其所有订阅"""
+        for viewer_id in list(self.viewers.get(client_id, ())):
+            self.unsubscribe(viewer_id, client_id)
+
+    def publish(self, client_id: str, event: str, frame: Dict[str, Any]) -> int:
+        """向所有订阅者投递一帧，返回观看者数量"""
+        viewers = self.viewers.get(client_id)
+        if not viewers:
+            return 0
+        now = time.time()
+        for viewer_id in viewers:
+            slot = self._slots[viewer_id]
+            if slot.pending.pop((client_id, event), None) is not None:
+                slot.dropped += 1  # 最新帧覆盖未发送的旧帧
+                metric_frames_dropped.inc(event)
+            slot.pending[(client_id, event)] = frame
+            if slot.in_flight and now - slot.sent_at > self.ack_timeout:
+                slot.in_flight = False  # 确认超时，不再等待
+            if not slot.in_flight:
+                self._send_next(viewer_id, slot)
+        return len(viewers)
+
+    def _send_next(self, viewer_id: str, slot: ViewerSlot) -> None:
+        """发送槽位中最早的待发帧，并等待浏览器确认"""
+        if not slot.pending:
+            return
+        (_, event), frame = slot.pending.popitem(last=False)
+        slot.in_flight = True
+        slot.sent_at = time.time()
+        started = time.perf_counter()
+        self.socketio.emit(event, frame, to=viewer_id,
+                           callback=lambda *args: self._on_ack(viewer_id))
+        metric_emit_seconds.observe(time.perf_counter() - started, event)
+        metric_relayed_bytes.inc(event, amount=len(frame["image_data"]))
+
+    def _on_ack(self, viewer_id: str) -> None:
+        """浏览器确认收到帧后发送下一帧"""
+        slot = self._slots.get(viewer_id)
+        if slot:
+            slot.in_flight = False
+            self._send_next(viewer_id, slot)
+
+
+# ------------------------------
+# 终端输出历史（按客户端保留最近的输出分块，新订阅者回放）
+# ------------------------------
+class ClientOutputHistory:
+    """单个客户端的输出分块（按到达顺序），并按命令ID计数"""
+    __slots__ = ("chunks", "bytes", "commands")
+
+    def __init__(self):
+        self.chunks: "deque[Tuple[int, Dict[str, Any]]]" = deque()  # (占用字节数, 分块)
+        self.bytes = 0
+        self.commands: "OrderedDict[Optional[str], int]" = OrderedDict()  # command_id -> 分块数
+
+
+class OutputHistory:
+    """终端输出历史：每个客户端一个有界环形缓冲，所有客户端共享总内存上限
+
+    单个客户端超出上限时丢弃其最早的分块；总量超出上限时，从最久没有新输出的客户端开始丢弃。
+    分块按原样保存（与转发给Web端的数据相同），回放时可只取某条命令的输出。
+    """
+    CHUNK_OVERHEAD = 128  # 每个分块除输出文本外的估算开销（字节）
+
+    def __init__(self, max_bytes_per_client: int, max_bytes: int):
+        self.max_bytes_per_client = max_bytes_per_client
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._clients: "OrderedDict[str, ClientOutputHistory]" = OrderedDict()  # 按最近写入排序
+
+    def append(self, client_id: str, chunk: Dict[str, Any]) -> None:
+        """记录一个输出分块"""
+        history = self._clients.get(client_id)
+        if history is None:
+            history = self._clients[client_id] = ClientOutputHistory()
+        else:
+            self._clients.move_to_end(client_id)
+        size = len(chunk.get("output") or "") + self.CHUNK_OVERHEAD
+        command_id = chunk.get("command_id")
+        history.chunks.append((size, chunk))
+        history.bytes += size
+        history.commands[command_id] = history.commands.get(command_id, 0) + 1
+        self.total_bytes += size
+
+        while history.bytes > self.max_bytes_per_client and len(history.chunks) > 1:
+            self._evict_oldest(history)
+        while self.total_bytes > self.max_bytes and self._clients:
+            oldest_id, oldest = next(iter(self._clients.items()))
+            if oldest is history and len(history.chunks) == 1:
+                break  # 只剩刚写入的分块
+            self._evict_oldest(oldest)
+            if not oldest.chunks:
+                del self._clients[oldest_id]
+
+    def _evict_oldest(self, history: ClientOutputHistory) -> None:
+        """丢弃某客户端最早的分块"""
+        size, chunk = history.chunks.popleft()
+        history.bytes -= size
+        self.total_bytes -= size
+        command_id = chunk.get("command_id")
+        remaining = history.commands[command_id] - 1
+        if remaining:
+            history.commands[command_id] = remaining
+        else:
+            del history.commands[command_id]
+        metric_history_evicted.inc()
+
+    def replay(self, client_id: str, command_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取某客户端保留的输出分块（可只取某条命令的输出）"""
+        history = self._clients.get(client_id)
+        if not history:
+            return []
+        if command_id is None:
+            return [chunk for _, chunk in history.chunks]
+        if command_id not in history.commands:
+            return []
+        return [chunk for _, chunk in history.chunks if chunk.get("command_id") == command_id]
+
+    def command_ids(self, client_id: str) -> List[Optional[str]]:
+        """获取某客户端保留了输出的命令ID（按首次输出顺序）"""
+        history = self._clients.get(client_id)
+        return list(history.commands) if history else []
+
+    def remove_client(self, client_id: str) -> None:
+        """客户端断开时释放其历史（重连后sid不同，旧历史不再可达）"""
+        history = self._clients.pop(client_id, None)
+        if history:
+            self.total_bytes -= history.bytes
 
 
 # ------------------------------
@@ -127,6 +608,9 @@ app.config.update(
     MAX_CONTENT_LENGTH=MAX_CONTENT_LENGTH
 )
 
+# 多进程部署时的消息队列后端（房间消息、跨进程发送与集群同步）
+cluster_manager = create_cluster_manager(CLUSTER_MESSAGE_QUEUE, CLUSTER_CHANNEL) if CLUSTER_MESSAGE_QUEUE else None
+
 # 初始化SocketIO
 socketio = SocketIO(
     app,
@@ -134,22 +618,195 @@ socketio = SocketIO(
     cors_allowed_origins=SOCKETIO_CORS_ALLOWED_ORIGINS,
     ping_timeout=SOCKETIO_PING_TIMEOUT,
     ping_interval=SOCKETIO_PING_INTERVAL,
-    max_http_buffer_size=SOCKETIO_MAX_HTTP_BUFFER_SIZE
+    max_http_buffer_size=SOCKETIO_MAX_HTTP_BUFFER_SIZE,
+    client_manager=cluster_manager,
+    http_compression=SOCKETIO_COMPRESSION,
+    compression_threshold=SOCKETIO_COMPRESSION_THRESHOLD,
+    **serializer_options(SOCKETIO_SERIALIZER)
 )
+install_websocket_compression(socketio.server.eio, SOCKETIO_COMPRESSION, SOCKETIO_COMPRESSION_THRESHOLD,
+                              SOCKETIO_COMPRESS_BINARY)
 
-# 初始化客户端管理器
-client_manager = ClientManager()
-
-# 配置日志
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format=LOG_FORMAT,
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+# 初始化客户端管理器（最近截止时间提前时唤醒超时检查任务）
+client_manager = ClientManager(CLIENT_TIMEOUT_SECONDS, CLIENT_MEDIA_TIMEOUT_MULTIPLIER)
+timeout_wakeup = socketio.server.eio.create_event()
+client_manager.on_earlier_deadline = timeout_wakeup.set
+
+# 初始化广播调度器
+broadcast_scheduler = BroadcastScheduler(socketio, BROADCAST_FLUSH_INTERVAL, BROADCAST_MAX_BATCH_SIZE)
+# 各进程独立维护列表版本号，增量只发给本进程的Web端
+broadcast_scheduler.register(EVENT_CLIENT_LIST_DELTA, ClientListDeltaBuilder(), local=True)
+
+# 初始化媒体帧分发器
+frame_relay = FrameRelay(socketio, MEDIA_ACK_TIMEOUT)
+
+# 初始化终端输出历史
+output_history = OutputHistory(TERMINAL_HISTORY_MAX_BYTES_PER_CLIENT, TERMINAL_HISTORY_MAX_BYTES)
+
+# 初始化遥测存储
+telemetry_store = TelemetryStore(TELEMETRY_RESOLUTIONS)
+
+# ------------------------------
+# 日志（队列异步写入，热路径不等待磁盘）
+# ------------------------------
+def _native_modules() -> Tuple[Any, Any]:
+    """获取未被协程库替换的threading与queue模块（日志必须在真实线程中写入磁盘）"""
+    try:
+        from eventlet.patcher import original
+        return original("threading"), original("queue")
+    except ImportError:
+        import threading, queue
+        return threading, queue
+
+
+_native_threading, _native_queue = _native_modules()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """日志入队处理器：只把日志记录放入队列，格式化与写入都在后台线程完成；积压超出上限时丢弃"""
+    def __init__(self, log_queue: Any, max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0  # 因队列积压被丢弃的日志条数
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同一进程内传递，无需提前格式化（%-参数在后台线程中展开）
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class NativeQueueListener(logging.handlers.QueueListener):
+    """在真实线程中运行的日志监听器（eventlet打补丁后默认线程会变成协程）"""
+    def start(self) -> None:
+        self._thread = _native_threading.Thread(target=self._monitor, name="log-writer", daemon=True)
+        self._thread.start()
+
+
+class LogSampler:
+    """高频事件日志采样：同一键在采样间隔内只记录一条，并附带期间省略的条数"""
+    def __init__(self, target_logger: logging.Logger, interval: float, max_keys: int = 4096):
+        self.logger = target_logger
+        self.interval = interval
+        self.max_keys = max_keys
+        self._next_at: Dict[Any, float] = {}  # 键 -> 下一次允许记录的时间
+        self._skipped: Dict[Any, int] = {}    # 键 -> 本间隔内省略的条数
+
+    def info(self, key: Any, msg: str, *args: Any) -> None:
+        """按键采样记录INFO日志"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        now = time.monotonic()
+        if now < self._next_at.get(key, 0.0):
+            self._skipped[key] = self._skipped.get(key, 0) + 1
+            return
+        if key not in self._next_at and len(self._next_at) >= self.max_keys:
+            self._prune(now)
+        self._next_at[key] = now + self.interval
+        skipped = self._skipped.pop(key, 0)
+        if skipped:
+            msg += " (此前%d秒内省略%d条)"
+            args += (self.interval, skipped)
+        self.logger.info(msg, *args)
+
+    def _prune(self, now: float) -> None:
+        """清理已过期的键（如已断开客户端的键）"""
+        for key in [key for key, next_at in self._next_at.items() if next_at <= now]:
+            del self._next_at[key]
+            self._skipped.pop(key, None)
+
+
+def setup_logging() -> NativeQueueListener:
+    """配置日志：根记录器只入队，后台线程写入控制台与按大小轮转的日志文件"""
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = _native_queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, LOG_LEVEL))
+    root_logger.addHandler(DroppingQueueHandler(log_queue, LOG_QUEUE_SIZE))
+
+    listener = NativeQueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # 退出前写完队列中剩余的日志
+    return listener
+
+
+log_listener = setup_logging()
 logger = logging.getLogger(__name__)
+log_sampler = LogSampler(logger, LOG_SAMPLE_INTERVAL)
+
+
+# ------------------------------
+# 运行指标（/metrics导出）
+# ------------------------------
+metrics_registry = MetricsRegistry()
+metric_events = metrics_registry.counter(
+    "clay_events_total", "收到的Socket.IO事件数（没有处理函数的事件计入other）", ["event"])
+METRIC_EVENT_OTHER = "other"  # 未知事件的统一标签，避免客户端发送的任意事件名产生无限多的时间序列
+metric_relayed_bytes = metrics_registry.counter(
+    "clay_relayed_bytes_total", "转发给Web端的数据量（媒体帧按字节、终端输出按字符计）", ["event"])
+metric_frames_dropped = metrics_registry.counter(
+    "clay_media_frames_dropped_total", "观看者积压时被新帧覆盖而丢弃的媒体帧数", ["event"])
+metric_emit_seconds = metrics_registry.histogram(
+    "clay_emit_duration_seconds", "单次emit耗时（秒）", ["event"])
+metric_timeout_sweeps = metrics_registry.counter(
+    "clay_timeout_sweeps_total", "超时检查执行次数")
+metric_client_timeouts = metrics_registry.counter(
+    "clay_client_timeouts_total", "因超时被移除的客户端数")
+metric_history_evicted = metrics_registry.counter(
+    "clay_terminal_history_evicted_total", "因内存上限被丢弃的终端输出历史分块数")
+metric_interrupt_seconds = metrics_registry.histogram(
+    "clay_command_interrupt_seconds", "命令中断耗时（秒），从服务器转发中断请求到客户端确认进程已终止/已取消", ["state"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+metric_loop_lag = metrics_registry.histogram(
+    "clay_loop_lag_seconds", "事件循环延迟（秒），即定时唤醒比预期晚的时间",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+metrics_registry.gauge(
+    "clay_connected_clients", "连接到本进程的被控客户端数",
+    lambda: len(client_manager.clients) - len(client_manager.remote_owners))
+metrics_registry.gauge(
+    "clay_cluster_replica_clients", "其他进程拥有的客户端副本数",
+    lambda: len(client_manager.remote_owners))
+metrics_registry.gauge(
+    "clay_web_sessions", "连接到本进程的Web管理端数",
+    lambda: len(socketio.server.manager.rooms.get("/", {}).get(ROOM_WEB_CLIENTS, {})))
+metrics_registry.gauge(
+    "clay_media_viewers", "订阅了媒体帧的观看者数",
+    lambda: len(frame_relay.subscriptions))
+metrics_registry.gauge(
+    "clay_terminal_history_bytes", "终端输出历史占用的估算内存（字节）",
+    lambda: output_history.total_bytes)
+metrics_registry.gauge(
+    "clay_telemetry_clients", "保存了遥测数据的客户端数",
+    lambda: len(telemetry_store))
+metrics_registry.gauge(
+    "clay_telemetry_bytes", "遥测存储占用的内存（字节，环形缓冲区预分配）",
+    lambda: telemetry_store.total_bytes)
+
+
+# 性能剖析器（可选，开启后包装所有事件处理函数）
+profiler = HandlerProfiler(PROFILER_WINDOW, PROFILER_SLOW_SAMPLES) if PROFILING_ENABLED else None
+
+
+def monitor_loop_lag() -> None:
+    """事件循环延迟探测：定时休眠，实际唤醒时间比预期晚的部分即为循环被阻塞的时间"""
+    while True:
+        started = time.perf_counter()
+        socketio.sleep(LOOP_LAG_PROBE_INTERVAL)
+        lag = max(time.perf_counter() - started - LOOP_LAG_PROBE_INTERVAL, 0.0)
+        metric_loop_lag.observe(lag)
+        if profiler:
+            profiler.record_lag(lag)
 
 
 # ------------------------------
@@ -161,26 +818,154 @@ def index() -> str:
     if request.method == "POST":
         password = request.form.get("password", "")
         if password == ADMIN_PASSWORD:
-            return render_template("index.html")
+            session["is_admin"] = True
+            return render_template("index.html", terminal_scrollback=TERMINAL_SCROLLBACK_LINES,
+                                   socketio_serializer=SOCKETIO_SERIALIZER)
         return render_template("login.html", error="密码错误")
     return render_template("login.html")
 
 
+def parse_client_query(args: Any) -> Dict[str, Any]:
+    """解析客户端查询参数，不合法时抛出ValueError"""
+    query: Dict[str, Any] = {
+        "prefixes": {field: args[field] for field in PREFIX_FIELDS if args.get(field)},
+        "media": {},
+        "sort": args.get("sort", "connected_at"),
+        "descending": args.get("order", "asc") == "desc",
+        "cursor": args.get("cursor") or None,
+        "limit": None
+    }
+    if args.get("order", "asc") not in ("asc", "desc"):
+        raise ValueError("order只能为asc或desc")
+    for field in MEDIA_FIELDS:
+        value = args.get(field)
+        if value is None:
+            continue
+        if value.lower() not in ("1", "true", "0", "false"):
+            raise ValueError(f"{field}只能为1/0/true/false")
+        query["media"][field] = value.lower() in ("1", "true")
+    if "limit" in args:
+        try:
+            query["limit"] = min(int(args["limit"]), CLIENT_QUERY_MAX_LIMIT)
+        except ValueError:
+            raise ValueError("limit必须为正整数")
+    return query
+
+
 @app.route("/api/clients", methods=["GET"])
 def api_get_clients() -> jsonify:
-    """API接口：获取客户端列表"""
+    """API接口：查询客户端列表
+
+    查询参数（均可选，不带参数时返回全部客户端）：
+        hostname / os: 前缀搜索（不区分大小写）
+        screen_active / webcam_active: 按媒体状态过滤（1/0）
+        sort: hostname / os / connected_at（默认）；order: asc（默认）/ desc
+        limit: 每页条数（上限CLIENT_QUERY_MAX_LIMIT）；cursor: 上一页返回的next_cursor
+    列表版本号未变化时，携带If-None-Match的请求返回304。
+    """
+    etag = f"{client_manager.instance_id}-{client_manager.revision}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        if request.args:
+            try:
+                result = client_manager.query_clients(**parse_client_query(request.args))
+            except ValueError as e:
+                return jsonify({"success": False, "message": str(e)}), 400
+        else:
+            clients = client_manager.get_all_clients()
+            result = {"clients": clients, "total": len(clients), "next_cursor": None}
+        response = jsonify({"success": True, "revision": client_manager.revision, **result})
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def parse_telemetry_query(args: Any) -> Dict[str, Any]:
+    """解析遥测查询参数，不合法时抛出ValueError"""
+    query: Dict[str, Any] = {}
+    for name in ("resolution", "since", "until", "range"):
+        if args.get(name):
+            try:
+                query[name] = int(args[name]) if name == "resolution" else float(args[name])
+            except ValueError:
+                raise ValueError(f"{name}必须为数字")
+            if not math.isfinite(query[name]):
+                raise ValueError(f"{name}必须为有限数值")
+    now = time.time()
+    if "range" in query:
+        window = query.pop("range")
+        if window <= 0:
+            raise ValueError("range必须为正数")
+        query.setdefault("since", now - window)
+    query["now"] = now
+    return query
+
+
+@app.route("/api/telemetry", methods=["GET"])
+def api_get_telemetry() -> jsonify:
+    """API接口：所有客户端的最新遥测样本（values按fields顺序）"""
     return jsonify({
         "success": True,
-        "clients": client_manager.get_all_clients()
+        "fields": list(telemetry_store.fields),
+        "resolutions": [resolution for resolution, _ in telemetry_store.resolutions],
+        "clients": telemetry_store.latest()
     })
 
 
+@app.route("/api/clients/<client_id>/telemetry", methods=["GET"])
+def api_get_client_telemetry(client_id: str) -> jsonify:
+    """API接口：查询客户端的遥测时间序列（只读服务器存储，不访问客户端）
+
+    查询参数（均可选）：
+        resolution: 分辨率秒数（TELEMETRY_RESOLUTIONS之一），不指定时选择能覆盖查询范围的最细分辨率
+        since / until: 起止时间（Unix时间戳，秒）；range: 最近多少秒（代替since）
+    """
+    if not client_manager.get_client(client_id) and client_id not in telemetry_store.clients:
+        return jsonify({"success": False, "message": f"客户端 {client_id} 不存在或已断开"}), 404
+    try:
+        series = telemetry_store.query(client_id, **parse_telemetry_query(request.args))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "client_id": client_id,
+        "resolutions": [resolution for resolution, _ in telemetry_store.resolutions],
+        "telemetry": series
+    })
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics() -> Response:
+    """运行指标（Prometheus文本格式）"""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile() -> jsonify:
+    """性能剖析报告（仅管理员，?reset=1 在输出后清空数据）"""
+    if not session.get("is_admin"):
+        return jsonify({"success": False, "message": "需要管理员登录"}), 403
+    if profiler is None:
+        return jsonify({"success": False, "message": "性能剖析未开启（PROFILING_ENABLED）"}), 404
+    report = profiler.report()
+    if request.args.get("reset"):
+        profiler.reset()
+    return jsonify({"success": True, "report": report})
+
+
 # ------------------------------
 # SocketIO事件处理（使用类封装，结构更清晰）
 # ------------------------------
 class MainNamespace(Namespace):
     """主命名空间，集中处理所有SocketIO事件"""
 
+    def trigger_event(self, event: str, *args: Any) -> Any:
+        """所有事件的统一入口：收到客户端的任何消息都视为存活（args[0]为sid）"""
+        client_manager.update_last_seen(args[0])
+        metric_events.inc(event if hasattr(self, "on_" + event) else METRIC_EVENT_OTHER)
+        return super().trigger_event(event, *args)
+
     def on_connect(self) -> None:
         """处理新连接"""
         client_id = request.sid
@@ -190,17 +975,17 @@ class MainNamespace(Namespace):
         try:
             if client_type == CLIENT_TYPE_CLIENT:
                 # 客户端连接处理
-                logger.info(f"客户端连接: ID={client_id}, IP={client_address}")
+                logger.info("客户端连接: ID=%s, IP=%s", client_id, client_address)
                 client_manager.add_client(client_id, client_address)
-                self._broadcast_client_list()  # 广播客户端列表更新
+                self._broadcast_client_delta(DELTA_OP_ADD, client_id)  # 广播客户端列表增量
                 # 发送服务器时间同步
                 emit(EVENT_SERVER_TIME, {"timestamp": time.time()}, room=client_id)
             else:
                 # Web管理端连接处理
-                logger.info(f"Web界面连接: ID={client_id}, IP={client_address}")
+                logger.info("Web界面连接: ID=%s, IP=%s", client_id, client_address)
                 join_room(ROOM_WEB_CLIENTS)
-                # 发送当前客户端列表
-                emit(EVENT_UPDATE_CLIENT_LIST, client_manager.get_all_clients(), room=client_id)
+                # 发送当前客户端列表快照
+                emit(EVENT_UPDATE_CLIENT_LIST, client_manager.get_snapshot(), room=client_id)
 
         except Exception as e:
             logger.error(f"连接处理错误: {str(e)}", exc_info=True)  # 记录堆栈信息，便于调试
@@ -213,11 +998,22 @@ class MainNamespace(Namespace):
 
         try:
             if client:
-                logger.info(f"客户端断开连接: ID={client_id}, 主机名={client.hostname}")
+                logger.info("客户端断开连接: ID=%s, 主机名=%s", client_id, client.hostname)
                 client_manager.remove_client(client_id)
-                self._broadcast_client_list()
+                frame_relay.remove_client(client_id)
+                output_history.remove_client(client_id)
+                telemetry_store.remove_client(client_id)
+                close_room(terminal_room(client_id))
+                self._broadcast_client_delta(DELTA_OP_REMOVE, client_id)
+            elif ROOM_WEB_CLIENTS in rooms():
+                # Web管理端连接时加入ROOM_WEB_CLIENTS，断开事件处理完之前仍在房间中
+                logger.info("Web界面断开连接: ID=%s", client_id)
+                subscribed = client_id in frame_relay.subscriptions
+                frame_relay.remove_viewer(client_id)
+                if subscribed:
+                    publish_cluster(CLUSTER_KIND_MEDIA, op="remove_viewer", viewer_id=client_id)
             else:
-                logger.warning(f"未知客户端断开连接: ID={client_id}")
+                logger.warning("未知客户端断开连接: ID=%s", client_id)
 
         except Exception as e:
             logger.error(f"断开连接处理错误: {str(e)}", exc_info=True)
@@ -230,102 +1026,114 @@ class MainNamespace(Namespace):
 
         try:
             if not client_manager.get_client(client_id):
-                logger.warning(f"无效注册尝试: 客户端 {client_id} 未连接")
+                logger.warning("无效注册尝试: 客户端 %s 未连接", client_id)
                 emit(EVENT_REGISTRATION_FAILED, {"message": "无效的客户端连接"}, room=client_id)
                 return
 
             # 更新客户端信息
             client_manager.update_client_info(client_id, hostname, os_info)
-            logger.info(f"客户端注册完成: ID={client_id}, 主机名={hostname}, 操作系统={os_info}")
-            self._broadcast_client_list()
+            logger.info("客户端注册完成: ID=%s, 主机名=%s, 操作系统=%s", client_id, hostname, os_info)
+            self._broadcast_client_delta(DELTA_OP_UPDATE, client_id)
             emit(EVENT_REGISTRATION_SUCCESS, {"message": "注册成功"}, room=client_id)
 
         except Exception as e:
             logger.error(f"注册处理错误: {str(e)}", exc_info=True)
             emit(EVENT_REGISTRATION_FAILED, {"message": str(e)}, room=client_id)
 
-    def on_heartbeat(self, data: Dict[str, Any]) -> None:
-        """处理客户端心跳（维持连接）"""
+    def on_heartbeat(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """处理客户端心跳（可选，活动时间已在trigger_event中刷新，这里只按间隔回应）"""
         client_id = request.sid
         try:
-            if client_manager.get_client(client_id):
-                client_manager.update_last_seen(client_id)
-                # 每5秒回应一次心跳
-                if time.time() % 5 < 1:
-                    emit("heartbeat_ack", {"timestamp": time.time()}, room=client_id)
-            else:
-                logger.warning(f"未知客户端心跳: ID={client_id}, 请求重新注册")
+            client = client_manager.get_client(client_id)
+            if client is None:
+                logger.warning("未知客户端心跳: ID=%s, 请求重新注册", client_id)
                 emit("request_register", {"reason": "客户端未注册"}, room=client_id)
+            elif client.last_seen >= client.next_ack_at:
+                client.next_ack_at = client.last_seen + HEARTBEAT_ACK_INTERVAL
+                emit("heartbeat_ack", {"timestamp": client.last_seen}, room=client_id)
 
         except Exception as e:
             logger.error(f"心跳处理错误: {str(e)}", exc_info=True)
 
-    def on_terminal_output(self, data: Dict[str, str]) -> None:
-        """处理终端输出并转发给Web管理端"""
+    def on_terminal_output(self, data: Dict[str, Any]) -> None:
+        """转发终端输出分块给打开了该客户端终端的Web端（客户端已按块合并，服务器不解析内容）"""
         client_id = request.sid
-        output = data.get("output", "")
 
         try:
-            if not output:
-                logger.warning(f"空终端输出来自 {client_id}")
-                return
-
-            logger.info(f"终端输出来自 {client_id}: {output.strip()[:100]}...")
-            # 转发给所有Web客户端
-            emit("terminal_output", {
-                "client_id": client_id,
-                "output": output,
-                "timestamp": time.time()
-            }, room=ROOM_WEB_CLIENTS)
+            data["client_id"] = client_id
+            output_history.append(client_id, data)
+            broadcast_scheduler.schedule(terminal_room(client_id), EVENT_TERMINAL_OUTPUT, data)
+            metric_relayed_bytes.inc(EVENT_TERMINAL_OUTPUT, amount=len(data.get("output") or ""))
 
         except Exception as e:
             logger.error(f"终端输出处理错误: {str(e)}", exc_info=True)
 
-    def on_webcam_frame(self, data: Dict[str, str]) -> None:
-        """处理摄像头帧数据并转发"""
+    def on_telemetry(self, data: Dict[str, Any]) -> None:
+        """保存客户端上报的遥测样本（按服务器接收时间归入时间桶），并同步给其他进程"""
+        client_id = request.sid
+
+        try:
+            if not client_manager.get_client(client_id):
+                return
+            timestamp = time.time()
+            values = data.get("values")
+            telemetry_store.add(client_id, timestamp, values)
+            publish_cluster(CLUSTER_KIND_TELEMETRY, client_id=client_id, timestamp=timestamp, values=values)
+
+        except ValueError as e:
+            log_sampler.info((EVENT_TELEMETRY, client_id), "无效的遥测样本来自 %s: %s", client_id, str(e))
+        except Exception as e:
+            logger.error(f"遥测数据处理错误: {str(e)}", exc_info=True)
+
+    def on_webcam_frame(self, data: Dict[str, Any]) -> None:
+        """处理摄像头帧数据并转发（JPEG二进制附件原样转发，不解码）"""
         client_id = request.sid
-        image_data = data.get("image_data", "")
+        image_data: bytes = data.get("image_data", b"")
 
         try:
             if not image_data:
-                logger.warning(f"空摄像头数据来自 {client_id}")
+                logger.warning("空摄像头数据来自 %s", client_id)
                 return
 
-            client_manager.update_media_status(client_id, "webcam", True)
-            logger.info(f"摄像头数据来自 {client_id} (长度: {len(image_data)})")
-            emit("webcam_frame", {
+            if client_manager.update_media_status(client_id, "webcam", True):
+                self._broadcast_client_delta(DELTA_OP_UPDATE, client_id)
+            log_sampler.info((EVENT_WEBCAM_FRAME, client_id), "摄像头数据来自 %s (大小: %d 字节)", client_id, len(image_data))
+            frame_relay.publish(client_id, EVENT_WEBCAM_FRAME, {
                 "client_id": client_id,
                 "image_data": image_data,
                 "timestamp": data.get("timestamp", time.time())
-            }, room=ROOM_WEB_CLIENTS)
+            })
 
         except Exception as e:
             logger.error(f"摄像头数据处理错误: {str(e)}", exc_info=True)
-            client_manager.update_media_status(client_id, "webcam", False)
+            if client_manager.update_media_status(client_id, "webcam", False):
+                self._broadcast_client_delta(DELTA_OP_UPDATE, client_id)
 
     def on_screen_frame(self, data: Dict[str, Any]) -> None:
-        """处理屏幕截图帧数据并转发"""
+        """处理屏幕截图帧数据并转发（JPEG二进制附件原样转发，不解码）"""
         client_id = request.sid
-        image_data = data.get("image_data", "")
+        image_data: bytes = data.get("image_data", b"")
 
         try:
             if not image_data:
-                logger.warning(f"空屏幕数据来自 {client_id}")
+                logger.warning("空屏幕数据来自 %s", client_id)
                 return
 
-            client_manager.update_media_status(client_id, "screen", True)
-            logger.info(f"屏幕数据来自 {client_id} (长度: {len(image_data)})")
-            emit("screen_frame", {
+            if client_manager.update_media_status(client_id, "screen", True):
+                self._broadcast_client_delta(DELTA_OP_UPDATE, client_id)
+            log_sampler.info((EVENT_SCREEN_FRAME, client_id), "屏幕数据来自 %s (大小: %d 字节)", client_id, len(image_data))
+            frame_relay.publish(client_id, EVENT_SCREEN_FRAME, {
                 "client_id": client_id,
                 "image_data": image_data,
                 "timestamp": data.get("timestamp", time.time()),
                 "width": data.get("width"),
                 "height": data.get("height")
-            }, room=ROOM_WEB_CLIENTS)
+            })
 
         except Exception as e:
             logger.error(f"屏幕数据处理错误: {str(e)}", exc_info=True)
-            client_manager.update_media_status(client_id, "screen", False)
+            if client_manager.update_media_status(client_id, "screen", False):
+                self._broadcast_client_delta(DELTA_OP_UPDATE, client_id)
 
     def on_execute_command(self, data: Dict[str, str]) -> None:
         """处理Web端的命令执行请求"""
@@ -346,16 +1154,19 @@ class MainNamespace(Namespace):
                 emit("command_error", {"message": error_msg}, room=sender_id)
                 return
 
-            logger.info(f"命令发送到 {target_client_id}: {command} (发送者: {sender_id})")
+            command_id = uuid.uuid4().hex[:12]  # 命令ID，终端输出分块据此归属
+            logger.info("命令发送到 %s: %s (ID: %s, 发送者: %s)", target_client_id, command, command_id, sender_id)
             # 发送命令到目标客户端
             emit("execute_command", {
                 "command": command,
+                "command_id": command_id,
                 "sender": sender_id
             }, room=target_client_id)
             # 向发送者确认命令已发送
             emit("command_sent", {
                 "client_id": target_client_id,
                 "command": command,
+                "command_id": command_id,
                 "timestamp": time.time()
             }, room=sender_id)
 
@@ -363,61 +1174,303 @@ class MainNamespace(Namespace):
             logger.error(f"命令执行请求处理错误: {str(e)}", exc_info=True)
             emit("command_error", {"message": str(e)}, room=sender_id)
 
-    # 其他事件处理方法（on_command_result, on_interrupt_command等）保持类似优化逻辑...
+    def on_interrupt_command(self, data: Dict[str, Any]) -> None:
+        """转发Web端的中断请求（command_id为空时中断该客户端全部排队与执行中的命令）"""
+        target_client_id = data.get("client_id")
+        sender_id = request.sid
 
-    def _broadcast_client_list(self) -> None:
-        """广播客户端列表更新到所有Web管理端"""
         try:
-            socketio.emit(
-                EVENT_UPDATE_CLIENT_LIST,
-                client_manager.get_all_clients(),
-                room=ROOM_WEB_CLIENTS
-            )
-            logger.debug("客户端列表已广播更新")
+            if not target_client_id or not client_manager.get_client(target_client_id):
+                error_msg = f"客户端 {target_client_id} 不存在或已断开"
+                logger.error(f"命令中断错误: {error_msg} (发送者: {sender_id})")
+                emit("command_error", {"message": error_msg}, room=sender_id)
+                return
+
+            logger.info("中断请求发送到 %s (命令ID: %s, 发送者: %s)", target_client_id, data.get("command_id"), sender_id)
+            emit("interrupt_command", {
+                "command_id": data.get("command_id"),
+                "sender": sender_id,
+                "requested_at": time.time()  # 客户端原样带回，用于统计中断耗时
+            }, room=target_client_id)
+
         except Exception as e:
-            logger.error(f"客户端列表广播错误: {str(e)}", exc_info=True)
+            logger.error(f"命令中断请求处理错误: {str(e)}", exc_info=True)
+            emit("command_error", {"message": str(e)}, room=sender_id)
+
+    def on_command_interrupted(self, data: Dict[str, Any]) -> None:
+        """客户端确认命令已中断：记录中断耗时并通知打开了该客户端终端的Web端"""
+        client_id = request.sid
+
+        try:
+            state = str(data.get("state", "killed"))
+            requested_at = data.get("requested_at")
+            if isinstance(requested_at, (int, float)):
+                data["latency"] = max(0.0, time.time() - requested_at)
+                metric_interrupt_seconds.observe(data["latency"], state)
+            data["client_id"] = client_id
+            logger.info("命令已中断: 客户端=%s, 命令ID=%s, 状态=%s, 耗时=%s", client_id, data.get("command_id"),
+                        state, f"{data['latency'] * 1000:.1f}ms" if "latency" in data else "未知")
+            emit("command_interrupted", data, room=terminal_room(client_id))
+
+        except Exception as e:
+            logger.error(f"命令中断确认处理错误: {str(e)}", exc_info=True)
+
+    def on_get_clients(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """Web端请求全量快照（首次加入或增量版本落后时）"""
+        client_id = request.sid
+        try:
+            known_revision = (data or {}).get("revision")
+            logger.debug("Web端请求客户端列表快照: ID=%s, 已知版本=%s", client_id, known_revision)
+            emit(EVENT_UPDATE_CLIENT_LIST, client_manager.get_snapshot(), room=client_id)
+        except Exception as e:
+            logger.error(f"客户端列表快照发送错误: {str(e)}", exc_info=True)
+
+    def on_subscribe_terminal(self, data: Dict[str, str]) -> None:
+        """Web端加入某客户端的终端输出房间（打开终端时），并回放该客户端保留的输出历史"""
+        viewer_id = request.sid
+        target_client_id = data.get("client_id")
+        try:
+            if not target_client_id or not client_manager.get_client(target_client_id):
+                emit("command_error", {"message": f"客户端 {target_client_id} 不存在或已断开"}, room=viewer_id)
+                return
+            join_room(terminal_room(target_client_id))
+            if target_client_id in client_manager.remote_owners:
+                # 输出历史保存在客户端所在的进程
+                publish_cluster(CLUSTER_KIND_TERMINAL_REPLAY, client_id=target_client_id,
+                                viewer_id=viewer_id, command_id=data.get("command_id"))
+            else:
+                replay_terminal_output(target_client_id, viewer_id, data.get("command_id"))
+            logger.info("终端订阅: 观看者=%s, 客户端=%s", viewer_id, target_client_id)
+        except Exception as e:
+            logger.error(f"终端订阅处理错误: {str(e)}", exc_info=True)
+
+    def on_unsubscribe_terminal(self, data: Dict[str, str]) -> None:
+        """Web端离开某客户端的终端输出房间（关闭终端时）"""
+        viewer_id = request.sid
+        try:
+            leave_room(terminal_room(data.get("client_id")))
+            logger.info("取消终端订阅: 观看者=%s, 客户端=%s", viewer_id, data.get("client_id"))
+        except Exception as e:
+            logger.error(f"取消终端订阅处理错误: {str(e)}", exc_info=True)
+
+    def on_subscribe_media(self, data: Dict[str, str]) -> None:
+        """Web端订阅某客户端的媒体帧（打开媒体监控面板时）"""
+        viewer_id = request.sid
+        target_client_id = data.get("client_id")
+        try:
+            if not target_client_id or not client_manager.get_client(target_client_id):
+                emit("command_error", {"message": f"客户端 {target_client_id} 不存在或已断开"}, room=viewer_id)
+                return
+            frame_relay.subscribe(viewer_id, target_client_id)
+            # 客户端可能连接在其他进程，由拥有该客户端的进程负责发送帧
+            publish_cluster(CLUSTER_KIND_MEDIA, op="subscribe", viewer_id=viewer_id, client_id=target_client_id)
+            logger.info("媒体订阅: 观看者=%s, 客户端=%s", viewer_id, target_client_id)
+        except Exception as e:
+            logger.error(f"媒体订阅处理错误: {str(e)}", exc_info=True)
+
+    def on_unsubscribe_media(self, data: Dict[str, str]) -> None:
+        """Web端取消订阅某客户端的媒体帧（关闭媒体监控面板时）"""
+        viewer_id = request.sid
+        try:
+            frame_relay.unsubscribe(viewer_id, data.get("client_id"))
+            publish_cluster(CLUSTER_KIND_MEDIA, op="unsubscribe", viewer_id=viewer_id, client_id=data.get("client_id"))
+            logger.info("取消媒体订阅: 观看者=%s, 客户端=%s", viewer_id, data.get("client_id"))
+        except Exception as e:
+            logger.error(f"取消媒体订阅处理错误: {str(e)}", exc_info=True)
+
+    # 其他事件处理方法（on_command_result等）保持类似优化逻辑...
+
+    def _broadcast_client_delta(self, op: str, client_id: str, replicate: bool = True) -> None:
+        """将客户端列表增量交给调度器，合并后广播到本进程的Web管理端
+
+        replicate为True时同时发布给其他进程（本进程客户端的变更）。
+        """
+        try:
+            change = client_manager.build_change(op, client_id)
+            broadcast_scheduler.schedule(ROOM_WEB_CLIENTS, EVENT_CLIENT_LIST_DELTA, change, key=client_id)
+            if replicate:
+                publish_cluster(CLUSTER_KIND_CLIENT_CHANGE, change=change)
+            logger.debug("客户端列表增量已排队: %s %s (版本 %d)", op, client_id, client_manager.revision)
+        except Exception as e:
+            logger.error(f"客户端列表增量广播错误: {str(e)}", exc_info=True)
+
+
+def replay_terminal_output(client_id: str, viewer_id: str, command_id: Optional[str] = None) -> None:
+    """向观看者回放本进程保存的终端输出历史（与实时输出格式相同，浏览器按序号去重）"""
+    chunks = output_history.replay(client_id, command_id)
+    if chunks:
+        socketio.emit(EVENT_TERMINAL_OUTPUT, chunks, to=viewer_id)
+        metric_relayed_bytes.inc(EVENT_TERMINAL_OUTPUT, amount=sum(len(chunk.get("output") or "") for chunk in chunks))
 
 
 # 注册命名空间
-socketio.on_namespace(MainNamespace("/"))
+main_namespace = MainNamespace("/")
+if profiler:
+    wrapped_handlers = profiler.instrument(main_namespace)
+    logger.info("性能剖析已开启，已包装 %d 个事件处理函数", len(wrapped_handlers))
+socketio.on_namespace(main_namespace)
+
+
+# ------------------------------
+# 集群同步（多进程部署）
+# ------------------------------
+# 每个进程只负责连接到本进程的客户端（心跳、超时、媒体帧），并把变更发布给其他进程；
+# 其他进程保存只读副本，用于客户端列表、命令校验与跨进程发送（由消息队列转发给拥有该sid的进程）。
+cluster_hosts: Dict[str, float] = {}  # 其他进程host_id -> 最后一次收到其消息的时间
+
+
+def publish_cluster(kind: str, **payload: Any) -> None:
+    """向其他进程发布集群消息（单进程模式下忽略）"""
+    if cluster_manager:
+        cluster_manager.publish_cluster(kind, **payload)
+
+
+def publish_cluster_sync() -> None:
+    """发布本进程客户端的全量列表"""
+    publish_cluster(CLUSTER_KIND_SYNC, clients=client_manager.get_local_clients())
+
+
+def remove_remote_client(client_id: str) -> None:
+    """移除其他进程拥有的客户端副本"""
+    if client_manager.remove_client(client_id):
+        frame_relay.remove_client(client_id)
+        telemetry_store.remove_client(client_id)
+        main_namespace._broadcast_client_delta(DELTA_OP_REMOVE, client_id, replicate=False)
+
+
+def apply_remote_clients(host_id: str, clients: List[Dict[str, Any]]) -> None:
+    """用某进程的全量列表校准本地副本"""
+    seen: Set[str] = set()
+    for data in clients:
+        seen.add(data["id"])
+        op = client_manager.upsert_remote_client(host_id, data)
+        if op:
+            main_namespace._broadcast_client_delta(op, data["id"], replicate=False)
+    for client_id in client_manager.remote_client_ids(host_id):
+        if client_id not in seen:
+            remove_remote_client(client_id)
+
+
+def handle_cluster_message(message: Dict[str, Any]) -> None:
+    """处理其他进程发布的集群消息"""
+    host_id = message["host_id"]
+    kind = message["kind"]
+    cluster_hosts[host_id] = time.time()
+
+    if kind == CLUSTER_KIND_CLIENT_CHANGE:
+        change = message["change"]
+        if change["op"] == DELTA_OP_REMOVE:
+            if client_manager.remote_owners.get(change["id"]) == host_id:
+                remove_remote_client(change["id"])
+        elif change.get("client"):
+            op = client_manager.upsert_remote_client(host_id, change["client"])
+            if op:
+                main_namespace._broadcast_client_delta(op, change["id"], replicate=False)
+    elif kind == CLUSTER_KIND_SYNC:
+        apply_remote_clients(host_id, message["clients"])
+    elif kind == CLUSTER_KIND_HELLO:
+        publish_cluster_sync()
+    elif kind == CLUSTER_KIND_MEDIA:
+        if message["op"] == "subscribe":
+            frame_relay.subscribe(message["viewer_id"], message["client_id"])
+        elif message["op"] == "unsubscribe":
+            frame_relay.unsubscribe(message["viewer_id"], message["client_id"])
+        elif message["op"] == "remove_viewer":
+            frame_relay.remove_viewer(message["viewer_id"])
+    elif kind == CLUSTER_KIND_TERMINAL_REPLAY:
+        client_id = message["client_id"]
+        if client_manager.get_client(client_id) and client_id not in client_manager.remote_owners:
+            replay_terminal_output(client_id, message["viewer_id"], message.get("command_id"))
+    elif kind == CLUSTER_KIND_TELEMETRY:
+        if client_manager.remote_owners.get(message["client_id"]) == host_id:
+            telemetry_store.add(message["client_id"], message["timestamp"], message["values"])
+
+
+def cluster_sync_task() -> None:
+    """集群同步后台任务：定期广播本地客户端列表，并清理失联进程的客户端副本"""
+    logger.info(f"集群同步任务已启动，进程ID: {cluster_manager.host_id}")
+    publish_cluster(CLUSTER_KIND_HELLO)
+    while True:
+        try:
+            publish_cluster_sync()
+            now = time.time()
+            for host_id, last_heard in list(cluster_hosts.items()):
+                if now - last_heard > CLUSTER_HOST_TIMEOUT:
+                    logger.warning(f"集群进程失联，移除其客户端: {host_id}")
+                    del cluster_hosts[host_id]
+                    apply_remote_clients(host_id, [])
+        except Exception as e:
+            logger.error(f"集群同步任务错误: {str(e)}", exc_info=True)
+        socketio.sleep(CLUSTER_SYNC_INTERVAL)
+
+
+def start_cluster() -> None:
+    """启动消息队列监听与集群同步（默认在首个连接到达时才初始化，这里提前启动）"""
+    cluster_manager.cluster_handler = handle_cluster_message
+    if not socketio.server.manager_initialized:
+        socketio.server.manager_initialized = True
+        cluster_manager.initialize()
+    socketio.start_background_task(cluster_sync_task)
 
 
 # ------------------------------
 # 后台任务（客户端超时检查）
 # ------------------------------
+def transport_alive(client_id: str) -> bool:
+    """传输层存活检查：Engine.IO连接未关闭，且没有超过ping_timeout未响应的ping"""
+    eio_sid = socketio.server.manager.eio_sid_from_sid(client_id, "/")
+    eio_socket = socketio.server.eio.sockets.get(eio_sid) if eio_sid else None
+    if eio_socket is None or eio_socket.closed:
+        return False
+    return not eio_socket.last_ping or time.time() - eio_socket.last_ping <= SOCKETIO_PING_TIMEOUT
+
+
+client_manager.liveness_probe = transport_alive
+
+
 def check_client_timeouts() -> None:
-    """客户端超时检查后台任务"""
+    """客户端超时检查后台任务（按最近截止时间唤醒）"""
     logger.info("客户端超时检查任务已启动")
     while True:
+        timeout_wakeup.clear()
+        wait_time = CLIENT_TIMEOUT_CHECK_INTERVAL
         try:
-            now = time.time()
-            timeout_threshold = CLIENT_TIMEOUT_SECONDS
-            media_multiplier = CLIENT_MEDIA_TIMEOUT_MULTIPLIER
-            # 获取超时客户端ID
-            timeout_ids = client_manager.get_timeout_clients(now, timeout_threshold, media_multiplier)
-
-            # 处理超时客户端
-            for client_id in timeout_ids:
-                client = client_manager.get_client(client_id)
-                if client:
-                    logger.warning(f"客户端超时断开: {client_id} ({client.hostname})")
-                    client_manager.remove_client(client_id)
-            if timeout_ids:
-                MainNamespace("/")._broadcast_client_list()  # 广播更新
+            # 移除并处理超时客户端
+            metric_timeout_sweeps.inc()
+            for client in client_manager.pop_timeout_clients(time.time()):
+                logger.warning("客户端超时断开: %s (%s)", client.id, client.hostname)
+                metric_client_timeouts.inc()
+                frame_relay.remove_client(client.id)
+                output_history.remove_client(client.id)
+                telemetry_store.remove_client(client.id)
+                socketio.close_room(terminal_room(client.id))  # 后台任务中没有请求上下文
+                main_namespace._broadcast_client_delta(DELTA_OP_REMOVE, client.id)  # 广播增量
+
+            next_deadline = client_manager.next_deadline()
+            if next_deadline is not None:
+                wait_time = min(max(next_deadline - time.time(), 0.01), CLIENT_TIMEOUT_CHECK_INTERVAL)
 
         except Exception as e:
             logger.error(f"超时检查任务错误: {str(e)}", exc_info=True)
 
-        # 等待检查间隔
-        socketio.sleep(CLIENT_TIMEOUT_CHECK_INTERVAL)
+        # 等待到最近的截止时间，或被更早的截止时间唤醒
+        timeout_wakeup.wait(wait_time)
 
 
 # ------------------------------
 # 启动服务器
 # ------------------------------
 if __name__ == "__main__":
-    # 启动超时检查后台任务
+    parser = argparse.ArgumentParser(description="Clay 远程管理服务器")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="监听端口（多进程部署时每个进程使用不同端口）")
+    args = parser.parse_args()
+
+    # 启动超时检查与广播调度后台任务
     socketio.start_background_task(check_client_timeouts)
+    socketio.start_background_task(monitor_loop_lag)
+    broadcast_scheduler.start()
+    if cluster_manager:
+        start_cluster()
 
     logger.info("Clay 远程管理服务器启动中...")
     logger.info(f"系统信息: {platform.system()} {platform.release()}")
@@ -426,7 +1479,7 @@ if __name__ == "__main__":
         socketio.run(
             app,
             host=SERVER_HOST,
-            port=SERVER_PORT,
+            port=args.port,
             debug=DEBUG_MODE,
             allow_unsafe_werkzeug=ALLOW_UNSAFE_WERKZEUG
         )
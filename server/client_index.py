@@ -0,0 +1,176 @@
+"""客户端列表查询索引：按主机名、操作系统、连接时间排序的有序索引与媒体状态集合
+
+有序索引是按 (键, client_id) 排序的列表，前缀搜索与游标分页都通过二分查找定位，
+无其他过滤条件时一页的代价为 O(log N + limit)；有其他过滤条件时只遍历最小的候选集合。
+"""
+import json
+import base64
+import bisect
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+SORT_FIELDS = ("hostname", "os", "connected_at")  # 支持排序的字段
+PREFIX_FIELDS = ("hostname", "os")                # 支持前缀搜索的字段（不区分大小写）
+MEDIA_FIELDS = ("screen_active", "webcam_active")  # 支持按状态过滤的媒体字段
+PREFIX_END = "\U0010ffff"                          # 前缀范围上界
+
+IndexEntry = Tuple[Any, str]  # (排序键, client_id)，client_id保证排序唯一
+
+
+def _keys_of(client: Any) -> Dict[str, Any]:
+    """提取客户端的各索引键"""
+    return {
+        "hostname": str(client.hostname).casefold(),
+        "os": str(client.os).casefold(),
+        "connected_at": client.connected_at,
+        "screen_active": bool(client.screen_active),
+        "webcam_active": bool(client.webcam_active),
+    }
+
+
+def encode_cursor(entry: IndexEntry) -> str:
+    """把一页最后一条的 (排序键, client_id) 编码为不透明游标"""
+    raw = json.dumps(list(entry), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> IndexEntry:
+    """解析游标，格式错误时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, client_id = json.loads(raw.decode("utf-8"))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+    if not isinstance(client_id, str):
+        raise ValueError(f"无效的游标: {cursor}")
+    return key, client_id
+
+
+def _cursor_key_matches(sort: str, key: Any) -> bool:
+    """游标中的排序键类型是否与排序字段一致（类型不同的键无法与索引条目比较）"""
+    if sort in PREFIX_FIELDS:
+        return type(key) is str
+    return type(key) in (int, float)
+
+
+class ClientIndex:
+    """客户端查询索引（由ClientManager在客户端增删改时同步维护）"""
+
+    def __init__(self):
+        self.sorted: Dict[str, List[IndexEntry]] = {field: [] for field in SORT_FIELDS}
+        self.media: Dict[str, Set[str]] = {field: set() for field in MEDIA_FIELDS}
+        self._keys: Dict[str, Dict[str, Any]] = {}  # client_id -> 当前已索引的键
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, client: Any) -> None:
+        """索引客户端（已存在时按新值更新）"""
+        keys = _keys_of(client)
+        old_keys = self._keys.get(client.id)
+        if old_keys == keys:
+            return
+        if old_keys is not None:
+            self.remove(client.id)
+        self._keys[client.id] = keys
+        for field in SORT_FIELDS:
+            bisect.insort(self.sorted[field], (keys[field], client.id))
+        for field in MEDIA_FIELDS:
+            if keys[field]:
+                self.media[field].add(client.id)
+
+    def remove(self, client_id: str) -> None:
+        """移除客户端的索引"""
+        keys = self._keys.pop(client_id, None)
+        if keys is None:
+            return
+        for field in SORT_FIELDS:
+            entries = self.sorted[field]
+            position = bisect.bisect_left(entries, (keys[field], client_id))
+            if position < len(entries) and entries[position][1] == client_id:
+                del entries[position]
+        for field in MEDIA_FIELDS:
+            self.media[field].discard(client_id)
+
+    def _prefix_range(self, field: str, prefix: str) -> Tuple[int, int]:
+        """前缀在有序索引中的范围 [lo, hi)"""
+        entries = self.sorted[field]
+        prefix = prefix.casefold()
+        return (bisect.bisect_left(entries, (prefix,)),
+                bisect.bisect_left(entries, (prefix + PREFIX_END,)))
+
+    def query(self, prefixes: Optional[Dict[str, str]] = None, media: Optional[Dict[str, bool]] = None,
+              sort: str = "connected_at", descending: bool = False, limit: Optional[int] = None,
+              cursor: Optional[str] = None) -> Tuple[List[str], int, Optional[str]]:
+        """查询一页客户端ID，返回 (ID列表, 匹配总数, 下一页游标)
+
+        prefixes: 字段 -> 前缀（不区分大小写）；media: 媒体字段 -> 期望状态。
+        limit为None时返回全部匹配；参数不合法时抛出ValueError。
+        """
+        prefixes = {field: value for field, value in (prefixes or {}).items() if value}
+        media = media or {}
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort}")
+        for field in prefixes:
+            if field not in PREFIX_FIELDS:
+                raise ValueError(f"不支持前缀搜索的字段: {field}")
+        for field in media:
+            if field not in MEDIA_FIELDS:
+                raise ValueError(f"不支持过滤的字段: {field}")
+        if limit is not None and limit <= 0:
+            raise ValueError("limit必须为正整数")
+        after = decode_cursor(cursor) if cursor else None
+        if after and not _cursor_key_matches(sort, after[0]):
+            raise ValueError("游标与排序字段不匹配")
+
+        entries = self.sorted[sort]
+        lo, hi = self._prefix_range(sort, prefixes[sort]) if sort in prefixes else (0, len(entries))
+        other_prefixes = {field: value for field, value in prefixes.items() if field != sort}
+        if other_prefixes or media:
+            entries = self._filter(sort, prefixes.get(sort), lo, hi, other_prefixes, media)
+            lo, hi = 0, len(entries)
+        return self._page(entries, lo, hi, descending, limit, after)
+
+    def _filter(self, sort: str, sort_prefix: Optional[str], lo: int, hi: int,
+                prefixes: Dict[str, str], media: Dict[str, bool]) -> List[IndexEntry]:
+        """在排序索引的 [lo, hi) 范围内按其余条件过滤，从最小的候选集合出发，结果按排序键有序"""
+        allowed: Optional[Set[str]] = None
+        for field, value in prefixes.items():
+            prefix_lo, prefix_hi = self._prefix_range(field, value)
+            ids = {client_id for _, client_id in self.sorted[field][prefix_lo:prefix_hi]}
+            allowed = ids if allowed is None else allowed & ids
+        for field, value in media.items():
+            if value:
+                allowed = set(self.media[field]) if allowed is None else allowed & self.media[field]
+        excluded = [self.media[field] for field, value in media.items() if not value]
+        if allowed is not None and len(allowed) < hi - lo:
+            # 候选集合更小：取出排序键后重新排序
+            result = [(self._keys[client_id][sort], client_id) for client_id in allowed]
+            if sort_prefix:
+                folded = sort_prefix.casefold()
+                result = [entry for entry in result if entry[0].startswith(folded)]
+            result.sort()
+        else:
+            result = self.sorted[sort][lo:hi]
+            if allowed is not None:
+                result = [entry for entry in result if entry[1] in allowed]
+        if excluded:
+            result = [entry for entry in result if not any(entry[1] in ids for ids in excluded)]
+        return result
+
+    @staticmethod
+    def _page(entries: List[IndexEntry], lo: int, hi: int, descending: bool, limit: Optional[int],
+              after: Optional[IndexEntry]) -> Tuple[List[str], int, Optional[str]]:
+        """在有序范围 [lo, hi) 中按游标取一页"""
+        total = hi - lo
+        if descending:
+            end = bisect.bisect_left(entries, after, lo, hi) if after else hi
+            start = lo if limit is None else max(lo, end - limit)
+            page = entries[start:end][::-1]
+            has_more = start > lo
+        else:
+            start = bisect.bisect_right(entries, after, lo, hi) if after else lo
+            end = hi if limit is None else min(hi, start + limit)
+            page = entries[start:end]
+            has_more = end < hi
+        next_cursor = encode_cursor(page[-1]) if page and has_more else None
+        return [client_id for _, client_id in page], total, next_cursor
@@ -0,0 +1,280 @@
+"""集群支持：多进程部署时的消息队列后端与集群消息
+
+- UnixSocketBroker：本地Unix套接字消息代理，把任一连接发布的帧转发给其余所有连接，
+  用于单机多进程部署与测试（跨主机部署请使用Redis等消息队列）
+- UnixSocketManager：连接上述代理的Socket.IO消息队列后端（URL形如 unix:///tmp/clay-broker.sock）
+- ClusterMessageMixin：在任意消息队列后端上附加集群消息，用于同步客户端注册表与媒体订阅
+
+单独运行本文件即启动消息代理：python cluster.py --path /tmp/clay-broker.sock
+"""
+import os
+import queue
+import pickle
+import socket
+import struct
+import logging
+import argparse
+import threading
+from typing import Any, Callable, Dict, Optional
+import socketio
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_METHOD = "clay_cluster"  # 集群消息的method字段，与Socket.IO自身的消息区分
+UNIX_URL_PREFIX = "unix://"
+FRAME_HEADER = struct.Struct(">I")  # 帧头：4字节大端长度
+
+
+def _send_frame(sock: socket.socket, payload: bytes) -> None:
+    """发送一帧（长度前缀 + 内容）"""
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """读取指定长度的数据，连接关闭时抛出ConnectionError"""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    """读取一帧"""
+    (length,) = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    return _recv_exact(sock, length)
+
+
+def unix_path_from_url(url: str) -> str:
+    """从 unix:// URL 中取出套接字路径"""
+    return url[len(UNIX_URL_PREFIX):] if url.startswith(UNIX_URL_PREFIX) else url
+
+
+# ------------------------------
+# 本地消息代理
+# ------------------------------
+class UnixSocketBroker:
+    """本地Unix套接字消息代理：每个连接一个发送队列，慢连接不会阻塞其他连接"""
+    def __init__(self, path: str, max_pending: int = 10000):
+        self.path = path
+        self.max_pending = max_pending  # 单个连接最多积压的帧数，超出后断开该连接
+        self._peers: Dict[socket.socket, queue.Queue] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[socket.socket] = None
+
+    def serve_forever(self) -> None:
+        """监听并处理连接（阻塞）"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(128)
+        logger.info(f"消息代理已启动: {self.path}")
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break  # 代理已关闭
+            outbox: queue.Queue = queue.Queue(self.max_pending)
+            with self._lock:
+                self._peers[conn] = outbox
+            threading.Thread(target=self._read_loop, args=(conn,), daemon=True).start()
+            threading.Thread(target=self._write_loop, args=(conn, outbox), daemon=True).start()
+
+    def start(self) -> threading.Thread:
+        """在后台线程中运行代理（测试时进程内使用）"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self) -> None:
+        """关闭代理与所有连接"""
+        if self._server:
+            self._server.close()
+        with self._lock:
+            peers = list(self._peers)
+        for conn in peers:
+            self._drop(conn)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _read_loop(self, conn: socket.socket) -> None:
+        """读取连接发布的帧并转发给其余连接"""
+        try:
+            while True:
+                frame = _recv_frame(conn)
+                with self._lock:
+                    targets = [(peer, outbox) for peer, outbox in self._peers.items() if peer is not conn]
+                for peer, outbox in targets:
+                    try:
+                        outbox.put_nowait(frame)
+                    except queue.Full:
+                        logger.warning("消息代理连接积压过多，已断开")
+                        self._drop(peer)
+        except OSError:
+            pass
+        finally:
+            self._drop(conn)
+
+    def _write_loop(self, conn: socket.socket, outbox: queue.Queue) -> None:
+        """按顺序把待发送的帧写入连接"""
+        try:
+            while True:
+                frame = outbox.get()
+                if frame is None:
+                    break
+                _send_frame(conn, frame)
+        except OSError:
+            pass
+        finally:
+            self._drop(conn)
+
+    def _drop(self, conn: socket.socket) -> None:
+        """移除并关闭连接"""
+        with self._lock:
+            outbox = self._peers.pop(conn, None)
+        if outbox is None:
+            return
+        try:
+            outbox.put_nowait(None)  # 通知写线程退出
+        except queue.Full:
+            pass
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        conn.close()
+
+
+# ------------------------------
+# 消息队列后端
+# ------------------------------
+class UnixSocketManager(socketio.PubSubManager):
+    """通过本地消息代理在多个服务器进程之间转发Socket.IO消息"""
+    name = "unix"
+
+    def __init__(self, url: str = "unix:///tmp/clay-broker.sock", channel: str = "socketio",
+                 write_only: bool = False, logger: Optional[logging.Logger] = None):
+        self.path = unix_path_from_url(url)
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._socket_module = socket
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+
+    def initialize(self) -> None:
+        # eventlet模式下使用协程版socket与锁，避免阻塞事件循环
+        if self.server.async_mode == "eventlet":
+            from eventlet.green import socket as green_socket, threading as green_threading
+            self._socket_module = green_socket
+            self._lock = green_threading.Lock()
+        super().initialize()
+
+    def _connect(self) -> socket.socket:
+        """连接消息代理（发布与订阅共用一个连接）"""
+        if self._sock is None:
+            sock = self._socket_module.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.path)
+            self._sock = sock
+        return self._sock
+
+    def _close(self, sock: Optional[socket.socket]) -> None:
+        """关闭失效的连接"""
+        if sock is not None and self._sock is sock:
+            self._sock = None
+            sock.close()
+
+    def _publish(self, data: Any) -> None:
+        frame = pickle.dumps((self.channel, data))
+        with self._lock:
+            for _ in range(2):  # 连接断开时重连并重试一次
+                sock = None
+                try:
+                    sock = self._connect()
+                    _send_frame(sock, frame)
+                    return
+                except OSError:
+                    self._close(sock)
+        logger.error(f"无法发布到消息代理: {self.path}")
+
+    def _listen(self):
+        retry_sleep = 1
+        while True:
+            sock = None
+            try:
+                with self._lock:
+                    sock = self._connect()
+                retry_sleep = 1
+                while True:
+                    channel, data = pickle.loads(_recv_frame(sock))
+                    if channel == self.channel:
+                        yield data
+            except OSError:
+                logger.error(f"无法从消息代理接收消息，{retry_sleep}秒后重试: {self.path}")
+                with self._lock:
+                    self._close(sock)
+                self.server.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, 30)
+
+
+# ------------------------------
+# 集群消息
+# ------------------------------
+class ClusterMessageMixin:
+    """在消息队列后端上附加集群消息
+
+    集群消息与Socket.IO消息走同一通道，method为CLUSTER_METHOD的消息在监听时被截获，
+    交给cluster_handler处理（不处理本进程自己发出的消息），其余消息照常分发。
+    """
+    cluster_handler: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def publish_cluster(self, kind: str, **payload: Any) -> None:
+        """向其他服务器进程发布一条集群消息"""
+        message = {"method": CLUSTER_METHOD, "kind": kind, "host_id": self.host_id}
+        message.update(payload)
+        self._publish(message)
+
+    def _listen(self):
+        for message in super()._listen():
+            data = message
+            if isinstance(message, bytes):
+                try:
+                    data = pickle.loads(message)
+                except Exception:
+                    data = None
+            if isinstance(data, dict) and data.get("method") == CLUSTER_METHOD:
+                if data.get("host_id") != self.host_id and self.cluster_handler:
+                    try:
+                        self.cluster_handler(data)
+                    except Exception as e:
+                        logger.error(f"集群消息处理错误: {str(e)}", exc_info=True)
+                continue
+            yield message
+
+
+def create_cluster_manager(url: str, channel: str) -> socketio.PubSubManager:
+    """按URL选择消息队列后端，并附加集群消息支持"""
+    if url.startswith(UNIX_URL_PREFIX):
+        base = UnixSocketManager
+    elif url.startswith(("redis://", "rediss://", "redis+sentinel://", "valkey://", "valkeys://")):
+        base = socketio.RedisManager
+    elif url.startswith("kafka://"):
+        base = socketio.KafkaManager
+    elif url.startswith("zmq+"):
+        base = socketio.ZmqManager
+    else:
+        base = socketio.KombuManager
+    manager_class = type(f"Cluster{base.__name__}", (ClusterMessageMixin, base), {})
+    return manager_class(url, channel=channel)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clay 本地消息代理（单机多进程部署）")
+    parser.add_argument("--path", default="/tmp/clay-broker.sock", help="Unix套接字路径")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        UnixSocketBroker(args.path).serve_forever()
+    except KeyboardInterrupt:
+        pass
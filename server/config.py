@@ -15,6 +15,48 @@ SOCKETIO_PING_TIMEOUT = 60
 SOCKETIO_PING_INTERVAL = 10
 SOCKETIO_MAX_HTTP_BUFFER_SIZE = 16 * 1024 * 1024  # 支持大尺寸图像传输
 SOCKETIO_CORS_ALLOWED_ORIGINS = "*"  # 开发环境允许跨域，生产环境需限制
+# 序列化方式："json"（默认）/ "orjson"（更快的JSON，需安装orjson）/ "msgpack"（二进制，需安装msgpack）
+# 必须与客户端 client/config.py 中的 SOCKETIO_SERIALIZER 一致，浏览器端会自动加载对应的socket.io构建
+SOCKETIO_SERIALIZER = "json"
+# 压缩：WebSocket协商permessage-deflate（浏览器支持），长轮询使用HTTP压缩；小于阈值的消息不压缩
+SOCKETIO_COMPRESSION = True
+SOCKETIO_COMPRESSION_THRESHOLD = 1024  # 压缩阈值（字节）
+SOCKETIO_COMPRESS_BINARY = False       # 是否压缩二进制帧（JPEG媒体帧压缩无收益；使用msgpack时所有消息均为二进制帧）
+
+# 广播调度配置（按房间合并事件，定时批量发送）
+BROADCAST_FLUSH_INTERVAL = 0.05  # 批量发送间隔（秒）
+BROADCAST_MAX_BATCH_SIZE = 200   # 单次发送的最大条目数
+
+# 客户端查询接口配置（/api/clients）
+CLIENT_QUERY_MAX_LIMIT = 500  # 分页查询每页最大条数
+
+# Web终端配置
+TERMINAL_SCROLLBACK_LINES = 5000  # 浏览器终端保留的最大行数，超出后丢弃最早的行
+# 服务器保留每个客户端最近的终端输出，打开终端时回放（重新打开或其他管理员加入无需重新执行命令）
+TERMINAL_HISTORY_MAX_BYTES_PER_CLIENT = 256 * 1024  # 单个客户端保留的输出上限（字节）
+TERMINAL_HISTORY_MAX_BYTES = 64 * 1024 * 1024       # 所有客户端合计上限，超出时从最久没有输出的客户端开始丢弃
+
+# 客户端遥测配置（客户端定期上报CPU/内存/磁盘使用率与网络速率，服务器按多个分辨率聚合保存）
+# 每项为 (分辨率秒数, 保留点数)：默认 5秒×1小时、1分钟×1天、1小时×30天，每个客户端固定占用约150KB
+# 最细分辨率宜与客户端上报间隔（client/config.py 中的 TELEMETRY_INTERVAL）一致
+TELEMETRY_RESOLUTIONS = ((5, 720), (60, 1440), (3600, 720))
+
+# 媒体帧分发配置（每个观看者只保留最新一帧）
+MEDIA_ACK_TIMEOUT = 5  # 等待浏览器确认上一帧的最长时间（秒），超时后视为已确认
+
+# 集群配置（多进程部署，各进程通过消息队列同步客户端注册表与房间消息）
+CLUSTER_MESSAGE_QUEUE = None  # None为单进程；单机可用 "unix:///tmp/clay-broker.sock"，跨主机可用 "redis://localhost:6379/0"
+CLUSTER_CHANNEL = "clay"      # 消息队列通道名
+CLUSTER_SYNC_INTERVAL = 10    # 各进程广播本地客户端全量列表的间隔（秒）
+CLUSTER_HOST_TIMEOUT = 35     # 超过该时间未收到某进程的同步消息则移除其客户端（秒）
+
+# 运行指标配置（/metrics，Prometheus文本格式）
+LOOP_LAG_PROBE_INTERVAL = 1.0  # 事件循环延迟探测间隔（秒）
+
+# 性能剖析配置（默认关闭，开启后记录每个事件处理函数的耗时，管理员登录后访问 /debug/profile）
+PROFILING_ENABLED = False
+PROFILER_WINDOW = 2048       # 每个处理函数保留最近多少次耗时用于计算分位数
+PROFILER_SLOW_SAMPLES = 20   # 保留的最慢调用样本数
 
 # 认证配置
 ADMIN_PASSWORD = 'admin123'  # 生产环境使用环境变量
@@ -22,9 +64,15 @@ ADMIN_PASSWORD = 'admin123'  # 生产环境使用环境变量
 # 客户端超时配置
 CLIENT_TIMEOUT_SECONDS = 60  # 基础超时时间（秒）
 CLIENT_MEDIA_TIMEOUT_MULTIPLIER = 3  # 媒体传输时超时时间倍数
-CLIENT_TIMEOUT_CHECK_INTERVAL = 30  # 超时检查间隔（秒）
+CLIENT_TIMEOUT_CHECK_INTERVAL = 30  # 超时检查最长间隔（秒），实际按最近的截止时间唤醒
+# 存活判定：收到客户端任何消息都刷新活动时间；到期时再检查Engine.IO连接（ping/pong正常则视为存活）
+HEARTBEAT_ACK_INTERVAL = 5  # 应用层心跳回应的最短间隔（秒）
 
 # 日志配置
 LOG_LEVEL = 'INFO'
 LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
-LOG_FILE = 'server.log'
\ No newline at end of file
+LOG_FILE = 'server.log'
+LOG_MAX_BYTES = 10 * 1024 * 1024  # 单个日志文件最大字节数，超出后轮转
+LOG_BACKUP_COUNT = 5              # 保留的历史日志文件数
+LOG_QUEUE_SIZE = 10000            # 异步日志队列上限，积压超出时丢弃新日志而不阻塞
+LOG_SAMPLE_INTERVAL = 10          # 高频事件（媒体帧）日志采样间隔（秒），同一客户端同类事件每个间隔只记录一条
\ No newline at end of file
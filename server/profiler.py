@@ -0,0 +1,140 @@
+"""可选的性能剖析：记录事件处理函数耗时与事件循环延迟，按需输出分位数报告与最慢调用样本
+
+耗时为墙钟时间：处理函数内部让出（如网络写入）时，期间其他协程的运行时间也会计入。
+"""
+import math
+import time
+import heapq
+import functools
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Sequence, Tuple
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """最近秩法分位数（sorted_values须已排序），第 ceil(q% × n) 个值
+
+    >>> [percentile([1, 2], q) for q in (50, 99, 100)]
+    [1, 2, 2]
+    >>> [percentile(range(1, 101), q) for q in (50, 99, 100)]
+    [50, 99, 100]
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values) / 100.0) - 1))
+    return sorted_values[index]
+
+
+def describe_payload(args: Sequence[Any]) -> Any:
+    """概括事件参数的结构（只记录字段与长度，不记录内容）"""
+    summary = []
+    for arg in args:
+        if isinstance(arg, dict):
+            summary.append({key: (len(value) if isinstance(value, (str, bytes, list, dict)) else type(value).__name__)
+                            for key, value in arg.items()})
+        elif isinstance(arg, (str, bytes)):
+            summary.append(len(arg))
+        else:
+            summary.append(type(arg).__name__)
+    return summary
+
+
+class TimingStats:
+    """耗时统计：累计次数、总耗时、最大值，以及最近window次的样本（用于分位数）"""
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.recent.append(duration)
+
+    def summary(self) -> Dict[str, Any]:
+        """汇总（毫秒）"""
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(percentile(recent, 50) * 1000, 3),
+            "p90_ms": round(percentile(recent, 90) * 1000, 3),
+            "p99_ms": round(percentile(recent, 99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class HandlerProfiler:
+    """事件处理函数剖析器"""
+    def __init__(self, window: int = 2048, slow_samples: int = 20):
+        self.window = window
+        self.slow_samples = slow_samples
+        self.reset()
+
+    def reset(self) -> None:
+        """清空已收集的数据"""
+        self.started_at = time.time()
+        self.handlers: Dict[str, TimingStats] = {}
+        self.loop_lag = TimingStats(self.window)
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []  # 最小堆，保留最慢的slow_samples次调用
+        self._sequence = 0
+
+    def instrument(self, target: Any, prefix: str = "on_") -> List[str]:
+        """把对象上所有以prefix开头的方法替换为计时包装，返回被包装的方法名"""
+        wrapped = []
+        for attr in dir(type(target)):
+            method = getattr(target, attr)
+            if attr.startswith(prefix) and callable(method):
+                setattr(target, attr, self.wrap(attr[len(prefix):], method))
+                wrapped.append(attr)
+        return wrapped
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """包装单个函数，记录每次调用的耗时"""
+        @functools.wraps(func)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - started, args)
+        return timed
+
+    def record(self, name: str, duration: float, args: Sequence[Any] = ()) -> None:
+        """记录一次调用"""
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = TimingStats(self.window)
+        stats.add(duration)
+        if len(self._slowest) < self.slow_samples or duration > self._slowest[0][0]:
+            self._sequence += 1
+            sample = {
+                "handler": name,
+                "duration_ms": round(duration * 1000, 3),
+                "at": time.time(),
+                "payload": describe_payload(args),
+            }
+            if len(self._slowest) < self.slow_samples:
+                heapq.heappush(self._slowest, (duration, self._sequence, sample))
+            else:
+                heapq.heapreplace(self._slowest, (duration, self._sequence, sample))
+
+    def record_lag(self, lag: float) -> None:
+        """记录一次事件循环延迟探测结果"""
+        self.loop_lag.add(lag)
+
+    def report(self) -> Dict[str, Any]:
+        """生成报告：各处理函数按总耗时降序，附事件循环延迟与最慢调用样本"""
+        handlers = sorted(self.handlers.items(), key=lambda item: item[1].total, reverse=True)
+        return {
+            "since": self.started_at,
+            "duration_s": round(time.time() - self.started_at, 3),
+            "handlers": {name: stats.summary() for name, stats in handlers},
+            "loop_lag": self.loop_lag.summary(),
+            "slowest": [sample for _, _, sample in sorted(self._slowest, reverse=True)],
+        }
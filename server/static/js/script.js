@@ -10,6 +10,10 @@ const screenLoadingText = document.getElementById('screen-loading-text');
 const screenQualitySelect = document.getElementById('screen-quality');
 const screenZoomLevelSpan = document.getElementById('screen-zoom-level');
 const webcamZoomLevelSpan = document.getElementById('webcam-zoom-level');
+const telemetryContainer = document.getElementById('telemetry-container');
+const telemetryClientIdSpan = document.getElementById('telemetry-client-id');
+const telemetryRangeSelect = document.getElementById('telemetry-range');
+const telemetryStatus = document.getElementById('telemetry-status');
 
 // 状态变量 (新增媒体面板相关变量)
 let currentMediaClientId = null; // 当前媒体监控客户端ID
@@ -18,12 +22,19 @@ let currentScreenQuality = 100; // 默认屏幕截图质量
 let currentFullscreenType = null; // 当前全屏显示的图像类型（webcam或screen）
 let isScreenMonitoring = false; // 是否正在循环获取屏幕截图
 let screenMonitorInterval = null; // 屏幕监控的定时器ID
+let currentTelemetryClientId = null; // 当前资源监控客户端ID
+let telemetryRefreshTimer = null; // 资源监控的刷新定时器ID
+const TELEMETRY_REFRESH_INTERVAL = 5000; // 资源监控刷新间隔（毫秒），与客户端上报间隔一致
 
 // 原有变量保留
 const sidebar = document.getElementById('sidebar');
 const clientList = document.getElementById('client-list');
 const noClientsLi = document.getElementById('no-clients');
 const clientCount = document.getElementById('client-count');
+const clientListSpacer = document.createElement('li'); // 撑开滚动高度（列表行绝对定位）
+clientListSpacer.className = 'client-list-spacer';
+clientListSpacer.setAttribute('aria-hidden', 'true');
+clientList.appendChild(clientListSpacer);
 const statusDot = document.getElementById('status-dot');
 const connectionStatus = document.getElementById('connection-status');
 const serverTime = document.getElementById('server-time');
@@ -47,6 +58,12 @@ const webcamControls = document.getElementById('webcam-controls');
 let currentTerminalClientId = null;
 let currentWebcamClientId = null;
 let activeClients = {};
+let clientOrder = []; // 客户端列表显示顺序（client_id）
+let clientRows = new Map(); // 已渲染的行 client_id -> { li, client, index }
+let clientRowHeight = 0; // 行高（首次渲染时测量，0表示待测量）
+let clientListRenderPending = false; // 是否已安排下一帧渲染
+const CLIENT_LIST_OVERSCAN = 8; // 可视区域上下额外渲染的行数
+let clientListRevision = -1; // 本地客户端列表版本号（-1表示尚未收到快照）
 let commandHistory = [];
 let historyPosition = -1;
 let isCommandSuggestionsVisible = false;
@@ -54,6 +71,18 @@ let webcamZoomLevel = 100;
 const webcamZoomStep = 25;
 const screenZoomStep = 25;
 let currentWorkingDirectory = '';
+let terminalOutputSeq = {}; // 各客户端最后处理的终端输出分块序号
+
+// 终端回滚缓冲 (环形缓冲区，DOM中最多保留同样行数)
+const TERMINAL_SCROLLBACK_LINES = parseInt(terminalOutput.dataset.scrollback, 10) || 5000;
+let terminalLines = new Array(TERMINAL_SCROLLBACK_LINES); // 行记录 { text, baseClass, className, node }
+let terminalLineStart = 0; // 最早一行在环形缓冲区中的位置
+let terminalLineCount = 0;
+let terminalOpenLine = null; // 末尾尚未换行的行，后续输出继续追加到该行
+let terminalPendingLines = []; // 等待下一帧插入DOM的行
+let terminalEvictedNodes = []; // 等待下一帧移除的DOM节点
+let terminalDirtyLines = new Set(); // 已在DOM中、内容有追加的行
+let terminalFlushPending = false;
 
 
 // 显示通知 (保持原有)
@@ -112,83 +141,241 @@ function updateServerTime() {
 }
 
 
-// 更新客户端列表 (修改客户端按钮事件)
-function updateClientList(clients) {
-    clientList.innerHTML = '';
-    activeClients = {};
+// 创建单个客户端列表项
+function createClientItem(client) {
+    const li = document.createElement('li');
+    li.className = 'client-item';
+    li.dataset.clientId = client.id;
 
-    if (clients.length === 0) {
-        clientList.appendChild(noClientsLi);
-        clientCount.textContent = '0';
-    } else {
-        clientCount.textContent = clients.length.toString();
+    // 高亮当前选中客户端
+    if (client.id === currentTerminalClientId || client.id === currentMediaClientId ||
+        client.id === currentTelemetryClientId) {
+        li.classList.add('active');
+    }
 
-        clients.forEach(client => {
-            activeClients[client.id] = client;
+    li.innerHTML = `
+        <div class="client-info">
+            <div><strong>${client.hostname || '未知主机'}</strong></div>
+            <small>${client.os || '未知系统'} | ${client.address || '未知IP'}</small>
+        </div>
+        <div class="command-buttons mt-2">
+            <button class="btn btn-sm btn-primary terminal-btn" title="远程终端">终端</button>
+            <button class="btn btn-sm btn-info media-btn" title="媒体监控">媒体</button>
+            <button class="btn btn-sm btn-success telemetry-btn" title="资源监控">监控</button>
+            <button class="btn btn-sm btn-warning lock-btn" title="锁屏">锁屏</button>
+            <button class="btn btn-sm btn-danger shutdown-btn" title="关机">关机</button>
+        </div>
+    `;
 
-            const li = document.createElement('li');
-            li.className = 'client-item';
-            li.dataset.clientId = client.id;
+    // 绑定事件 (修改为媒体监控按钮)
+    li.querySelector('.terminal-btn').addEventListener('click', (e) => {
+        e.stopPropagation();
+        openTerminal(client.id);
+    });
 
-            // 高亮当前选中客户端
-            if (client.id === currentTerminalClientId || client.id === currentMediaClientId) {
-                li.classList.add('active');
-            }
+    li.querySelector('.media-btn').addEventListener('click', (e) => {
+        e.stopPropagation();
+        showMediaMonitor(client.id);
+    });
 
-            li.innerHTML = `
-                <div class="client-info">
-                    <div><strong>${client.hostname || '未知主机'}</strong></div>
-                    <small>${client.os || '未知系统'} | ${client.address || '未知IP'}</small>
-                </div>
-                <div class="command-buttons mt-2">
-                    <button class="btn btn-sm btn-primary terminal-btn" title="远程终端">终端</button>
-                    <button class="btn btn-sm btn-info media-btn" title="媒体监控">媒体</button>
-                    <button class="btn btn-sm btn-warning lock-btn" title="锁屏">锁屏</button>
-                    <button class="btn btn-sm btn-danger shutdown-btn" title="关机">关机</button>
-                </div>
-            `;
-
-            // 绑定事件 (修改为媒体监控按钮)
-            li.querySelector('.terminal-btn').addEventListener('click', (e) => {
-                e.stopPropagation();
-                openTerminal(client.id);
-            });
+    li.querySelector('.telemetry-btn').addEventListener('click', (e) => {
+        e.stopPropagation();
+        showTelemetryPanel(client.id);
+    });
 
-            li.querySelector('.media-btn').addEventListener('click', (e) => {
-                e.stopPropagation();
-                showMediaMonitor(client.id);
-            });
+    li.querySelector('.lock-btn').addEventListener('click', (e) => {
+        e.stopPropagation();
+        sendSimpleCommand(client.id, 'lock');
+    });
 
-            li.querySelector('.lock-btn').addEventListener('click', (e) => {
-                e.stopPropagation();
-                sendSimpleCommand(client.id, 'lock');
-            });
+    li.querySelector('.shutdown-btn').addEventListener('click', (e) => {
+        e.stopPropagation();
+        const current = activeClients[client.id] || client;
+        if (confirm(`确定要关闭 ${current.hostname || client.id} 吗?`)) {
+            sendSimpleCommand(client.id, 'shutdown');
+        }
+    });
 
-            li.querySelector('.shutdown-btn').addEventListener('click', (e) => {
-                e.stopPropagation();
-                if (confirm(`确定要关闭 ${client.hostname || client.id} 吗?`)) {
-                    sendSimpleCommand(client.id, 'shutdown');
-                }
-            });
+    return li;
+}
 
-            clientList.appendChild(li);
-        });
+
+// 列表行显示的字段是否相同 (媒体状态等不显示的字段变化不重建行)
+function sameClientRow(a, b) {
+    return a === b || (a.hostname === b.hostname && a.os === b.os && a.address === b.address);
+}
+
+
+// 测量列表行高 (行内文本不换行，所有行等高)
+function measureClientRowHeight(client) {
+    const li = createClientItem(client);
+    li.style.visibility = 'hidden';
+    clientList.appendChild(li);
+    const height = li.offsetHeight;
+    li.remove();
+    return height || 80;
+}
+
+
+// 安排在下一帧渲染客户端列表 (同一帧内的多次更新合并为一次)
+function scheduleClientListRender() {
+    if (clientListRenderPending) return;
+    clientListRenderPending = true;
+    requestAnimationFrame(renderClientList);
+}
+
+
+// 渲染客户端列表 (虚拟滚动：只渲染可视区域的行，按client_id复用已有行)
+function renderClientList() {
+    clientListRenderPending = false;
+    const count = clientOrder.length;
+    clientCount.textContent = count.toString();
+
+    if (count === 0) {
+        clientRows.forEach(row => row.li.remove());
+        clientRows.clear();
+        clientListSpacer.style.height = '0px';
+        if (noClientsLi.parentNode !== clientList) clientList.appendChild(noClientsLi);
+        return;
+    }
+    if (noClientsLi.parentNode === clientList) clientList.removeChild(noClientsLi);
+
+    if (!clientRowHeight) {
+        clientRowHeight = measureClientRowHeight(activeClients[clientOrder[0]]);
+        clientRows.forEach(row => { row.index = -1; });
+    }
+    clientListSpacer.style.height = `${count * clientRowHeight}px`;
+
+    const scrollTop = clientList.scrollTop;
+    const first = Math.max(0, Math.floor(scrollTop / clientRowHeight) - CLIENT_LIST_OVERSCAN);
+    const last = Math.min(count, Math.ceil((scrollTop + clientList.clientHeight) / clientRowHeight) + CLIENT_LIST_OVERSCAN);
+    const visible = new Set();
+
+    for (let i = first; i < last; i++) {
+        const clientId = clientOrder[i];
+        const client = activeClients[clientId];
+        let row = clientRows.get(clientId);
+        visible.add(clientId);
+
+        if (!row) {
+            row = { li: createClientItem(client), client, index: -1 };
+            clientList.appendChild(row.li);
+            clientRows.set(clientId, row);
+        } else if (!sameClientRow(row.client, client)) {
+            const li = createClientItem(client);
+            clientList.replaceChild(li, row.li);
+            row.li = li;
+            row.index = -1;
+        }
+        row.client = client;
+
+        // 只有位置变化的行才修改样式
+        if (row.index !== i) {
+            row.index = i;
+            row.li.style.top = `${i * clientRowHeight}px`;
+        }
     }
 
+    // 移出可视区域的行
+    clientRows.forEach((row, clientId) => {
+        if (!visible.has(clientId)) {
+            row.li.remove();
+            clientRows.delete(clientId);
+        }
+    });
+}
+
+
+// 更新客户端列表 (全量快照)
+function updateClientList(clients) {
+    activeClients = {};
+    clientOrder = clients.map(client => {
+        activeClients[client.id] = client;
+        return client.id;
+    });
+    scheduleClientListRender();
+
     // 客户端断开连接处理
-    if (currentTerminalClientId && !clients.some(c => c.id === currentTerminalClientId)) {
+    if (currentTerminalClientId && !activeClients[currentTerminalClientId]) {
+        handleClientRemoved(currentTerminalClientId);
+    }
+    if (currentMediaClientId && !activeClients[currentMediaClientId]) {
+        handleClientRemoved(currentMediaClientId);
+    }
+    if (currentTelemetryClientId && !activeClients[currentTelemetryClientId]) {
+        handleClientRemoved(currentTelemetryClientId);
+    }
+}
+
+
+// 应用客户端列表全量快照
+function applyClientListSnapshot(snapshot) {
+    clientListRevision = snapshot.revision;
+    updateClientList(snapshot.clients);
+}
+
+
+// 应用客户端列表增量 (仅修改变化的条目)
+function applyClientListDelta(delta) {
+    // 已包含在当前快照中的旧增量直接忽略
+    if (delta.revision <= clientListRevision) return;
+
+    // 版本落后（漏收增量），请求全量快照重新同步
+    if (clientListRevision < 0 || delta.base_revision > clientListRevision) {
+        requestClientListSnapshot();
+        return;
+    }
+
+    let removed = false;
+    delta.changes.forEach(change => {
+        if (change.op === 'remove') {
+            if (!activeClients[change.id]) return;
+            delete activeClients[change.id];
+            removed = true;
+            handleClientRemoved(change.id);
+        } else if (change.client) {
+            // add 与 update 均按幂等的 upsert 处理
+            if (!activeClients[change.id]) clientOrder.push(change.id);
+            activeClients[change.id] = change.client;
+        }
+    });
+
+    // 一批增量中的删除统一过滤一次
+    if (removed) {
+        clientOrder = clientOrder.filter(clientId => activeClients[clientId]);
+    }
+
+    clientListRevision = delta.revision;
+    scheduleClientListRender();
+}
+
+
+// 请求客户端列表全量快照
+function requestClientListSnapshot() {
+    socket.emit('get_clients', { revision: clientListRevision });
+}
+
+
+// 处理客户端断开连接 (关闭相关面板)
+function handleClientRemoved(clientId) {
+    if (clientId === currentTerminalClientId) {
         closeTerminal();
-        showNotification(`客户端 ${currentTerminalClientId} 已断开连接`, 'danger');
+        showNotification(`客户端 ${clientId} 已断开连接`, 'danger');
     }
 
-    if (currentMediaClientId && !clients.some(c => c.id === currentMediaClientId)) {
+    if (clientId === currentMediaClientId) {
         // 如果正在屏幕监控，先停止监控
         if (isScreenMonitoring) {
             stopScreenMonitor();
-            showNotification(`客户端 ${currentMediaClientId} 已断开连接，屏幕监控已停止`, 'warning');
+            showNotification(`客户端 ${clientId} 已断开连接，屏幕监控已停止`, 'warning');
         }
         closeMediaPanel();
-        showNotification(`客户端 ${currentMediaClientId} 已断开连接`, 'danger');
+        showNotification(`客户端 ${clientId} 已断开连接`, 'danger');
+    }
+
+    if (clientId === currentTelemetryClientId) {
+        closeTelemetryPanel();
+        showNotification(`客户端 ${clientId} 已断开连接`, 'danger');
     }
 }
 
@@ -198,8 +385,13 @@ function showMediaMonitor(clientId) {
     const client = activeClients[clientId];
     if (!client) return;
 
+    // 切换客户端时取消旧订阅，只接收当前客户端的媒体帧
+    if (currentMediaClientId && currentMediaClientId !== clientId) {
+        socket.emit('unsubscribe_media', { client_id: currentMediaClientId });
+    }
     currentMediaClientId = clientId;
     mediaClientIdSpan.textContent = client.hostname || clientId;
+    socket.emit('subscribe_media', { client_id: clientId });
 
     // 重置状态
     resetMediaPanel();
@@ -207,6 +399,7 @@ function showMediaMonitor(clientId) {
     // 显示面板
     welcomeMessage.classList.add('d-none');
     terminalContainer.classList.add('d-none');
+    hideTelemetryPanel();
     mediaContainer.classList.remove('d-none');
 
     // 高亮选中客户端
@@ -286,11 +479,58 @@ function closeMediaPanel() {
         stopScreenMonitor();
     }
 
+    if (currentMediaClientId) {
+        socket.emit('unsubscribe_media', { client_id: currentMediaClientId });
+    }
     currentMediaClientId = null;
     mediaContainer.classList.add('d-none');
 
     // 显示欢迎页
-    if (terminalContainer.classList.contains('d-none')) {
+    if (terminalContainer.classList.contains('d-none') && telemetryContainer.classList.contains('d-none')) {
+        welcomeMessage.classList.remove('d-none');
+    }
+
+    highlightSelectedClient();
+}
+
+
+// 打开资源监控面板 (读取服务器保存的遥测时序，不访问客户端)
+function showTelemetryPanel(clientId) {
+    const client = activeClients[clientId];
+    if (!client) return;
+
+    currentTelemetryClientId = clientId;
+    telemetryClientIdSpan.textContent = client.hostname || clientId;
+    resetTelemetryCharts();
+
+    welcomeMessage.classList.add('d-none');
+    terminalContainer.classList.add('d-none');
+    mediaContainer.classList.add('d-none');
+    telemetryContainer.classList.remove('d-none');
+
+    highlightSelectedClient();
+    closeMobileMenu();
+
+    refreshTelemetry();
+    clearInterval(telemetryRefreshTimer);
+    telemetryRefreshTimer = setInterval(refreshTelemetry, TELEMETRY_REFRESH_INTERVAL);
+}
+
+
+// 隐藏资源监控面板并停止刷新
+function hideTelemetryPanel() {
+    clearInterval(telemetryRefreshTimer);
+    telemetryRefreshTimer = null;
+    currentTelemetryClientId = null;
+    telemetryContainer.classList.add('d-none');
+}
+
+
+// 关闭资源监控面板
+function closeTelemetryPanel() {
+    hideTelemetryPanel();
+
+    if (terminalContainer.classList.contains('d-none') && mediaContainer.classList.contains('d-none')) {
         welcomeMessage.classList.remove('d-none');
     }
 
@@ -298,6 +538,93 @@ function closeMediaPanel() {
 }
 
 
+// 清空资源监控图表
+function resetTelemetryCharts() {
+    document.querySelectorAll('.telemetry-chart').forEach(chart => {
+        chart.querySelector('svg').innerHTML = '';
+        chart.querySelector('.telemetry-value').textContent = '--';
+    });
+    telemetryStatus.textContent = '暂无数据';
+}
+
+
+// 从服务器获取当前客户端的遥测时序
+function refreshTelemetry() {
+    const clientId = currentTelemetryClientId;
+    if (!clientId) return;
+
+    const range = parseInt(telemetryRangeSelect.value, 10);
+    fetch(`/api/clients/${encodeURIComponent(clientId)}/telemetry?range=${range}`)
+        .then(response => response.json())
+        .then(data => {
+            if (clientId !== currentTelemetryClientId) return; // 请求期间已切换客户端
+            if (!data.success) {
+                telemetryStatus.textContent = data.message || '获取失败';
+                return;
+            }
+            if (!data.telemetry) {
+                resetTelemetryCharts();
+                return;
+            }
+            renderTelemetry(data.telemetry, range);
+        })
+        .catch(error => {
+            telemetryStatus.textContent = `获取失败: ${error.message}`;
+        });
+}
+
+
+// 格式化遥测数值 (百分比或字节每秒)
+function formatTelemetryValue(value, unit) {
+    if (unit === '%') return `${value.toFixed(1)}%`;
+    const units = ['B/s', 'KB/s', 'MB/s', 'GB/s'];
+    let index = 0;
+    while (value >= 1024 && index < units.length - 1) {
+        value /= 1024;
+        index++;
+    }
+    return `${value.toFixed(index ? 1 : 0)} ${units[index]}`;
+}
+
+
+// 绘制资源监控图表 (每个指标一条均值折线与一条最大值折线)
+function renderTelemetry(telemetry, range) {
+    const end = Date.now() / 1000;
+    const start = end - range;
+    const timestamps = telemetry.timestamps;
+
+    document.querySelectorAll('.telemetry-chart').forEach(chart => {
+        const field = chart.dataset.field;
+        const unit = chart.dataset.unit;
+        const svg = chart.querySelector('svg');
+        const [width, height] = [svg.viewBox.baseVal.width, svg.viewBox.baseVal.height];
+        const avg = telemetry.avg[field] || [];
+        const max = telemetry.max[field] || [];
+
+        // 百分比固定为0-100，速率按范围内最大值缩放
+        const top = unit === '%' ? 100 : Math.max(1, ...max);
+        const toPoints = values => values.map((value, i) => {
+            // 时间桶起始时间加半个分辨率，点落在桶中间
+            const x = (timestamps[i] + telemetry.resolution / 2 - start) / range * width;
+            const y = height - Math.min(value, top) / top * height;
+            return `${Math.max(0, Math.min(width, x)).toFixed(1)},${y.toFixed(1)}`;
+        }).join(' ');
+
+        svg.innerHTML = `<polyline class="max-line" points="${toPoints(max)}"></polyline>` +
+            `<polyline class="avg-line" points="${toPoints(avg)}"></polyline>`;
+
+        const index = telemetry.fields.indexOf(field);
+        if (telemetry.latest && index >= 0) {
+            chart.querySelector('.telemetry-value').textContent =
+                formatTelemetryValue(telemetry.latest.values[index], unit);
+        }
+    });
+
+    const updated = telemetry.latest ? new Date(telemetry.latest.timestamp * 1000).toLocaleTimeString() : '--';
+    telemetryStatus.textContent = `分辨率 ${telemetry.resolution} 秒，最后更新 ${updated}`;
+}
+
+
 // 设置屏幕截图质量 (新增)
 function setScreenQuality() {
     const quality = parseInt(screenQualitySelect.value);
@@ -472,13 +799,21 @@ function openTerminal(clientId) {
     const client = activeClients[clientId];
     if (!client) return;
 
+    // 只订阅当前打开终端的客户端输出
+    if (currentTerminalClientId && currentTerminalClientId !== clientId) {
+        socket.emit('unsubscribe_terminal', { client_id: currentTerminalClientId });
+    }
     currentTerminalClientId = clientId;
+    // 终端已清空，服务器回放的历史输出需要重新显示
+    delete terminalOutputSeq[clientId];
+    socket.emit('subscribe_terminal', { client_id: clientId });
     terminalClientIdSpan.textContent = client.hostname || clientId;
-    terminalOutput.textContent = '';
+    clearTerminalBuffer();
     terminalInput.value = '';
 
     welcomeMessage.classList.add('d-none');
     mediaContainer.classList.add('d-none');
+    hideTelemetryPanel();
     terminalContainer.classList.remove('d-none');
 
     highlightSelectedClient();
@@ -507,8 +842,7 @@ function sendTerminalCommand() {
     });
 
     // 显示命令输入
-    terminalOutput.textContent += `$ ${commandText}\n`;
-    terminalOutput.scrollTop = terminalOutput.scrollHeight;
+    writeTerminal(`$ ${commandText}\n`, 'cmd-prompt');
 
     // 添加历史记录
     addToCommandHistory(commandText);
@@ -522,10 +856,13 @@ function sendTerminalCommand() {
 
 // 关闭终端 (保持原有)
 function closeTerminal() {
+    if (currentTerminalClientId) {
+        socket.emit('unsubscribe_terminal', { client_id: currentTerminalClientId });
+    }
     currentTerminalClientId = null;
     terminalContainer.classList.add('d-none');
 
-    if (mediaContainer.classList.contains('d-none')) {
+    if (mediaContainer.classList.contains('d-none') && telemetryContainer.classList.contains('d-none')) {
         welcomeMessage.classList.remove('d-none');
     }
 
@@ -536,7 +873,7 @@ function closeTerminal() {
 // 清空终端 (保持原有)
 function clearTerminal() {
     if (currentTerminalClientId) {
-        terminalOutput.textContent = '';
+        clearTerminalBuffer();
         showNotification('终端输出已清空', 'info');
     }
 }
@@ -572,6 +909,11 @@ function highlightSelectedClient() {
         const item = document.querySelector(`.client-item[data-client-id="${currentMediaClientId}"]`);
         if (item) item.classList.add('active');
     }
+
+    if (currentTelemetryClientId) {
+        const item = document.querySelector(`.client-item[data-client-id="${currentTelemetryClientId}"]`);
+        if (item) item.classList.add('active');
+    }
 }
 
 
@@ -587,13 +929,24 @@ function closeMobileMenu() {
 
 // Socket.IO事件处理 (新增屏幕截图事件)
 socket.on('connect', () => {
+    // 服务器在连接建立时会主动推送全量快照
     updateConnectionStatus('connected');
-    socket.emit('get_clients');
+    // 重连后恢复终端与媒体订阅（房间成员关系不会跨连接保留）
+    if (currentTerminalClientId) {
+        socket.emit('subscribe_terminal', { client_id: currentTerminalClientId });
+    }
+    if (currentMediaClientId) {
+        socket.emit('subscribe_media', { client_id: currentMediaClientId });
+    }
 });
 
 socket.on('disconnect', () => {
     updateConnectionStatus('disconnected');
-    updateClientList([]);
+    // 只清空列表显示，保留已打开面板的客户端ID：重连后恢复订阅，由重连快照决定这些客户端是否仍然存在
+    clientListRevision = -1;
+    activeClients = {};
+    clientOrder = [];
+    scheduleClientListRender();
 
     // 如果正在屏幕监控，停止监控
     if (isScreenMonitoring) {
@@ -605,31 +958,144 @@ socket.on('connect_error', () => {
     updateConnectionStatus('error');
 });
 
-socket.on('update_client_list', (clients) => {
-    updateClientList(clients);
+socket.on('update_client_list', (snapshot) => {
+    applyClientListSnapshot(snapshot);
 });
 
-socket.on('terminal_output', (data) => {
-    console.log('收到终端输出:', data);
-    if (data.client_id === currentTerminalClientId) {
-        let formattedOutput = formatTerminalOutput(data.output);
+socket.on('client_list_delta', (delta) => {
+    applyClientListDelta(delta);
+});
+
+// 终端输出由服务器按批合并发送（数组）
+socket.on('terminal_output', (batch) => {
+    (Array.isArray(batch) ? batch : [batch]).forEach(handleTerminalOutput);
+});
+
+function handleTerminalOutput(data) {
+    // 分块序号用于丢弃重复分块
+    const lastSeq = terminalOutputSeq[data.client_id];
+    if (lastSeq !== undefined && data.seq !== undefined && data.seq <= lastSeq) return;
+    terminalOutputSeq[data.client_id] = data.seq;
 
-        if (formattedOutput.isHTML) {
-            const tempDiv = document.createElement('div');
-            tempDiv.innerHTML = formattedOutput.text;
-            terminalOutput.appendChild(tempDiv);
+    if (data.client_id === currentTerminalClientId) {
+        // 错误输出按流类型单独着色，与标准输出按到达顺序交错显示
+        if (data.stream === 'stderr') {
+            writeTerminal(data.output, 'cmd-error');
         } else {
-            terminalOutput.textContent += formattedOutput.text;
+            writeTerminal(data.output, '', data.output.includes('[CLAY]'));
+        }
+    }
+}
+
+
+// 写入终端 (按行存入环形缓冲区，下一帧批量插入DOM)
+function writeTerminal(text, className = '', formatClay = false) {
+    const parts = text.split('\n');
+    const endsOpen = parts[parts.length - 1] !== '';
+    if (!endsOpen) parts.pop();
+
+    parts.forEach((part, i) => {
+        if (i === 0 && terminalOpenLine && !terminalOpenLine.evicted && terminalOpenLine.baseClass === className) {
+            // 接续上一次输出未结束的行
+            terminalOpenLine.text += part;
+            if (terminalOpenLine.node) terminalDirtyLines.add(terminalOpenLine);
+            return;
         }
+        pushTerminalLine({
+            text: part,
+            baseClass: className,
+            className: (formatClay && classifyTerminalLine(part)) || className,
+            node: null
+        });
+    });
 
-        terminalOutput.scrollTop = terminalOutput.scrollHeight;
+    if (endsOpen) {
+        terminalOpenLine = terminalLines[(terminalLineStart + terminalLineCount - 1) % TERMINAL_SCROLLBACK_LINES];
+    } else {
+        terminalOpenLine = null;
     }
+    scheduleTerminalFlush();
+}
+
+
+// 追加一行，缓冲区已满时淘汰最早的一行
+function pushTerminalLine(line) {
+    if (terminalLineCount === TERMINAL_SCROLLBACK_LINES) {
+        const evicted = terminalLines[terminalLineStart];
+        evicted.evicted = true;
+        if (evicted.node) terminalEvictedNodes.push(evicted.node);
+        terminalLines[terminalLineStart] = line;
+        terminalLineStart = (terminalLineStart + 1) % TERMINAL_SCROLLBACK_LINES;
+    } else {
+        terminalLines[(terminalLineStart + terminalLineCount) % TERMINAL_SCROLLBACK_LINES] = line;
+        terminalLineCount++;
+    }
+    terminalPendingLines.push(line);
+}
+
+
+// 安排在下一帧更新终端DOM
+function scheduleTerminalFlush() {
+    if (terminalFlushPending) return;
+    terminalFlushPending = true;
+    requestAnimationFrame(flushTerminal);
+}
+
+
+// 批量更新终端DOM：移除淘汰的行、追加新行，原本停在底部时保持滚动到底部
+function flushTerminal() {
+    terminalFlushPending = false;
+    const atBottom = terminalOutput.scrollHeight - terminalOutput.scrollTop - terminalOutput.clientHeight < 4;
+
+    terminalEvictedNodes.forEach(node => node.remove());
+    terminalEvictedNodes = [];
+
+    terminalDirtyLines.forEach(line => {
+        if (!line.evicted) line.node.textContent = line.text;
+    });
+    terminalDirtyLines.clear();
+
+    const fragment = document.createDocumentFragment();
+    terminalPendingLines.forEach(line => {
+        if (line.evicted) return; // 尚未显示就已被淘汰
+        const div = document.createElement('div');
+        if (line.className) div.className = line.className;
+        if (line.className !== 'separator') div.textContent = line.text;
+        line.node = div;
+        fragment.appendChild(div);
+    });
+    terminalPendingLines = [];
+    terminalOutput.appendChild(fragment);
+
+    if (atBottom) terminalOutput.scrollTop = terminalOutput.scrollHeight;
+}
+
+
+// 清空终端及回滚缓冲
+function clearTerminalBuffer() {
+    terminalLines = new Array(TERMINAL_SCROLLBACK_LINES);
+    terminalLineStart = 0;
+    terminalLineCount = 0;
+    terminalOpenLine = null;
+    terminalPendingLines = [];
+    terminalEvictedNodes = [];
+    terminalDirtyLines.clear();
+    terminalOutput.textContent = '';
+}
+
+// 客户端确认命令已中断（显示服务器统计的中断耗时）
+socket.on('command_interrupted', (data) => {
+    if (data.client_id !== currentTerminalClientId) return;
+    const latency = typeof data.latency === 'number' ? ` (${Math.round(data.latency * 1000)}ms)` : '';
+    showNotification(data.state === 'cancelled' ? `已取消排队中的命令${latency}` : `命令已中断${latency}`, 'success');
 });
 
-socket.on('webcam_frame', (data) => {
+// 媒体帧收到后立即确认，服务器据此判断连接是否积压（积压时丢弃旧帧）
+socket.on('webcam_frame', (data, ack) => {
+    if (typeof ack === 'function') ack();
     // 仅处理当前媒体客户端的摄像头数据
     if (data.client_id === currentMediaClientId) {
-        webcamImage.src = `data:image/jpeg;base64,${data.image_data}`;
+        setImageFrame(webcamImage, data.image_data);
         webcamImage.classList.remove('d-none');
         webcamLoading.classList.add('d-none');
         // 应用当前缩放级别
@@ -639,9 +1105,10 @@ socket.on('webcam_frame', (data) => {
 });
 
 // 屏幕截图帧处理事件
-socket.on('screen_frame', (data) => {
+socket.on('screen_frame', (data, ack) => {
+    if (typeof ack === 'function') ack();
     if (data.client_id === currentMediaClientId) {
-        screenImage.src = `data:image/jpeg;base64,${data.image_data}`;
+        setImageFrame(screenImage, data.image_data);
         screenImage.classList.remove('d-none');
         screenLoading.classList.add('d-none');
         // 应用当前缩放级别
@@ -651,22 +1118,33 @@ socket.on('screen_frame', (data) => {
 });
 
 
-// 格式化终端输出 (保持原有)
-function formatTerminalOutput(text) {
-    if (text.includes('[CLAY]')) {
-        let html = text
-            .replace(/\[CLAY\] 🚀 执行命令: (.*)/g, '<div class="clay-command">[CLAY] 🚀 执行命令: $1</div>')
-            .replace(/\[CLAY\] ✅ (.*)/g, '<div class="clay-success">[CLAY] ✅ $1</div>')
-            .replace(/\[CLAY\] ❌ (.*)/g, '<div class="clay-error">[CLAY] ❌ $1</div>')
-            .replace(/\[CLAY\] ⚠️ (.*)/g, '<div class="clay-warning">[CLAY] ⚠️ $1</div>')
-            .replace(/\[CLAY\] 🛑 (.*)/g, '<div class="clay-error">[CLAY] 🛑 $1</div>')
-            .replace(/\[CLAY\] ⏱️ (.*)/g, '<div class="clay-warning">[CLAY] ⏱️ $1</div>')
-            .replace(/----+/g, '<div class="separator"></div>');
+// 显示二进制图像帧 (通过Blob对象URL，避免base64数据URL)
+function setImageFrame(image, bytes) {
+    const previousUrl = image.dataset.objectUrl;
+    const url = URL.createObjectURL(new Blob([bytes], { type: 'image/jpeg' }));
+    image.dataset.objectUrl = url;
+    image.src = url;
+    // 释放上一帧占用的内存
+    if (previousUrl) URL.revokeObjectURL(previousUrl);
+}
 
-        return { text: html, isHTML: true };
-    }
 
-    return { text: text, isHTML: false };
+// 按行判断CLAY系统消息的显示样式 (逐行处理，无需对整段输出重复执行正则替换)
+const TERMINAL_LINE_STYLES = [
+    [/\[CLAY\] 🚀 执行命令: /, 'clay-command'],
+    [/\[CLAY\] ✅ /, 'clay-success'],
+    [/\[CLAY\] ❌ /, 'clay-error'],
+    [/\[CLAY\] ⚠️ /, 'clay-warning'],
+    [/\[CLAY\] 🛑 /, 'clay-error'],
+    [/\[CLAY\] ⏱️ /, 'clay-warning'],
+    [/^-{4,}$/, 'separator']
+];
+
+function classifyTerminalLine(line) {
+    for (const [pattern, className] of TERMINAL_LINE_STYLES) {
+        if (pattern.test(line)) return className;
+    }
+    return '';
 }
 
 
@@ -753,6 +1231,13 @@ document.addEventListener('DOMContentLoaded', () => {
     sendCommandBtn.addEventListener('click', sendTerminalCommand);
     mobileToggle.addEventListener('click', toggleMobileMenu);
 
+    // 客户端列表虚拟滚动
+    clientList.addEventListener('scroll', scheduleClientListRender, { passive: true });
+    window.addEventListener('resize', () => {
+        clientRowHeight = 0;
+        scheduleClientListRender();
+    });
+
     // 加载命令历史
     try {
         const savedHistory = localStorage.getItem('terminal_history');
@@ -823,6 +1308,10 @@ screenImage.addEventListener('dblclick', () => {
     document.getElementById('capture-screen-btn').addEventListener('click', captureCurrentScreen);
     document.getElementById('refresh-webcam-btn').addEventListener('click', refreshWebcam);
     document.getElementById('close-media-btn').addEventListener('click', closeMediaPanel);
+
+    // 资源监控面板事件绑定
+    document.getElementById('close-telemetry-btn').addEventListener('click', closeTelemetryPanel);
+    telemetryRangeSelect.addEventListener('change', refreshTelemetry);
     screenQualitySelect.addEventListener('change', setScreenQuality);
 
     // 屏幕缩放事件 (新增)
@@ -861,8 +1350,7 @@ function interruptCommand() {
 
     showNotification("发送中断信号...", "info");
     socket.emit('interrupt_command', { client_id: currentTerminalClientId });
-    terminalOutput.textContent += "\n[CLAY] ⚠️ 已发送中断信号，正在尝试停止命令...\n";
-    terminalOutput.scrollTop = terminalOutput.scrollHeight;
+    writeTerminal("\n[CLAY] ⚠️ 已发送中断信号，正在尝试停止命令...\n", '', true);
 }
 // 切换常用命令面板显示/隐藏
 function toggleCommandSuggestions() {
@@ -0,0 +1,160 @@
+"""客户端遥测时序存储：每个客户端按多个分辨率（如5秒/1分钟/1小时）聚合的固定内存环形缓冲区
+
+每个分辨率是一个定长环形数组，槽位 = 时间桶编号 % 容量，保存该时间桶内的样本数、各指标之和与最大值。
+写入时只更新每个分辨率的一个槽位，按时间范围查询时按桶编号直接定位，都不移动数据；
+内存在客户端第一次上报时一次性分配，之后不再增长。
+"""
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+TELEMETRY_FIELDS = ("cpu", "memory", "disk", "net_rx", "net_tx")  # 样本中各指标的顺序（百分比 / 字节每秒）
+
+
+class RollupRing:
+    """单个分辨率的环形缓冲区"""
+
+    def __init__(self, resolution: int, capacity: int, width: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.width = width
+        self.buckets = array("q", [-1]) * capacity  # 槽位当前保存的时间桶编号（-1为空）
+        self.counts = array("I", [0]) * capacity
+        self.sums = array("f", [0.0]) * (capacity * width)
+        self.maxima = array("f", [0.0]) * (capacity * width)
+        self.latest = -1  # 已写入的最新时间桶编号
+
+    @property
+    def nbytes(self) -> int:
+        return sum(data.itemsize * len(data) for data in (self.buckets, self.counts, self.sums, self.maxima))
+
+    def add(self, timestamp: float, values: Sequence[float]) -> None:
+        bucket = int(timestamp // self.resolution)
+        if bucket <= self.latest - self.capacity:
+            return  # 早于保留范围
+        slot = bucket % self.capacity
+        base = slot * self.width
+        if self.buckets[slot] != bucket:
+            # 槽位中是一圈之前的旧桶，直接覆盖
+            self.buckets[slot] = bucket
+            self.counts[slot] = 1
+            self.sums[base:base + self.width] = array("f", values)
+            self.maxima[base:base + self.width] = array("f", values)
+        else:
+            self.counts[slot] += 1
+            for offset, value in enumerate(values, base):
+                self.sums[offset] += value
+                if value > self.maxima[offset]:
+                    self.maxima[offset] = value
+        if bucket > self.latest:
+            self.latest = bucket
+
+    def query(self, since: Optional[float], until: Optional[float]) -> List[Tuple[int, int, List[float], List[float]]]:
+        """返回时间范围内有样本的时间桶：(桶起始时间, 样本数, 各指标均值, 各指标最大值)"""
+        if self.latest < 0:
+            return []
+        first = max(self.latest - self.capacity + 1, 0)  # 负的桶编号会与空槽位标记-1混淆
+        if since is not None:
+            first = max(first, int(since // self.resolution))
+        last = self.latest if until is None else min(self.latest, int(until // self.resolution))
+        points = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.capacity
+            if self.buckets[slot] != bucket:
+                continue
+            count = self.counts[slot]
+            base = slot * self.width
+            points.append((
+                bucket * self.resolution,
+                count,
+                [self.sums[offset] / count for offset in range(base, base + self.width)],
+                list(self.maxima[base:base + self.width]),
+            ))
+        return points
+
+
+class ClientTelemetry:
+    """单个客户端的各分辨率环形缓冲区与最新样本"""
+
+    def __init__(self, resolutions: Sequence[Tuple[int, int]], width: int):
+        self.rings = [RollupRing(resolution, capacity, width) for resolution, capacity in resolutions]
+        self.latest: Optional[Tuple[float, List[float]]] = None
+
+    def add(self, timestamp: float, values: List[float]) -> None:
+        for ring in self.rings:
+            ring.add(timestamp, values)
+        if self.latest is None or timestamp >= self.latest[0]:
+            self.latest = (timestamp, values)
+
+
+class TelemetryStore:
+    """所有客户端的遥测存储（由服务器在收到客户端样本时写入，查询接口只读）"""
+
+    def __init__(self, resolutions: Sequence[Tuple[int, int]], fields: Sequence[str] = TELEMETRY_FIELDS):
+        self.resolutions = sorted((int(resolution), int(capacity)) for resolution, capacity in resolutions)
+        if not self.resolutions or any(resolution <= 0 or capacity <= 0 for resolution, capacity in self.resolutions):
+            raise ValueError(f"无效的遥测分辨率配置: {resolutions}")
+        self.fields = tuple(fields)
+        self.clients: Dict[str, ClientTelemetry] = {}
+        self.bytes_per_client = sum(ring.nbytes for ring in ClientTelemetry(self.resolutions, len(self.fields)).rings)
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    @property
+    def total_bytes(self) -> int:
+        return len(self.clients) * self.bytes_per_client
+
+    def add(self, client_id: str, timestamp: float, values: Any) -> None:
+        """写入一个样本，格式不合法时抛出ValueError"""
+        if not isinstance(values, (list, tuple)) or len(values) != len(self.fields):
+            raise ValueError(f"遥测样本应为{len(self.fields)}个数值")
+        try:
+            values = [float(value) for value in values]
+        except (TypeError, ValueError):
+            raise ValueError("遥测样本包含非数值")
+        if not all(math.isfinite(value) for value in values):
+            raise ValueError("遥测样本包含非有限数值")
+        series = self.clients.get(client_id)
+        if series is None:
+            series = self.clients[client_id] = ClientTelemetry(self.resolutions, len(self.fields))
+        series.add(timestamp, values)
+
+    def remove_client(self, client_id: str) -> None:
+        self.clients.pop(client_id, None)
+
+    def latest(self) -> Dict[str, Dict[str, Any]]:
+        """各客户端的最新样本"""
+        return {
+            client_id: {"timestamp": series.latest[0], "values": series.latest[1]}
+            for client_id, series in self.clients.items() if series.latest
+        }
+
+    def select_resolution(self, since: Optional[float], now: float) -> int:
+        """未指定分辨率时选择能覆盖查询起点的最细分辨率"""
+        for resolution, capacity in self.resolutions:
+            if since is None or now - since <= resolution * capacity:
+                return resolution
+        return self.resolutions[-1][0]
+
+    def query(self, client_id: str, resolution: Optional[int] = None, since: Optional[float] = None,
+              until: Optional[float] = None, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """查询客户端的时间序列（按列返回），客户端没有数据时返回None，参数不合法时抛出ValueError"""
+        series = self.clients.get(client_id)
+        if series is None:
+            return None
+        if resolution is None:
+            resolution = self.select_resolution(since, now if now is not None else series.latest[0])
+        ring = next((ring for ring in series.rings if ring.resolution == resolution), None)
+        if ring is None:
+            raise ValueError(f"不支持的分辨率: {resolution}（可选: {', '.join(str(r) for r, _ in self.resolutions)}）")
+        points = ring.query(since, until)
+        return {
+            "resolution": resolution,
+            "fields": list(self.fields),
+            "timestamps": [point[0] for point in points],
+            "counts": [point[1] for point in points],
+            "avg": {field: [round(point[2][index], 2) for point in points] for index, field in enumerate(self.fields)},
+            "max": {field: [round(point[3][index], 2) for point in points] for index, field in enumerate(self.fields)},
+            "latest": {"timestamp": series.latest[0], "values": series.latest[1]},
+        }
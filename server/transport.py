@@ -0,0 +1,95 @@
+"""Socket.IO传输层选项：可替换的序列化方式与带大小阈值的WebSocket压缩（permessage-deflate）
+
+序列化方式须在服务器、Python客户端与浏览器三端一致（浏览器端由模板按配置加载对应的socket.io构建）：
+    json     标准库json（默认）
+    orjson   orjson编码（更快，仍为JSON文本帧，需安装 orjson）
+    msgpack  MessagePack二进制帧（需安装 msgpack）
+"""
+import logging
+from typing import Any, Dict
+
+SERIALIZERS = ("json", "orjson", "msgpack")
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonModule:
+    """把orjson适配为json模块接口（Socket.IO编码时会传入separators等参数，orjson输出本身即为紧凑格式）"""
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, data: Any, **kwargs: Any) -> Any:
+        return self._orjson.loads(data)
+
+
+def serializer_options(name: str) -> Dict[str, Any]:
+    """返回创建Socket.IO服务器/客户端时的序列化参数，依赖缺失时抛出ImportError"""
+    if name not in SERIALIZERS:
+        raise ValueError(f"不支持的序列化方式: {name}（可选: {', '.join(SERIALIZERS)}）")
+    if name == "orjson":
+        return {"json": OrjsonModule()}
+    if name == "msgpack":
+        import msgpack  # noqa: F401  提前检查依赖，避免首个连接时才失败
+        return {"serializer": "msgpack"}
+    return {}
+
+
+def utf8_length_below(text: str, limit: int) -> bool:
+    """文本按UTF-8编码后的字节数是否小于limit（每个字符1-4字节，只在无法仅凭字符数判断时才编码）"""
+    if len(text) >= limit:
+        return False
+    if len(text) * 4 < limit:
+        return True
+    return len(text.encode("utf-8", "surrogatepass")) < limit
+
+
+def install_websocket_compression(eio_server: Any, enabled: bool, threshold: int, compress_binary: bool) -> None:
+    """配置WebSocket的permessage-deflate压缩（仅eventlet模式）
+
+    eventlet默认对协商了压缩的连接压缩所有消息。这里改为：关闭时不协商压缩；
+    开启时只压缩编码后不小于threshold字节的消息，二进制帧（如JPEG媒体帧，压缩无收益）按compress_binary决定。
+    permessage-deflate允许逐条消息决定是否压缩，跳过的消息不影响压缩上下文。
+    """
+    if eio_server.async_mode != "eventlet":
+        logger.warning("WebSocket压缩阈值仅支持eventlet模式，当前模式: %s", eio_server.async_mode)
+        return
+
+    from engineio.async_drivers.eventlet import WebSocketWSGI
+    from eventlet.websocket import RFC6455WebSocket
+
+    class ThresholdDeflateWebSocket(RFC6455WebSocket):
+        """按消息大小与类型决定是否压缩的WebSocket连接"""
+        _skip_compression = False
+
+        def _pack_message(self, message, masked=False, continuation=False, final=True, control_code=None):
+            if isinstance(message, str):
+                self._skip_compression = utf8_length_below(message, threshold)
+            else:
+                self._skip_compression = not compress_binary or len(message) < threshold
+            return super()._pack_message(message, masked=masked, continuation=continuation,
+                                         final=final, control_code=control_code)
+
+        def _get_permessage_deflate_enc(self):
+            if self._skip_compression:
+                return None
+            return super()._get_permessage_deflate_enc()
+
+    class CompressionWebSocketWSGI(WebSocketWSGI):
+        """握手时按配置协商压缩，连接建立后切换为按阈值压缩的实现"""
+        def __init__(self, handler, server):
+            def configured_handler(ws):
+                if type(ws) is RFC6455WebSocket:
+                    ws.__class__ = ThresholdDeflateWebSocket
+                return handler(ws)
+            super().__init__(configured_handler, server)
+
+        def _negotiate_permessage_deflate(self, extensions):
+            if not enabled:
+                return None
+            return super()._negotiate_permessage_deflate(extensions)
+
+    eio_server._async = dict(eio_server._async, websocket=CompressionWebSocketWSGI)